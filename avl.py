@@ -1,55 +1,216 @@
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
+from perfil import PerfilBase
+from recursos import INTERVALOS, PoolIntervalos, Recursos
 
 class NoAVL:
-    def __init__(self, tempo: int, nRec: int, intervalos: List[Tuple[int, int]]):
+    def __init__(self, tempo: int, nRec: int, intervalos: Recursos):
         self.tempo = tempo
         self.nRec = nRec
         self.intervalos = intervalos
 
+        self.min_nRec = nRec
+        self.intersec_sub = intervalos
+        self.tamanho = 1
+
         self.altura = 1
         self.esquerda = None
         self.direita = None
         self.pai = None
 
-class PerfilDisponibilidadeAVL:
-    def __init__(self):
+        self.anterior = None
+        self.proximo = None
+
+class PerfilDisponibilidadeAVL(PerfilBase):
+    def __init__(self, formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False):
+        super().__init__(formato, pool, coalescer)
         self.raiz = None
 
-    def criar_no(self, tempo: int, nRec: int, intervalos: List[Tuple[int, int]]) -> NoAVL:
+    @classmethod
+    def construir_de_ordenados(cls, iteravel: Iterable[Tuple[int, int, Recursos]], formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False) -> 'PerfilDisponibilidadeAVL':
+        perfil = cls(formato, pool, coalescer)
+        nos = []
+        for tempo, nRec, intervalos in iteravel:
+            if nos and tempo < nos[-1].tempo:
+                raise ValueError("construir_de_ordenados exige tempos em ordem crescente")
+            intervalos = perfil._preparar_recursos(intervalos)
+            if coalescer and nos and perfil._mesma_disponibilidade(nos[-1], nRec, intervalos):
+                continue
+            no = NoAVL(tempo, nRec, intervalos)
+            if nos:
+                no.anterior = nos[-1]
+                nos[-1].proximo = no
+            nos.append(no)
+        perfil.raiz = perfil._construir_balanceada(nos, 0, len(nos), None)
+        perfil.maximo = nos[-1] if nos else None
+        return perfil
+
+    def _construir_balanceada(self, nos: List[NoAVL], inicio: int, fim: int, pai: Optional[NoAVL]) -> Optional[NoAVL]:
+        if inicio >= fim:
+            return None
+        meio = (inicio + fim) // 2
+        no = nos[meio]
+        no.pai = pai
+        no.esquerda = self._construir_balanceada(nos, inicio, meio, no)
+        no.direita = self._construir_balanceada(nos, meio + 1, fim, no)
+        no.altura = 1 + max(self._calcular_altura(no.esquerda), self._calcular_altura(no.direita))
+        self._atualizar_agregados(no)
+        return no
+
+    def _inserir_ponto(self, tempo: int, nRec: int, intervalos: Recursos) -> NoAVL:
         novo = NoAVL(tempo, nRec, intervalos)
-        self.raiz = self._inserir_avl(self.raiz, novo)
+        self._inserir_avl(novo)
         return novo
 
-    def _inserir_avl(self, raiz: NoAVL, no: NoAVL) -> NoAVL:
-        if raiz == None:
-            return no
+    def _inserir_avl(self, no: NoAVL):
+        if self.raiz is None:
+            self.raiz = no
+            self.maximo = no
+            return
 
-        if no.tempo < raiz.tempo:
-            raiz.esquerda = self._inserir_avl(raiz.esquerda, no)
-            raiz.esquerda.pai = raiz
+        if no.tempo >= self.maximo.tempo:
+            pai = self.maximo
+            pai.direita = no
+            self.maximo = no
         else:
-            raiz.direita = self._inserir_avl(raiz.direita, no)
-            raiz.direita.pai = raiz
-
-        raiz.altura = 1 + max(self._calcular_altura(raiz.esquerda), self._calcular_altura(raiz.direita))
-
-        fator_balanceamento = self._fator_balanceamento(raiz)
-
-        if fator_balanceamento > 1 and no.tempo < raiz.esquerda.tempo:
-            return self._rotacionar_direita(raiz)
+            pai = None
+            filho = self.raiz
+            while filho:
+                pai = filho
+                if no.tempo < filho.tempo:
+                    filho = filho.esquerda
+                else:
+                    filho = filho.direita
+            if no.tempo < pai.tempo:
+                pai.esquerda = no
+            else:
+                pai.direita = no
+        no.pai = pai
+        self._encadear(no)
+
+        while pai:
+            pai = self._rebalancear(pai).pai
+
+    def _remover_no(self, no: NoAVL):
+        self._invalidar_ancoras()
+        anterior = no.anterior
+        proximo = no.proximo
+        if anterior is not None:
+            anterior.proximo = proximo
+        if proximo is not None:
+            proximo.anterior = anterior
+        if self.maximo is no:
+            self.maximo = anterior
+
+        if no.esquerda and no.direita:
+            substituto = proximo
+            if substituto.pai is no:
+                inicio = substituto
+            else:
+                inicio = substituto.pai
+                self._substituir(substituto, substituto.direita)
+                substituto.direita = no.direita
+                substituto.direita.pai = substituto
+            substituto.esquerda = no.esquerda
+            substituto.esquerda.pai = substituto
+            self._substituir(no, substituto)
+        else:
+            inicio = no.pai
+            self._substituir(no, no.esquerda or no.direita)
+
+        no.esquerda = no.direita = no.pai = None
+        no.anterior = no.proximo = None
+        while inicio:
+            inicio = self._rebalancear(inicio).pai
+
+    def _substituir(self, antigo: NoAVL, novo: Optional[NoAVL]):
+        pai = antigo.pai
+        if pai is None:
+            self.raiz = novo
+        elif pai.esquerda is antigo:
+            pai.esquerda = novo
+        else:
+            pai.direita = novo
+        if novo is not None:
+            novo.pai = pai
 
-        if fator_balanceamento < -1 and no.tempo > raiz.direita.tempo:
-            return self._rotacionar_esquerda(raiz)
+    def _rebalancear(self, no: NoAVL) -> NoAVL:
+        no.altura = 1 + max(self._calcular_altura(no.esquerda), self._calcular_altura(no.direita))
+        self._atualizar_agregados(no)
+
+        fator_balanceamento = self._fator_balanceamento(no)
+
+        if fator_balanceamento > 1:
+            if self._fator_balanceamento(no.esquerda) < 0:
+                if self.metricas is not None:
+                    self.metricas.incrementar('caso_esquerda_direita')
+                no.esquerda = self._rotacionar_esquerda(no.esquerda)
+            elif self.metricas is not None:
+                self.metricas.incrementar('caso_esquerda_esquerda')
+            return self._rotacionar_direita(no)
+
+        if fator_balanceamento < -1:
+            if self._fator_balanceamento(no.direita) > 0:
+                if self.metricas is not None:
+                    self.metricas.incrementar('caso_direita_esquerda')
+                no.direita = self._rotacionar_direita(no.direita)
+            elif self.metricas is not None:
+                self.metricas.incrementar('caso_direita_direita')
+            return self._rotacionar_esquerda(no)
 
-        if fator_balanceamento > 1 and no.tempo > raiz.esquerda.tempo:
-            raiz.esquerda = self._rotacionar_esquerda(raiz.esquerda)
-            return self._rotacionar_direita(raiz)
+        return no
 
-        if fator_balanceamento < -1 and no.tempo < raiz.direita.tempo:
-            raiz.direita = self._rotacionar_direita(raiz.direita)
-            return self._rotacionar_esquerda(raiz)
+    def _juntar(self, esquerda: Optional[NoAVL], no: NoAVL, direita: Optional[NoAVL]) -> NoAVL:
+        altura_esquerda = self._calcular_altura(esquerda)
+        altura_direita = self._calcular_altura(direita)
+
+        if altura_esquerda > altura_direita + 1:
+            filho = self._juntar(esquerda.direita, no, direita)
+            esquerda.direita = filho
+            filho.pai = esquerda
+            return self._rebalancear(esquerda)
+
+        if altura_direita > altura_esquerda + 1:
+            filho = self._juntar(esquerda, no, direita.esquerda)
+            direita.esquerda = filho
+            filho.pai = direita
+            return self._rebalancear(direita)
+
+        no.esquerda = esquerda
+        no.direita = direita
+        no.pai = None
+        if esquerda:
+            esquerda.pai = no
+        if direita:
+            direita.pai = no
+        no.altura = 1 + max(altura_esquerda, altura_direita)
+        self._atualizar_agregados(no)
+        return no
 
-        return raiz
+    def _atualizar_agregados(self, no: NoAVL):
+        no.min_nRec = no.nRec
+        no.intersec_sub = no.intervalos
+        no.tamanho = 1
+        for filho in (no.esquerda, no.direita):
+            if filho is not None:
+                if filho.min_nRec < no.min_nRec:
+                    no.min_nRec = filho.min_nRec
+                if filho.intersec_sub is not no.intersec_sub and filho.intersec_sub != no.intersec_sub:
+                    no.intersec_sub = self._intersecao_intervalos(no.intersec_sub, filho.intersec_sub)
+                no.tamanho += filho.tamanho
+
+    def _atualizar_agregados_de(self, nos: List[NoAVL]):
+        profundidade = {}
+        for no in nos:
+            caminho = []
+            while no is not None and no not in profundidade:
+                caminho.append(no)
+                no = no.pai
+            nivel = -1 if no is None else profundidade[no]
+            for atual in reversed(caminho):
+                nivel += 1
+                profundidade[atual] = nivel
+        for no in sorted(profundidade, key=profundidade.get, reverse=True):
+            self._atualizar_agregados(no)
 
     def _calcular_altura(self, no: Optional[NoAVL]) -> int:
         if no is None:
@@ -62,6 +223,8 @@ class PerfilDisponibilidadeAVL:
         return self._calcular_altura(no.esquerda) - self._calcular_altura(no.direita)
 
     def _rotacionar_esquerda(self, no: NoAVL) -> NoAVL:
+        if self.metricas is not None:
+            self.metricas.incrementar('rotacoes_esquerda')
         f_dir = no.direita
         neto_dir_esq = f_dir.esquerda
 
@@ -84,10 +247,14 @@ class PerfilDisponibilidadeAVL:
 
         no.altura = 1 + max(self._calcular_altura(no.esquerda), self._calcular_altura(no.direita))
         f_dir.altura = 1 + max(self._calcular_altura(f_dir.esquerda), self._calcular_altura(f_dir.direita))
+        self._atualizar_agregados(no)
+        self._atualizar_agregados(f_dir)
 
         return f_dir
 
     def _rotacionar_direita(self, no: NoAVL) -> NoAVL:
+        if self.metricas is not None:
+            self.metricas.incrementar('rotacoes_direita')
         f_esq = no.esquerda
         neto_esq_dir = f_esq.direita
 
@@ -110,10 +277,18 @@ class PerfilDisponibilidadeAVL:
 
         no.altura = 1 + max(self._calcular_altura(no.esquerda), self._calcular_altura(no.direita))
         f_esq.altura = 1 + max(self._calcular_altura(f_esq.esquerda), self._calcular_altura(f_esq.direita))
+        self._atualizar_agregados(no)
+        self._atualizar_agregados(f_esq)
 
         return f_esq
 
     def encontrar_ancora(self, tempo_inicio: int) -> Optional[NoAVL]:
+        if self.cache_ancoras is not None:
+            return self.cache_ancoras.encontrar(tempo_inicio)
+        if self.metricas is not None:
+            resultado, profundidade = self._buscar_ancora(tempo_inicio)
+            self.metricas.registrar('profundidade_busca', profundidade)
+            return resultado
         no = self.raiz
         resultado = None
         while no:
@@ -124,62 +299,150 @@ class PerfilDisponibilidadeAVL:
                 no = no.esquerda
         return resultado
 
-    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, List[Tuple[int, int]]]], int, int]:
-        ancora = self.encontrar_ancora(tempo_inicio)
-        if ancora is None or ancora.nRec < reqRec:
-            return None, 0, 0
-
-        intersec = ancora.intervalos.copy()
-        visitados = 0
-        total_possivel = 0
-
-        no = ancora
-        while no and no.tempo < tempo_fim:
-            total_possivel += 1
-
-            if no.nRec < reqRec:
-                return None, visitados, total_possivel
-
-            intersec = self._intersecao_intervalos(intersec, no.intervalos)
-            if self._contar_recursos(intersec) < reqRec:
-                return None, visitados, total_possivel
-
-            visitados += 1
-            no = self.sucessor(no)
-
-        if visitados == 0:
-            return None, visitados, total_possivel
-
-        return (ancora.tempo, intersec), visitados, total_possivel
+    def _buscar_ancora(self, tempo_inicio: int) -> Tuple[Optional[NoAVL], int]:
+        no = self.raiz
+        resultado = None
+        profundidade = 0
+        while no:
+            profundidade += 1
+            if no.tempo <= tempo_inicio:
+                resultado = no
+                no = no.direita
+            else:
+                no = no.esquerda
+        return resultado, profundidade
 
-    def sucessor(self, no: NoAVL) -> Optional[NoAVL]:
-        if no.direita:
-            return self._minimo(no.direita)
+    def _encontrar_anterior(self, tempo: int) -> Optional[NoAVL]:
+        no = self.raiz
+        resultado = None
+        while no:
+            if no.tempo < tempo:
+                resultado = no
+                no = no.direita
+            else:
+                no = no.esquerda
+        return resultado
 
+    def _decompor_janela(self, inicio: NoAVL, fim: NoAVL) -> List[Tuple[int, Recursos, int]]:
+        ancestrais = set()
+        no = inicio
+        while no:
+            ancestrais.add(no)
+            no = no.pai
+        lca = fim
+        while lca not in ancestrais:
+            lca = lca.pai
+
+        partes = [(lca.nRec, lca.intervalos, 1)]
+
+        if inicio is not lca:
+            partes.append((inicio.nRec, inicio.intervalos, 1))
+            if inicio.direita:
+                partes.append(self._parte_subarvore(inicio.direita))
+            no = inicio
+            while no.pai is not lca:
+                pai = no.pai
+                if pai.esquerda is no:
+                    partes.append((pai.nRec, pai.intervalos, 1))
+                    if pai.direita:
+                        partes.append(self._parte_subarvore(pai.direita))
+                no = pai
+
+        if fim is not lca:
+            partes.append((fim.nRec, fim.intervalos, 1))
+            if fim.esquerda:
+                partes.append(self._parte_subarvore(fim.esquerda))
+            no = fim
+            while no.pai is not lca:
+                pai = no.pai
+                if pai.direita is no:
+                    partes.append((pai.nRec, pai.intervalos, 1))
+                    if pai.esquerda:
+                        partes.append(self._parte_subarvore(pai.esquerda))
+                no = pai
+
+        return partes
+
+    def _parte_subarvore(self, no: NoAVL) -> Tuple[int, Recursos, int]:
+        return no.min_nRec, no.intersec_sub, no.tamanho
+
+    def descartar_ate(self, tempo: int) -> int:
+        ancora = self.encontrar_ancora(tempo)
+        if ancora is None:
+            return 0
+        self._invalidar_ancoras()
+        if self.diario is not None:
+            self.diario.registrar_descarte(tempo)
+
+        tamanho_anterior = self.raiz.tamanho
+        ancora.anterior = None
+        raiz = self._manter_a_partir(self.raiz, ancora)
+        raiz.pai = None
+        self.raiz = raiz
+        return tamanho_anterior - raiz.tamanho
+
+    def compactar(self) -> int:
+        if self.raiz is None:
+            return 0
+        self._invalidar_ancoras()
+
+        nos = []
+        no = self._minimo(self.raiz)
+        while no is not None:
+            proximo = no.proximo
+            if nos and self._mesma_disponibilidade(nos[-1], no.nRec, no.intervalos):
+                no.anterior = no.proximo = None
+            else:
+                if nos:
+                    nos[-1].proximo = no
+                no.anterior = nos[-1] if nos else None
+                nos.append(no)
+            no = proximo
+        nos[-1].proximo = None
+
+        removidos = self.raiz.tamanho - len(nos)
+        self.raiz = self._construir_balanceada(nos, 0, len(nos), None)
+        self.maximo = nos[-1]
+        return removidos
+
+    def _manter_a_partir(self, no: NoAVL, ancora: NoAVL) -> NoAVL:
+        esquerda = no.esquerda
+        direita = no.direita
+        if esquerda:
+            esquerda.pai = None
+        if direita:
+            direita.pai = None
+
+        if no is ancora:
+            return self._juntar(None, no, direita)
+        if no.tempo > ancora.tempo:
+            return self._juntar(self._manter_a_partir(esquerda, ancora), no, direita)
+        return self._manter_a_partir(direita, ancora)
+
+    def _encadear(self, no: NoAVL):
         pai = no.pai
-        while pai and no == pai.direita:
-            no = pai
-            pai = pai.pai
-        return pai
+        if pai is None:
+            return
+        if pai.esquerda is no:
+            no.anterior = pai.anterior
+            no.proximo = pai
+        else:
+            no.anterior = pai
+            no.proximo = pai.proximo
+        if no.anterior is not None:
+            no.anterior.proximo = no
+        if no.proximo is not None:
+            no.proximo.anterior = no
 
     def _minimo(self, no: NoAVL) -> NoAVL:
         while no.esquerda:
             no = no.esquerda
         return no
 
-    def _intersecao_intervalos(self, a: List[Tuple[int, int]], b: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
-        resultado = []
-        i = j = 0
-        while i < len(a) and j < len(b):
-            comeco = max(a[i][0], b[j][0])
-            fim = min(a[i][1], b[j][1])
-            if comeco <= fim:
-                resultado.append((comeco, fim))
-            if a[i][1] < b[j][1]:
-                i += 1
-            else:
-                j += 1
-        return resultado
+    def _primeiro(self) -> Optional[NoAVL]:
+        if self.raiz is None:
+            return None
+        return self._minimo(self.raiz)
 
-    def _contar_recursos(self, intervalos: List[Tuple[int, int]]) -> int:
-        return sum(fim - comeco + 1 for comeco, fim in intervalos)
\ No newline at end of file
+    def __len__(self) -> int:
+        return self.raiz.tamanho if self.raiz is not None else 0
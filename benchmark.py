@@ -0,0 +1,241 @@
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+from avl import PerfilDisponibilidadeAVL
+from blocos import PerfilDisponibilidadeBlocos
+from bmais import PerfilDisponibilidadeBMais
+from carga import despachante, gerar_sintetica
+from compacto import PerfilDisponibilidadeCompacto
+from persistente import PerfilPersistenteAVL
+from recursos import BITSET, INTERVALOS, intervalos_para_bitset
+from rubronegra import PerfilDisponibilidadeRN
+
+BACKENDS: Dict[str, Tuple[Callable, Callable, Tuple[str, ...]]] = {}
+CARGAS: Dict[str, Callable] = {}
+
+def registrar_backend(nome: str, criar: Callable, construir: Callable, formatos: Tuple[str, ...] = (INTERVALOS, BITSET)):
+    BACKENDS[nome] = (criar, construir, formatos)
+
+def registrar_carga(nome: str):
+    def decorador(funcao: Callable) -> Callable:
+        CARGAS[nome] = funcao
+        return funcao
+    return decorador
+
+registrar_backend('avl', PerfilDisponibilidadeAVL, PerfilDisponibilidadeAVL.construir_de_ordenados)
+registrar_backend('rn', PerfilDisponibilidadeRN, PerfilDisponibilidadeRN.construir_de_ordenados)
+registrar_backend('bmais', PerfilDisponibilidadeBMais, PerfilDisponibilidadeBMais.construir_de_ordenados)
+registrar_backend('blocos', PerfilDisponibilidadeBlocos, PerfilDisponibilidadeBlocos.construir_de_ordenados)
+registrar_backend('persistente', PerfilPersistenteAVL, PerfilPersistenteAVL.construir_de_ordenados)
+registrar_backend('compacto', PerfilDisponibilidadeCompacto, PerfilDisponibilidadeCompacto.construir_de_ordenados)
+
+def gerar_recursos(nRec: int, total_recursos: int, formato: str = INTERVALOS):
+    intervalos = [(i, i + nRec - 1) for i in range(0, total_recursos - nRec + 1, nRec)]
+    if formato == BITSET:
+        return intervalos_para_bitset(intervalos)
+    return intervalos
+
+def gerar_chamadas(tempos: List[int], quantidade: int, rng: random.Random) -> List[Tuple[int, int, int]]:
+    chamadas = []
+    for _ in range(quantidade):
+        t0 = rng.choice(tempos[:-100] or tempos)
+        chamadas.append((t0, t0 + rng.randint(200, 1000), rng.randint(1, 3)))
+    return chamadas
+
+def _cronometrar(funcao: Callable, argumentos: List[tuple]) -> List[int]:
+    latencias = []
+    relogio = time.perf_counter_ns
+    for args in argumentos:
+        inicio = relogio()
+        funcao(*args)
+        latencias.append(relogio() - inicio)
+    return latencias
+
+@registrar_carga('insercao')
+def carga_insercao(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    criar, _, _ = BACKENDS[backend]
+    perfil = criar(formato)
+    recursos = gerar_recursos(nRec, 2 * nRec, formato)
+    tempos = rng.sample(range(0, 10000000000, 50), operacoes)
+    return _cronometrar(perfil.criar_no, [(t, nRec, recursos) for t in tempos])
+
+def _preparar(backend: str, formato: str, nos: int, nRec: int, rng: random.Random):
+    _, construir, _ = BACKENDS[backend]
+    recursos = gerar_recursos(nRec, 2 * nRec, formato)
+    tempos = sorted(rng.sample(range(0, 10000000000, 50), nos))
+    return construir(((t, nRec, recursos) for t in tempos), formato), tempos
+
+@registrar_carga('busca')
+def carga_busca(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    perfil, tempos = _preparar(backend, formato, nos, nRec, rng)
+    return _cronometrar(perfil.encontrar_ancora, [(rng.choice(tempos),) for _ in range(operacoes)])
+
+def _consultas_locais(tempos: List[int], quantidade: int, rng: random.Random) -> List[Tuple[int, int, int]]:
+    indice = rng.randrange(len(tempos))
+    chamadas = []
+    for _ in range(quantidade):
+        indice = min(len(tempos) - 1, max(0, indice + rng.randint(-4, 4))) if rng.random() < 0.95 else rng.randrange(len(tempos))
+        t0 = tempos[indice] + rng.randrange(50)
+        chamadas.append((t0, t0 + rng.randint(200, 1000), rng.randint(1, 3)))
+    return chamadas
+
+@registrar_carga('local')
+def carga_local(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    perfil, tempos = _preparar(backend, formato, nos, nRec, rng)
+    return _cronometrar(perfil.confirmar_disponibilidade, _consultas_locais(tempos, operacoes, rng))
+
+@registrar_carga('local_cache')
+def carga_local_cache(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    perfil, tempos = _preparar(backend, formato, nos, nRec, rng)
+    if not hasattr(perfil, 'ativar_cache_ancoras'):
+        return _cronometrar(perfil.confirmar_disponibilidade, _consultas_locais(tempos, operacoes, rng))
+    cache = perfil.ativar_cache_ancoras(largura_balde=1000)
+    latencias = _cronometrar(perfil.confirmar_disponibilidade, _consultas_locais(tempos, operacoes, rng))
+    estatisticas = cache.como_dict()
+    return latencias, {'cache_taxa_acerto': estatisticas['taxa_acerto'], 'cache_profundidade_media': estatisticas['profundidade_media']}
+
+@registrar_carga('requisicao')
+def carga_requisicao(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    perfil, tempos = _preparar(backend, formato, nos, nRec, rng)
+    return _cronometrar(perfil.confirmar_disponibilidade, gerar_chamadas(tempos, operacoes, rng))
+
+@registrar_carga('reserva')
+def carga_reserva(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    perfil, tempos = _preparar(backend, formato, nos, nRec, rng)
+    return _cronometrar(perfil.reservar, gerar_chamadas(tempos, operacoes, rng))
+
+@registrar_carga('misto')
+def carga_mista(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    perfil, tempos = _preparar(backend, formato, nos, nRec, rng)
+    recursos = gerar_recursos(nRec, 2 * nRec, formato)
+    operacoes_mistas = []
+    for t0, t1, req in gerar_chamadas(tempos, operacoes, rng):
+        sorteio = rng.random()
+        if sorteio < 0.2:
+            operacoes_mistas.append((perfil.criar_no, (t0 + 25, nRec, recursos)))
+        elif sorteio < 0.4:
+            operacoes_mistas.append((perfil.reservar, (t0, t1, req)))
+        elif sorteio < 0.6:
+            operacoes_mistas.append((perfil.encontrar_ancora, (t0,)))
+        else:
+            operacoes_mistas.append((perfil.confirmar_disponibilidade, (t0, t1, req)))
+    return _cronometrar(lambda funcao, args: funcao(*args), operacoes_mistas)
+
+@registrar_carga('sintetica')
+def carga_sintetica(backend: str, formato: str, nos: int, operacoes: int, nRec: int, rng: random.Random) -> List[int]:
+    _, construir, _ = BACKENDS[backend]
+    total_recursos = 2 * nRec
+    perfil = construir([(0, total_recursos, gerar_recursos(total_recursos, total_recursos, formato))], formato)
+    executar = despachante(perfil)
+    latencias = []
+    relogio = time.perf_counter_ns
+    for tipo, args in gerar_sintetica(total_recursos, req_normal=nRec // 3 or 1, formato=formato,
+                                      semente=rng.random(), quantidade=operacoes):
+        inicio = relogio()
+        executar[tipo](*args)
+        latencias.append(relogio() - inicio)
+    return latencias
+
+def percentil(ordenados: List[int], p: float) -> int:
+    indice = max(0, min(len(ordenados) - 1, -(-len(ordenados) * p // 100) - 1))
+    return ordenados[int(indice)]
+
+def medir(backend: str, carga: str, formato: str, nos: int, operacoes: int, nRec: int, semente: int, memoria: bool = True) -> dict:
+    latencias = CARGAS[carga](backend, formato, nos, operacoes, nRec, random.Random(semente))
+    latencias, extras = latencias if isinstance(latencias, tuple) else (latencias, {})
+    latencias.sort()
+    total = sum(latencias)
+    resultado = {
+        'backend': backend,
+        'carga': carga,
+        'formato': formato,
+        'operacoes': len(latencias),
+        'p50_us': percentil(latencias, 50) / 1000,
+        'p95_us': percentil(latencias, 95) / 1000,
+        'p99_us': percentil(latencias, 99) / 1000,
+        'vazao_ops': len(latencias) / (total / 1e9) if total else 0.0,
+        'pico_memoria_bytes': None,
+    }
+    resultado.update(extras)
+
+    if memoria:
+        tracemalloc.start()
+        try:
+            CARGAS[carga](backend, formato, nos, operacoes, nRec, random.Random(semente))
+            resultado['pico_memoria_bytes'] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return resultado
+
+def comparar(resultados: List[dict], referencia: List[dict], limiar: float) -> List[str]:
+    anteriores = {(r['backend'], r['carga'], r['formato']): r for r in referencia}
+    regressoes = []
+    for atual in resultados:
+        anterior = anteriores.get((atual['backend'], atual['carga'], atual['formato']))
+        if anterior is None:
+            continue
+        for metrica in ('p50_us', 'p95_us', 'p99_us'):
+            if anterior[metrica] and atual[metrica] > anterior[metrica] * (1 + limiar):
+                regressoes.append(f"{atual['backend']}/{atual['carga']}/{atual['formato']}: {metrica} "
+                                  f"{anterior[metrica]:.2f} -> {atual[metrica]:.2f}")
+        if anterior['vazao_ops'] and atual['vazao_ops'] < anterior['vazao_ops'] / (1 + limiar):
+            regressoes.append(f"{atual['backend']}/{atual['carga']}/{atual['formato']}: vazao_ops "
+                              f"{anterior['vazao_ops']:.0f} -> {atual['vazao_ops']:.0f}")
+    return regressoes
+
+def imprimir(resultados: List[dict]):
+    print(f"{'backend':<12} {'carga':<11} {'formato':<10} {'p50 µs':>9} {'p95 µs':>9} {'p99 µs':>9} {'ops/s':>11} {'pico MB':>9}")
+    for r in resultados:
+        pico = f"{r['pico_memoria_bytes'] / (1024 ** 2):.2f}" if r['pico_memoria_bytes'] is not None else '-'
+        print(f"{r['backend']:<12} {r['carga']:<11} {r['formato']:<10} {r['p50_us']:>9.2f} {r['p95_us']:>9.2f} "
+              f"{r['p99_us']:>9.2f} {r['vazao_ops']:>11.0f} {pico:>9}")
+        if 'cache_taxa_acerto' in r:
+            print(f"{'':<12} cache: taxa de acerto {r['cache_taxa_acerto']:.1%}, profundidade média {r['cache_profundidade_media']:.2f}")
+
+def main(argumentos: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='Benchmark unificado dos perfis de disponibilidade.')
+    parser.add_argument('--backends', nargs='+', default=list(BACKENDS), choices=list(BACKENDS))
+    parser.add_argument('--cargas', nargs='+', default=list(CARGAS), choices=list(CARGAS))
+    parser.add_argument('--formatos', nargs='+', default=[INTERVALOS], choices=[INTERVALOS, BITSET])
+    parser.add_argument('--nos', type=int, default=15000)
+    parser.add_argument('--operacoes', type=int, default=15000)
+    parser.add_argument('--nrec', type=int, default=10)
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--sem-memoria', action='store_true', help='não mede o pico de memória com tracemalloc')
+    parser.add_argument('--saida', help='arquivo JSON onde gravar os resultados')
+    parser.add_argument('--referencia', help='arquivo JSON de uma execução anterior para comparação')
+    parser.add_argument('--limiar', type=float, default=0.10, help='regressão relativa tolerada (0.10 = 10%%)')
+    opcoes = parser.parse_args(argumentos)
+
+    resultados = []
+    for backend in opcoes.backends:
+        for formato in opcoes.formatos:
+            if formato not in BACKENDS[backend][2]:
+                continue
+            for carga in opcoes.cargas:
+                resultados.append(medir(backend, carga, formato, opcoes.nos, opcoes.operacoes, opcoes.nrec,
+                                        opcoes.semente, not opcoes.sem_memoria))
+    imprimir(resultados)
+
+    if opcoes.saida:
+        configuracao = {chave: valor for chave, valor in vars(opcoes).items() if chave not in ('saida', 'referencia')}
+        with open(opcoes.saida, 'w', encoding='utf-8') as arquivo:
+            json.dump({'configuracao': configuracao, 'resultados': resultados}, arquivo, indent=2, ensure_ascii=False)
+
+    if opcoes.referencia:
+        with open(opcoes.referencia, encoding='utf-8') as arquivo:
+            regressoes = comparar(resultados, json.load(arquivo)['resultados'], opcoes.limiar)
+        if regressoes:
+            print(f"\nRegressões acima de {opcoes.limiar:.0%}:")
+            for regressao in regressoes:
+                print(f"  {regressao}")
+            return 1
+        print(f"\nNenhuma regressão acima de {opcoes.limiar:.0%}.")
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,13 +1,11 @@
-from pympler import asizeof
-from benchmarks_individuais import gerar_intervalos
-from avl import PerfilDisponibilidadeAVL
-from rubronegra import PerfilDisponibilidadeRN
+from benchmarks_individuais import PERFIS, gerar_intervalos
 import random
 import time
-import pandas as pd
-import openpyxl
 
 def coletar_dados_benchmark(nRec, intervalos, buscas_por_repeticao):
+    import pandas as pd
+    from pympler import asizeof
+
     print("Iniciando benchmarks para coleta de dados...")
 
     nos_variacoes = [1000 * i for i in range(1, 21)]
@@ -21,51 +19,9 @@ def coletar_dados_benchmark(nRec, intervalos, buscas_por_repeticao):
 
     for i in range(repeticoes):
         quantidade_nos = nos_variacoes[i]
-
-        # --- Benchmark de Inserção e Memória ---
         tempos = sorted(random.sample(range(0, 100000000, 50), quantidade_nos))
-        perfilRN = PerfilDisponibilidadeRN()
-        start = time.perf_counter()
-        for t in tempos:
-            perfilRN.criar_no(t, nRec, intervalos)
-        tempo_ins_rn = time.perf_counter() - start
-        mem_rn = asizeof.asizeof(perfilRN)
-
-        perfilAVL = PerfilDisponibilidadeAVL()
-        start = time.perf_counter()
-        for t in tempos:
-            perfilAVL.criar_no(t, nRec, intervalos)
-        tempo_ins_avl = time.perf_counter() - start
-        mem_avl = asizeof.asizeof(perfilAVL)
-
-        df_ins_mem_list.extend([
-            {'Árvore': 'Rubro-Negra', 'Tipo': 'Inserção', 'Tamanho': quantidade_nos, 'Valor': tempo_ins_rn, 'Unidade': 's'},
-            {'Árvore': 'AVL',         'Tipo': 'Inserção', 'Tamanho': quantidade_nos, 'Valor': tempo_ins_avl, 'Unidade': 's'},
-        ])
-
-        df_mem_list.extend([
-            {'Árvore': 'Rubro-Negra', 'Tipo': 'Memória', 'Tamanho': quantidade_nos, 'Valor': mem_rn / (1024 ** 2), 'Unidade': 'MB'},
-            {'Árvore': 'AVL',         'Tipo': 'Memória', 'Tamanho': quantidade_nos, 'Valor': mem_avl / (1024 ** 2), 'Unidade': 'MB'},
-        ])
-
-        # --- Benchmark de Buscas ---
         tempos_busca = random.sample(tempos, buscas_por_repeticao)
-        start = time.perf_counter()
-        for t in tempos_busca:
-            perfilRN.encontrar_ancora(t)
-        tempo_busca_rn = time.perf_counter() - start
-
-        start = time.perf_counter()
-        for t in tempos_busca:
-            perfilAVL.encontrar_ancora(t)
-        tempo_busca_avl = time.perf_counter() - start
-
-        df_busca_list.extend([
-            {'Árvore': 'Rubro-Negra', 'Tipo': 'Busca', 'Tamanho': quantidade_nos, 'Valor': tempo_busca_rn, 'Unidade': 's'},
-            {'Árvore': 'AVL',         'Tipo': 'Busca', 'Tamanho': quantidade_nos, 'Valor': tempo_busca_avl, 'Unidade': 's'},
-        ])
-
-        # --- Benchmark de Requisições ---
+
         qtd_chamadas = qtd_chamadas_variacoes[i]
         chamadas = []
         for _ in range(qtd_chamadas):
@@ -75,20 +31,38 @@ def coletar_dados_benchmark(nRec, intervalos, buscas_por_repeticao):
             req = random.randint(1, 3)
             chamadas.append((t0, t1, req))
 
-        start = time.perf_counter()
-        for t0, t1, req in chamadas:
-            perfilRN.confirmar_disponibilidade(t0, t1, req)
-        tempo_req_rn = time.perf_counter() - start
-
-        start = time.perf_counter()
-        for t0, t1, req in chamadas:
-            perfilAVL.confirmar_disponibilidade(t0, t1, req)
-        tempo_req_avl = time.perf_counter() - start
-
-        df_req_list.extend([
-            {'Árvore': 'Rubro-Negra', 'Tipo': 'Requisição', 'Chamadas': qtd_chamadas, 'Valor': tempo_req_rn, 'Unidade': 's'},
-            {'Árvore': 'AVL',         'Tipo': 'Requisição', 'Chamadas': qtd_chamadas, 'Valor': tempo_req_avl, 'Unidade': 's'},
-        ])
+        for nome, classe in PERFIS:
+            # --- Benchmark de Inserção e Memória ---
+            perfil = classe()
+            start = time.perf_counter()
+            for t in tempos:
+                perfil.criar_no(t, nRec, intervalos)
+            tempo_ins = time.perf_counter() - start
+            mem = asizeof.asizeof(perfil)
+
+            start = time.perf_counter()
+            classe.construir_de_ordenados((t, nRec, intervalos) for t in tempos)
+            tempo_lote = time.perf_counter() - start
+
+            df_ins_mem_list.extend([
+                {'Árvore': nome, 'Tipo': 'Inserção', 'Tamanho': quantidade_nos, 'Valor': tempo_ins, 'Unidade': 's'},
+                {'Árvore': nome, 'Tipo': 'Carga em lote', 'Tamanho': quantidade_nos, 'Valor': tempo_lote, 'Unidade': 's'},
+            ])
+            df_mem_list.append({'Árvore': nome, 'Tipo': 'Memória', 'Tamanho': quantidade_nos, 'Valor': mem / (1024 ** 2), 'Unidade': 'MB'})
+
+            # --- Benchmark de Buscas ---
+            start = time.perf_counter()
+            for t in tempos_busca:
+                perfil.encontrar_ancora(t)
+            tempo_busca = time.perf_counter() - start
+            df_busca_list.append({'Árvore': nome, 'Tipo': 'Busca', 'Tamanho': quantidade_nos, 'Valor': tempo_busca, 'Unidade': 's'})
+
+            # --- Benchmark de Requisições ---
+            start = time.perf_counter()
+            for t0, t1, req in chamadas:
+                perfil.confirmar_disponibilidade(t0, t1, req)
+            tempo_req = time.perf_counter() - start
+            df_req_list.append({'Árvore': nome, 'Tipo': 'Requisição', 'Chamadas': qtd_chamadas, 'Valor': tempo_req, 'Unidade': 's'})
 
     return (
         pd.DataFrame(df_ins_mem_list),
@@ -108,7 +82,7 @@ if __name__ == '__main__':
 
     from IPython.display import display
 
-    print("📊 Tempo de Inserção por Tamanho:")
+    print("📊 Tempo de Inserção e Carga em Lote por Tamanho:")
     display(df_ins_mem)
 
     print("\n📦 Memória após Inserção:")
@@ -1,154 +1,238 @@
-from pympler import asizeof
 from avl import PerfilDisponibilidadeAVL
 from rubronegra import PerfilDisponibilidadeRN
+from bmais import PerfilDisponibilidadeBMais
+from blocos import PerfilDisponibilidadeBlocos
+from compacto import PerfilDisponibilidadeCompacto
+from recursos import BITSET, INTERVALOS, intervalos_para_bitset
+from servico import ServicoDisponibilidade
+from instantaneo import PerfilMapeado
+import os
 import random
+import tempfile
+import threading
 import time
 
-def gerar_intervalos(n, total_recursos):
-    return [(i, i + n - 1) for i in range(0, total_recursos - n + 1, n)]
+PERFIS = (
+    ("Árvore Rubro-Negra", PerfilDisponibilidadeRN),
+    ("Árvore AVL", PerfilDisponibilidadeAVL),
+    ("Árvore B+", PerfilDisponibilidadeBMais),
+    ("Lista em blocos", PerfilDisponibilidadeBlocos),
+)
 
-def benchmark_ins_mem(quantidade_nos, nRec, intervalos, repeticoes, imprimir_repeticoes):
-    tempos_insercao_RN = []
-    memorias_RN = []
-
-    tempos_insercao_AVL = []
-    memorias_AVL = []
-
-    for i in range(repeticoes):
-        tempos = sorted(random.sample(range(0, 10000000000, 50), quantidade_nos))
-
-        perfilRN = PerfilDisponibilidadeRN()
+def gerar_intervalos(n, total_recursos, formato=INTERVALOS):
+    intervalos = [(i, i + n - 1) for i in range(0, total_recursos - n + 1, n)]
+    if formato == BITSET:
+        return intervalos_para_bitset(intervalos)
+    return intervalos
 
-        start_insercao_RN = time.perf_counter()
-        for t in tempos:
-            perfilRN.criar_no(t, nRec, intervalos)
-        tempos_insercao_RN.append(time.perf_counter() - start_insercao_RN)
-
-        memoria_RN = asizeof.asizeof(perfilRN)
-        memorias_RN.append(memoria_RN)
+def benchmark_ins_mem(quantidade_nos, nRec, intervalos, repeticoes, imprimir_repeticoes):
+    from pympler import asizeof
 
-        perfilAVL = PerfilDisponibilidadeAVL()
+    for nome, classe in PERFIS + (("Árvore Rubro-Negra compacta", PerfilDisponibilidadeCompacto),):
+        tempos_insercao = []
+        tempos_lote = []
+        memorias = []
 
-        start_insercao_AVL = time.perf_counter()
-        for t in tempos:
-            perfilAVL.criar_no(t, nRec, intervalos)
-        tempos_insercao_AVL.append(time.perf_counter() - start_insercao_AVL)
+        for i in range(repeticoes):
+            tempos = sorted(random.sample(range(0, 10000000000, 50), quantidade_nos))
 
-        memoria_AVL = asizeof.asizeof(perfilAVL)
-        memorias_AVL.append(memoria_AVL)
+            perfil = classe()
+            start = time.perf_counter()
+            for t in tempos:
+                perfil.criar_no(t, nRec, intervalos)
+            tempos_insercao.append(time.perf_counter() - start)
+            memorias.append(asizeof.asizeof(perfil))
 
-        if imprimir_repeticoes:
-          print(f"Repetição {i+1}:")
-          print(f"[RN]  Inserção={tempos_insercao_RN[-1]:.4f}s, Memória={memoria_RN / (1024**2):.4f} MB")
-          print(f"[AVL] Inserção={tempos_insercao_AVL[-1]:.4f}s, Memória={memoria_AVL / (1024**2):.4f} MB\n")
+            start = time.perf_counter()
+            classe.construir_de_ordenados((t, nRec, intervalos) for t in tempos)
+            tempos_lote.append(time.perf_counter() - start)
 
-    print("\n===== Árvore Rubro-Negra =====")
-    print(f"\nMédia de inserção: {sum(tempos_insercao_RN)/repeticoes:.4f} s")
-    print(f"Média de memória: {sum(memorias_RN)/repeticoes / (1024**2):.4f} MB\n")
+            if imprimir_repeticoes:
+                print(f"[{nome}] Repetição {i+1}: Inserção={tempos_insercao[-1]:.4f}s, Carga em lote={tempos_lote[-1]:.4f}s, "
+                      f"Memória={memorias[-1] / (1024**2):.4f} MB")
 
-    print("===== Árvore AVL =====")
-    print(f"\nMédia de inserção: {sum(tempos_insercao_AVL)/repeticoes:.4f} s")
-    print(f"Média de memória: {sum(memorias_AVL)/repeticoes / (1024**2):.4f} MB\n")
+        print(f"\n===== {nome} =====")
+        print(f"Média de inserção: {sum(tempos_insercao)/repeticoes:.4f} s")
+        print(f"Média de carga em lote: {sum(tempos_lote)/repeticoes:.4f} s")
+        print(f"Média de memória: {sum(memorias)/repeticoes / (1024**2):.4f} MB\n")
 
 def benchmark_buscas(quantidade_nos, nRec, intervalos, repeticoes, buscas_por_repeticao, imprimir_repeticoes):
     tempos = sorted(random.sample(range(0, 10000000000, 50), quantidade_nos))
-    tempos_busca_RN = []
-    tempos_busca_AVL = []
-
-    perfilRN = PerfilDisponibilidadeRN()
-    perfilAVL = PerfilDisponibilidadeAVL()
-
-    for t in tempos:
-            perfilRN.criar_no(t, nRec, intervalos)
-            perfilAVL.criar_no(t, nRec, intervalos)
+    perfis = [(nome, classe.construir_de_ordenados((t, nRec, intervalos) for t in tempos)) for nome, classe in PERFIS]
+    tempos_busca = {nome: [] for nome, _ in perfis}
 
     for i in range(repeticoes):
         tempos_para_busca = random.sample(tempos, buscas_por_repeticao)
 
-        start_busca_RN = time.perf_counter()
-        for t_busca in tempos_para_busca:
-            _ = perfilRN.encontrar_ancora(t_busca)
-        tempos_busca_RN.append(time.perf_counter() - start_busca_RN)
-
-        start_busca_AVL = time.perf_counter()
-        for t_busca in tempos_para_busca:
-            _ = perfilAVL.encontrar_ancora(t_busca)
-        tempos_busca_AVL.append(time.perf_counter() - start_busca_AVL)
+        for nome, perfil in perfis:
+            start = time.perf_counter()
+            for t_busca in tempos_para_busca:
+                _ = perfil.encontrar_ancora(t_busca)
+            tempos_busca[nome].append(time.perf_counter() - start)
 
-        if imprimir_repeticoes:
-          print(f"Repetição {i+1}:")
-          print(f"[RN]  Buscas={tempos_busca_RN[-1]:.4f}s")
-          print(f"[AVL] Buscas={tempos_busca_AVL[-1]:.4f}s\n")
+            if imprimir_repeticoes:
+                print(f"[{nome}] Repetição {i+1}: Buscas={tempos_busca[nome][-1]:.4f}s")
 
-    print("\n===== Árvore Rubro-Negra =====")
-    print(f"Média de buscas: {sum(tempos_busca_RN)/repeticoes:.4f} s")
+    for nome, _ in perfis:
+        print(f"\n===== {nome} =====")
+        print(f"Média de buscas: {sum(tempos_busca[nome])/repeticoes:.4f} s")
 
-    print("===== Árvore AVL =====")
-    print(f"Média de buscas: {sum(tempos_busca_AVL)/repeticoes:.4f} s")
-
-def benchmark_req(quantidade_nos, nRec, intervalos, qtd_chamadas, repeticoes, imprimir_repeticoes):
+def benchmark_req(quantidade_nos, nRec, intervalos, qtd_chamadas, repeticoes, imprimir_repeticoes, formato=INTERVALOS):
     tempos = sorted(random.sample(range(0, 10000000000, 50), quantidade_nos))
-    tempos_req_RN = []
-    tempos_req_AVL = []
-
-    perfilRN = PerfilDisponibilidadeRN()
-    perfilAVL = PerfilDisponibilidadeAVL()
-
-    for t in tempos:
-        perfilRN.criar_no(t, nRec, intervalos)
-        perfilAVL.criar_no(t, nRec, intervalos)
-
+    perfis = [(nome, classe.construir_de_ordenados(((t, nRec, intervalos) for t in tempos), formato)) for nome, classe in PERFIS]
+    tempos_req = {nome: [] for nome, _ in perfis}
+    tempos_lote = {nome: [] for nome, _ in perfis}
 
     for i in range(repeticoes):
         chamadas = []
 
         for _ in range(qtd_chamadas):
             t0 = random.choice(tempos[:-100])
-            duracao = random.randint(200, 1000) 
+            duracao = random.randint(200, 1000)
             t1 = t0 + duracao
             req = random.randint(1, 3)
             chamadas.append((t0, t1, req))
 
-        total_visitado_RN = 0
-        total_possivel_RN = 0
-        sucessos_RN = 0
-
-        start_req_RN = time.perf_counter()
-        for t0, t1, req in chamadas:
-            _, visitado, possivel = perfilRN.confirmar_disponibilidade(t0, t1, req)
-            total_visitado_RN += visitado
-            total_possivel_RN += possivel
-            if visitado > 0:
-                sucessos_RN += 1
-        tempos_req_RN.append(time.perf_counter() - start_req_RN)
-
-        total_visitado_AVL = 0
-        total_possivel_AVL = 0
-        sucessos_AVL = 0
+        for nome, perfil in perfis:
+            sucessos = 0
+            start = time.perf_counter()
+            for t0, t1, req in chamadas:
+                resultado, _, _ = perfil.confirmar_disponibilidade(t0, t1, req)
+                if resultado is not None:
+                    sucessos += 1
+            tempos_req[nome].append(time.perf_counter() - start)
 
-        start_req_AVL = time.perf_counter()
-        for t0, t1, req in chamadas:
-            _, visitado, possivel = perfilAVL.confirmar_disponibilidade(t0, t1, req)
-            total_visitado_AVL += visitado
-            total_possivel_AVL += possivel
-            if visitado > 0:
-                sucessos_AVL += 1
-        tempos_req_AVL.append(time.perf_counter() - start_req_AVL)
+            start = time.perf_counter()
+            perfil.confirmar_lote(chamadas)
+            tempos_lote[nome].append(time.perf_counter() - start)
 
-        if imprimir_repeticoes:
-            print(f"=========Repetição {i+1}:=========")
-            print(f"[RN]  Tempo de processamento={tempos_req_RN[-1]:.4f}s")
-            print(f"[RN] Chamadas bem-sucedidas: {sucessos_RN}/{qtd_chamadas}")
+            if imprimir_repeticoes:
+                print(f"[{nome}] Repetição {i+1}: Tempo de processamento={tempos_req[nome][-1]:.4f}s, "
+                      f"Chamadas bem-sucedidas: {sucessos}/{qtd_chamadas}, Tempo em lote={tempos_lote[nome][-1]:.4f}s")
 
-            print(f"\n\n[AVL] Tempo de processamento={tempos_req_AVL[-1]:.4f}s")
-            print(f"[AVL] Chamadas bem-sucedidas: {sucessos_AVL}/{qtd_chamadas}\n")
+    for nome, _ in perfis:
+        print(f"\n===== {nome} =====")
+        print(f"Média de processamento de {qtd_chamadas} chamadas: {sum(tempos_req[nome])/repeticoes:.4f} s")
+        print(f"Média de processamento em lote: {sum(tempos_lote[nome])/repeticoes:.4f} s")
 
+def benchmark_reservas(quantidade_nos, nRec, intervalos, qtd_reservas, repeticoes, imprimir_repeticoes):
+    tempos_res = {nome: [] for nome, _ in PERFIS}
 
-    print("\n===== Árvore Rubro-Negra =====")
-    print(f"Média de processamento de {qtd_chamadas} chamadas: {sum(tempos_req_RN)/repeticoes:.4f} s")
+    for i in range(repeticoes):
+        tempos = sorted(random.sample(range(0, 10000000000, 50), quantidade_nos))
 
-    print("===== Árvore AVL =====")
-    print(f"Média de processamento de {qtd_chamadas} chamadas: {sum(tempos_req_AVL)/repeticoes:.4f} s")
+        reservas = []
+        for _ in range(qtd_reservas):
+            t0 = random.choice(tempos[:-100])
+            duracao = random.randint(200, 1000)
+            t1 = t0 + duracao
+            req = random.randint(1, 3)
+            reservas.append((t0, t1, req))
+
+        for nome, classe in PERFIS:
+            perfil = classe()
+            for t in tempos:
+                perfil.criar_no(t, nRec, intervalos)
+
+            sucessos = 0
+            start = time.perf_counter()
+            for t0, t1, req in reservas:
+                if perfil.reservar(t0, t1, req) is not None:
+                    sucessos += 1
+            tempos_res[nome].append(time.perf_counter() - start)
+
+            if imprimir_repeticoes:
+                print(f"[{nome}] Repetição {i+1}: Tempo de reservas={tempos_res[nome][-1]:.4f}s, "
+                      f"Reservas bem-sucedidas: {sucessos}/{qtd_reservas}")
+
+    for nome, _ in PERFIS:
+        print(f"\n===== {nome} =====")
+        print(f"Média de processamento de {qtd_reservas} reservas: {sum(tempos_res[nome])/repeticoes:.4f} s")
+
+def benchmark_instantaneo(quantidade_nos, nRec, intervalos, repeticoes, imprimir_repeticoes):
+    for nome, classe in PERFIS:
+        tempos_salvar = []
+        tempos_carregar = []
+        tempos_mapear = []
+        tempos_reinsercao = []
+
+        for i in range(repeticoes):
+            tempos = sorted(random.sample(range(0, 10000000000, 50), quantidade_nos))
+            perfil = classe.construir_de_ordenados((t, nRec, intervalos) for t in tempos)
+
+            with tempfile.TemporaryDirectory() as diretorio:
+                caminho = os.path.join(diretorio, 'perfil.bin')
+
+                start = time.perf_counter()
+                perfil.salvar(caminho)
+                tempos_salvar.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                classe.carregar(caminho)
+                tempos_carregar.append(time.perf_counter() - start)
+
+                start = time.perf_counter()
+                with PerfilMapeado(caminho) as mapeado:
+                    mapeado.confirmar_disponibilidade(tempos[0], tempos[0] + 1000, 1)
+                tempos_mapear.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            reinserido = classe()
+            for no in perfil:
+                reinserido.criar_no(no.tempo, no.nRec, no.intervalos)
+            tempos_reinsercao.append(time.perf_counter() - start)
+
+            if imprimir_repeticoes:
+                print(f"[{nome}] Repetição {i+1}: salvar={tempos_salvar[-1]:.4f}s, carregar={tempos_carregar[-1]:.4f}s, "
+                      f"mapear={tempos_mapear[-1]:.4f}s, reinserção={tempos_reinsercao[-1]:.4f}s")
+
+        print(f"\n===== {nome} =====")
+        print(f"Média para salvar {quantidade_nos} nós: {sum(tempos_salvar)/repeticoes:.4f} s")
+        print(f"Média para carregar: {sum(tempos_carregar)/repeticoes:.4f} s")
+        print(f"Média para mapear e consultar: {sum(tempos_mapear)/repeticoes:.4f} s")
+        print(f"Média de reinserção incremental: {sum(tempos_reinsercao)/repeticoes:.4f} s")
+
+def benchmark_concorrencia(quantidade_nos, nRec, intervalos, operacoes_por_thread, variacoes_threads, fracao_reservas, repeticoes):
+    for nome, classe in PERFIS:
+        print(f"\n===== {nome} =====")
+        for qtd_threads in variacoes_threads:
+            vazoes_otimista = []
+            vazoes_grupo = []
+
+            for _ in range(repeticoes):
+                tempos = sorted(random.sample(range(0, 10000000000, 50), quantidade_nos))
+                operacoes = []
+                for _ in range(qtd_threads * operacoes_por_thread):
+                    t0 = random.choice(tempos[:-100])
+                    t1 = t0 + random.randint(200, 1000)
+                    operacoes.append((random.random() < fracao_reservas, t0, t1, random.randint(1, 3)))
+
+                for em_grupo, vazoes in ((False, vazoes_otimista), (True, vazoes_grupo)):
+                    servico = ServicoDisponibilidade(classe.construir_de_ordenados((t, nRec, intervalos) for t in tempos))
+
+                    def trabalhador(inicio):
+                        pendentes = []
+                        for reserva, t0, t1, req in operacoes[inicio:inicio + operacoes_por_thread]:
+                            if not reserva:
+                                servico.confirmar_disponibilidade(t0, t1, req)
+                            elif em_grupo:
+                                pendentes.append(servico.reservar_em_grupo(t0, t1, req))
+                            else:
+                                servico.reservar(t0, t1, req)
+                        for futuro in pendentes:
+                            futuro.result()
+
+                    threads = [threading.Thread(target=trabalhador, args=(i * operacoes_por_thread,)) for i in range(qtd_threads)]
+                    start = time.perf_counter()
+                    for thread in threads:
+                        thread.start()
+                    for thread in threads:
+                        thread.join()
+                    vazoes.append(len(operacoes) / (time.perf_counter() - start))
+                    servico.fechar()
+
+            print(f"{qtd_threads} threads: {sum(vazoes_otimista)/repeticoes:.0f} ops/s (otimista), "
+                  f"{sum(vazoes_grupo)/repeticoes:.0f} ops/s (commit em grupo)")
 
 if __name__ == '__main__':
     quantidade_nos = 15000
@@ -164,4 +248,12 @@ if __name__ == '__main__':
     print(f"\n{buscas_por_repeticao} BUSCAS")
     benchmark_buscas(quantidade_nos, nRec, intervalos, repeticoes, buscas_por_repeticao, imprimir_repeticoes)
     print("\n REQUISIÇÕES")
-    benchmark_req(quantidade_nos, nRec, intervalos, qtd_chamadas, repeticoes, imprimir_repeticoes)
\ No newline at end of file
+    benchmark_req(quantidade_nos, nRec, intervalos, qtd_chamadas, repeticoes, imprimir_repeticoes)
+    print("\n REQUISIÇÕES (BITSET)")
+    benchmark_req(quantidade_nos, nRec, gerar_intervalos(nRec, 20, BITSET), qtd_chamadas, repeticoes, imprimir_repeticoes, BITSET)
+    print("\n RESERVAS")
+    benchmark_reservas(quantidade_nos, nRec, intervalos, qtd_chamadas, repeticoes, imprimir_repeticoes)
+    print("\n INSTANTÂNEO")
+    benchmark_instantaneo(quantidade_nos, nRec, intervalos, repeticoes, imprimir_repeticoes)
+    print("\n CONCORRÊNCIA (20% reservas)")
+    benchmark_concorrencia(quantidade_nos, nRec, intervalos, 2000, [1, 2, 4, 8], 0.2, repeticoes)
\ No newline at end of file
@@ -0,0 +1,259 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+from perfil import PerfilBase
+from recursos import INTERVALOS, PoolIntervalos, Recursos
+
+CARGA = 512
+
+class PontoBloco:
+    __slots__ = ('tempo', 'nRec', 'intervalos', 'anterior', 'proximo', 'bloco')
+
+    def __init__(self, tempo: int, nRec: int, intervalos: Recursos):
+        self.tempo = tempo
+        self.nRec = nRec
+        self.intervalos = intervalos
+
+        self.anterior = None
+        self.proximo = None
+        self.bloco = None
+
+class Bloco:
+    __slots__ = ('tempos', 'pontos', 'min_nRec', 'intersec_sub', 'sujo')
+
+    def __init__(self, pontos: List[PontoBloco]):
+        self.pontos = pontos
+        self.tempos = [ponto.tempo for ponto in pontos]
+        for ponto in pontos:
+            ponto.bloco = self
+
+        self.min_nRec = 0
+        self.intersec_sub = None
+        self.sujo = True
+
+class PerfilDisponibilidadeBlocos(PerfilBase):
+    def __init__(self, formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False, carga: int = CARGA):
+        super().__init__(formato, pool, coalescer)
+        self.carga = carga
+        self.blocos: List[Bloco] = []
+        self.primeiros: List[int] = []
+        self.quantidade = 0
+
+    @classmethod
+    def construir_de_ordenados(cls, iteravel: Iterable[Tuple[int, int, Recursos]], formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False) -> 'PerfilDisponibilidadeBlocos':
+        perfil = cls(formato, pool, coalescer)
+        pontos = []
+        for tempo, nRec, intervalos in iteravel:
+            if pontos and tempo < pontos[-1].tempo:
+                raise ValueError("construir_de_ordenados exige tempos em ordem crescente")
+            intervalos = perfil._preparar_recursos(intervalos)
+            if coalescer and pontos and perfil._mesma_disponibilidade(pontos[-1], nRec, intervalos):
+                continue
+            ponto = PontoBloco(tempo, nRec, intervalos)
+            if pontos:
+                ponto.anterior = pontos[-1]
+                pontos[-1].proximo = ponto
+            pontos.append(ponto)
+        perfil._construir(pontos)
+        return perfil
+
+    def _construir(self, pontos: List[PontoBloco]):
+        self.blocos = [Bloco(pontos[inicio:inicio + self.carga]) for inicio in range(0, len(pontos), self.carga)]
+        self.primeiros = [bloco.tempos[0] for bloco in self.blocos]
+        self.quantidade = len(pontos)
+        self.maximo = pontos[-1] if pontos else None
+
+    def __len__(self) -> int:
+        return self.quantidade
+
+    def _primeiro(self) -> Optional[PontoBloco]:
+        return self.blocos[0].pontos[0] if self.blocos else None
+
+    def _indice_bloco(self, ponto: PontoBloco) -> int:
+        indice = bisect_right(self.primeiros, ponto.tempo) - 1
+        while self.blocos[indice] is not ponto.bloco:
+            indice -= 1
+        return indice
+
+    def _posicao(self, ponto: PontoBloco) -> int:
+        bloco = ponto.bloco
+        indice = bisect_left(bloco.tempos, ponto.tempo)
+        while bloco.pontos[indice] is not ponto:
+            indice += 1
+        return indice
+
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[PontoBloco]:
+        if self.cache_ancoras is not None:
+            return self.cache_ancoras.encontrar(tempo_inicio)
+        if self.metricas is not None:
+            self.metricas.registrar('profundidade_busca', 2)
+        indice = bisect_right(self.primeiros, tempo_inicio) - 1
+        if indice < 0:
+            return None
+        bloco = self.blocos[indice]
+        return bloco.pontos[bisect_right(bloco.tempos, tempo_inicio) - 1]
+
+    def _buscar_ancora(self, tempo_inicio: int) -> Tuple[Optional[PontoBloco], int]:
+        indice = bisect_right(self.primeiros, tempo_inicio) - 1
+        if indice < 0:
+            return None, 1
+        bloco = self.blocos[indice]
+        return bloco.pontos[bisect_right(bloco.tempos, tempo_inicio) - 1], 2
+
+    def _encontrar_anterior(self, tempo: int) -> Optional[PontoBloco]:
+        indice = bisect_left(self.primeiros, tempo) - 1
+        if indice < 0:
+            return None
+        bloco = self.blocos[indice]
+        return bloco.pontos[bisect_left(bloco.tempos, tempo) - 1]
+
+    def _inserir_ponto(self, tempo: int, nRec: int, intervalos: Recursos) -> PontoBloco:
+        ponto = PontoBloco(tempo, nRec, intervalos)
+        self.quantidade += 1
+        if not self.blocos:
+            self.blocos.append(Bloco([ponto]))
+            self.primeiros.append(tempo)
+            self.maximo = ponto
+            return ponto
+
+        indice_bloco = max(0, bisect_right(self.primeiros, tempo) - 1)
+        bloco = self.blocos[indice_bloco]
+        indice = bisect_right(bloco.tempos, tempo)
+
+        if indice < len(bloco.pontos):
+            proximo = bloco.pontos[indice]
+            anterior = proximo.anterior
+        else:
+            anterior = bloco.pontos[indice - 1]
+            proximo = anterior.proximo
+        ponto.anterior = anterior
+        ponto.proximo = proximo
+        if anterior is not None:
+            anterior.proximo = ponto
+        if proximo is not None:
+            proximo.anterior = ponto
+        else:
+            self.maximo = ponto
+
+        bloco.tempos.insert(indice, tempo)
+        bloco.pontos.insert(indice, ponto)
+        ponto.bloco = bloco
+        bloco.sujo = True
+        if indice == 0:
+            self.primeiros[indice_bloco] = tempo
+
+        if len(bloco.pontos) > 2 * self.carga:
+            novo = Bloco(bloco.pontos[self.carga:])
+            del bloco.pontos[self.carga:]
+            del bloco.tempos[self.carga:]
+            self.blocos.insert(indice_bloco + 1, novo)
+            self.primeiros.insert(indice_bloco + 1, novo.tempos[0])
+        return ponto
+
+    def _remover_no(self, ponto: PontoBloco):
+        self._invalidar_ancoras()
+        anterior = ponto.anterior
+        proximo = ponto.proximo
+        if anterior is not None:
+            anterior.proximo = proximo
+        if proximo is not None:
+            proximo.anterior = anterior
+        if self.maximo is ponto:
+            self.maximo = anterior
+
+        indice_bloco = self._indice_bloco(ponto)
+        bloco = ponto.bloco
+        indice = self._posicao(ponto)
+        del bloco.pontos[indice]
+        del bloco.tempos[indice]
+        bloco.sujo = True
+        self.quantidade -= 1
+        ponto.anterior = ponto.proximo = ponto.bloco = None
+
+        if not bloco.pontos:
+            del self.blocos[indice_bloco]
+            del self.primeiros[indice_bloco]
+        elif indice == 0:
+            self.primeiros[indice_bloco] = bloco.tempos[0]
+
+    def _antecipar(self, ponto: PontoBloco, tempo: int):
+        indice_bloco = self._indice_bloco(ponto)
+        indice = self._posicao(ponto)
+        ponto.tempo = tempo
+        ponto.bloco.tempos[indice] = tempo
+        if indice == 0:
+            self.primeiros[indice_bloco] = tempo
+
+    def _atualizar_agregados_de(self, pontos: List[PontoBloco]):
+        for ponto in pontos:
+            ponto.bloco.sujo = True
+
+    def _parte_bloco(self, bloco: Bloco) -> Tuple[int, Recursos, int]:
+        if bloco.sujo:
+            min_nRec = bloco.pontos[0].nRec
+            intersec = bloco.pontos[0].intervalos
+            for ponto in bloco.pontos:
+                if ponto.nRec < min_nRec:
+                    min_nRec = ponto.nRec
+                if ponto.intervalos is not intersec and ponto.intervalos != intersec:
+                    intersec = self._intersecao_intervalos(intersec, ponto.intervalos)
+            bloco.min_nRec = min_nRec
+            bloco.intersec_sub = intersec
+            bloco.sujo = False
+        return bloco.min_nRec, bloco.intersec_sub, len(bloco.pontos)
+
+    def _decompor_janela(self, inicio: PontoBloco, fim: PontoBloco) -> List[Tuple[int, Recursos, int]]:
+        i = self._posicao(inicio)
+        j = self._posicao(fim)
+        if inicio.bloco is fim.bloco:
+            return [(ponto.nRec, ponto.intervalos, 1) for ponto in inicio.bloco.pontos[i:j + 1]]
+
+        partes = [(ponto.nRec, ponto.intervalos, 1) for ponto in inicio.bloco.pontos[i:]]
+        for bloco in self.blocos[self._indice_bloco(inicio) + 1:self._indice_bloco(fim)]:
+            partes.append(self._parte_bloco(bloco))
+        partes.extend((ponto.nRec, ponto.intervalos, 1) for ponto in fim.bloco.pontos[:j + 1])
+        return partes
+
+    def descartar_ate(self, tempo: int) -> int:
+        ancora = self.encontrar_ancora(tempo)
+        if ancora is None:
+            return 0
+        self._invalidar_ancoras()
+        if self.diario is not None:
+            self.diario.registrar_descarte(tempo)
+
+        indice_bloco = self._indice_bloco(ancora)
+        bloco = ancora.bloco
+        indice = self._posicao(ancora)
+        removidos = sum(len(anterior.pontos) for anterior in self.blocos[:indice_bloco]) + indice
+        del self.blocos[:indice_bloco]
+        del self.primeiros[:indice_bloco]
+        del bloco.pontos[:indice]
+        del bloco.tempos[:indice]
+        bloco.sujo = True
+        self.primeiros[0] = ancora.tempo
+        ancora.anterior = None
+        self.quantidade -= removidos
+        return removidos
+
+    def compactar(self) -> int:
+        if not self.blocos:
+            return 0
+        self._invalidar_ancoras()
+
+        pontos = []
+        ponto = self._primeiro()
+        while ponto is not None:
+            proximo = ponto.proximo
+            if pontos and self._mesma_disponibilidade(pontos[-1], ponto.nRec, ponto.intervalos):
+                ponto.anterior = ponto.proximo = ponto.bloco = None
+            else:
+                if pontos:
+                    pontos[-1].proximo = ponto
+                ponto.anterior = pontos[-1] if pontos else None
+                pontos.append(ponto)
+            ponto = proximo
+        pontos[-1].proximo = None
+
+        removidos = self.quantidade - len(pontos)
+        self._construir(pontos)
+        return removidos
@@ -0,0 +1,494 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Tuple
+from perfil import PerfilBase
+from recursos import INTERVALOS, PoolIntervalos, Recursos
+
+ORDEM = 64
+
+class PontoBMais:
+    __slots__ = ('tempo', 'nRec', 'intervalos', 'anterior', 'proximo', 'folha')
+
+    def __init__(self, tempo: int, nRec: int, intervalos: Recursos):
+        self.tempo = tempo
+        self.nRec = nRec
+        self.intervalos = intervalos
+
+        self.anterior = None
+        self.proximo = None
+        self.folha = None
+
+class NoBMais:
+    __slots__ = ('eh_folha', 'chaves', 'filhos', 'pai', 'proxima', 'tamanho', 'min_nRec', 'intersec_sub', 'sujo')
+
+    def __init__(self, eh_folha: bool):
+        self.eh_folha = eh_folha
+        self.chaves = []
+        self.filhos = []
+        self.pai = None
+        self.proxima = None
+
+        self.tamanho = 0
+        self.min_nRec = 0
+        self.intersec_sub = None
+        self.sujo = True
+
+class PerfilDisponibilidadeBMais(PerfilBase):
+    def __init__(self, formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False, ordem: int = ORDEM):
+        super().__init__(formato, pool, coalescer)
+        self.ordem = ordem
+        self.raiz = None
+        self.altura = 0
+
+    @classmethod
+    def construir_de_ordenados(cls, iteravel: Iterable[Tuple[int, int, Recursos]], formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False) -> 'PerfilDisponibilidadeBMais':
+        perfil = cls(formato, pool, coalescer)
+        pontos = []
+        for tempo, nRec, intervalos in iteravel:
+            if pontos and tempo < pontos[-1].tempo:
+                raise ValueError("construir_de_ordenados exige tempos em ordem crescente")
+            intervalos = perfil._preparar_recursos(intervalos)
+            if coalescer and pontos and perfil._mesma_disponibilidade(pontos[-1], nRec, intervalos):
+                continue
+            ponto = PontoBMais(tempo, nRec, intervalos)
+            if pontos:
+                ponto.anterior = pontos[-1]
+                pontos[-1].proximo = ponto
+            pontos.append(ponto)
+        perfil._construir(pontos)
+        return perfil
+
+    def _construir(self, pontos: List[PontoBMais]):
+        self.raiz = None
+        self.altura = 0
+        self.maximo = pontos[-1] if pontos else None
+        if not pontos:
+            return
+
+        nivel = []
+        primeiros = []
+        anterior = None
+        for inicio in range(0, len(pontos), self.ordem):
+            folha = NoBMais(True)
+            folha.filhos = pontos[inicio:inicio + self.ordem]
+            folha.chaves = [ponto.tempo for ponto in folha.filhos]
+            folha.tamanho = len(folha.filhos)
+            for ponto in folha.filhos:
+                ponto.folha = folha
+            if anterior is not None:
+                anterior.proxima = folha
+            anterior = folha
+            nivel.append(folha)
+            primeiros.append(folha.chaves[0])
+        altura = 1
+
+        while len(nivel) > 1:
+            acima = []
+            primeiros_acima = []
+            for inicio in range(0, len(nivel), self.ordem):
+                no = NoBMais(False)
+                no.filhos = nivel[inicio:inicio + self.ordem]
+                no.chaves = primeiros[inicio + 1:inicio + len(no.filhos)]
+                for filho in no.filhos:
+                    filho.pai = no
+                    no.tamanho += filho.tamanho
+                acima.append(no)
+                primeiros_acima.append(primeiros[inicio])
+            nivel = acima
+            primeiros = primeiros_acima
+            altura += 1
+
+        self.raiz = nivel[0]
+        self.altura = altura
+
+    def __len__(self) -> int:
+        return self.raiz.tamanho if self.raiz is not None else 0
+
+    def _posicao(self, ponto: PontoBMais) -> int:
+        folha = ponto.folha
+        indice = bisect_left(folha.chaves, ponto.tempo)
+        while folha.filhos[indice] is not ponto:
+            indice += 1
+        return indice
+
+    def _primeiro(self) -> Optional[PontoBMais]:
+        if self.raiz is None:
+            return None
+        no = self.raiz
+        while not no.eh_folha:
+            no = no.filhos[0]
+        return no.filhos[0]
+
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[PontoBMais]:
+        if self.cache_ancoras is not None:
+            return self.cache_ancoras.encontrar(tempo_inicio)
+        if self.raiz is None:
+            return None
+        if self.metricas is not None:
+            self.metricas.registrar('profundidade_busca', self.altura)
+        no = self.raiz
+        while not no.eh_folha:
+            no = no.filhos[bisect_right(no.chaves, tempo_inicio)]
+        indice = bisect_right(no.chaves, tempo_inicio)
+        if indice:
+            return no.filhos[indice - 1]
+        return no.filhos[0].anterior
+
+    def _buscar_ancora(self, tempo_inicio: int) -> Tuple[Optional[PontoBMais], int]:
+        if self.raiz is None:
+            return None, 0
+        no = self.raiz
+        while not no.eh_folha:
+            no = no.filhos[bisect_right(no.chaves, tempo_inicio)]
+        indice = bisect_right(no.chaves, tempo_inicio)
+        if indice:
+            return no.filhos[indice - 1], self.altura
+        return no.filhos[0].anterior, self.altura
+
+    def _encontrar_anterior(self, tempo: int) -> Optional[PontoBMais]:
+        if self.raiz is None:
+            return None
+        no = self.raiz
+        while not no.eh_folha:
+            no = no.filhos[bisect_left(no.chaves, tempo)]
+        indice = bisect_left(no.chaves, tempo)
+        if indice:
+            return no.filhos[indice - 1]
+        return no.filhos[0].anterior
+
+    def _inserir_ponto(self, tempo: int, nRec: int, intervalos: Recursos) -> PontoBMais:
+        ponto = PontoBMais(tempo, nRec, intervalos)
+        if self.raiz is None:
+            folha = NoBMais(True)
+            folha.chaves.append(tempo)
+            folha.filhos.append(ponto)
+            folha.tamanho = 1
+            ponto.folha = folha
+            self.raiz = folha
+            self.altura = 1
+            self.maximo = ponto
+            return ponto
+
+        if tempo >= self.maximo.tempo:
+            folha = self.maximo.folha
+            indice = len(folha.filhos)
+        else:
+            folha = self.raiz
+            while not folha.eh_folha:
+                folha = folha.filhos[bisect_right(folha.chaves, tempo)]
+            indice = bisect_right(folha.chaves, tempo)
+
+        if indice < len(folha.filhos):
+            proximo = folha.filhos[indice]
+            anterior = proximo.anterior
+        else:
+            anterior = folha.filhos[indice - 1]
+            proximo = anterior.proximo
+        ponto.anterior = anterior
+        ponto.proximo = proximo
+        if anterior is not None:
+            anterior.proximo = ponto
+        if proximo is not None:
+            proximo.anterior = ponto
+        else:
+            self.maximo = ponto
+
+        folha.chaves.insert(indice, tempo)
+        folha.filhos.insert(indice, ponto)
+        ponto.folha = folha
+        no = folha
+        while no is not None:
+            no.tamanho += 1
+            no.sujo = True
+            no = no.pai
+
+        if len(folha.filhos) > self.ordem:
+            self._dividir_no(folha)
+        return ponto
+
+    def _dividir_no(self, no: NoBMais):
+        if self.metricas is not None:
+            self.metricas.incrementar('divisoes')
+        meio = len(no.filhos) // 2
+        novo = NoBMais(no.eh_folha)
+        novo.filhos = no.filhos[meio:]
+        del no.filhos[meio:]
+        if no.eh_folha:
+            separador = no.chaves[meio]
+            novo.chaves = no.chaves[meio:]
+            del no.chaves[meio:]
+            for ponto in novo.filhos:
+                ponto.folha = novo
+            novo.proxima = no.proxima
+            no.proxima = novo
+            novo.tamanho = len(novo.filhos)
+        else:
+            separador = no.chaves[meio - 1]
+            novo.chaves = no.chaves[meio:]
+            del no.chaves[meio - 1:]
+            for filho in novo.filhos:
+                filho.pai = novo
+                novo.tamanho += filho.tamanho
+        no.tamanho -= novo.tamanho
+        no.sujo = True
+
+        pai = no.pai
+        if pai is None:
+            raiz = NoBMais(False)
+            raiz.chaves = [separador]
+            raiz.filhos = [no, novo]
+            raiz.tamanho = no.tamanho + novo.tamanho
+            no.pai = novo.pai = raiz
+            self.raiz = raiz
+            self.altura += 1
+            return
+
+        indice = pai.filhos.index(no)
+        pai.chaves.insert(indice, separador)
+        pai.filhos.insert(indice + 1, novo)
+        novo.pai = pai
+        if len(pai.filhos) > self.ordem:
+            self._dividir_no(pai)
+
+    def _remover_no(self, ponto: PontoBMais):
+        self._invalidar_ancoras()
+        anterior = ponto.anterior
+        proximo = ponto.proximo
+        if anterior is not None:
+            anterior.proximo = proximo
+        if proximo is not None:
+            proximo.anterior = anterior
+        if self.maximo is ponto:
+            self.maximo = anterior
+
+        folha = ponto.folha
+        indice = self._posicao(ponto)
+        del folha.filhos[indice]
+        del folha.chaves[indice]
+        no = folha
+        while no is not None:
+            no.tamanho -= 1
+            no.sujo = True
+            no = no.pai
+        ponto.anterior = ponto.proximo = ponto.folha = None
+
+        if not folha.filhos and anterior is not None:
+            anterior.folha.proxima = folha.proxima
+        self._reequilibrar(folha)
+
+    def _reequilibrar(self, no: NoBMais):
+        pai = no.pai
+        if pai is None:
+            if not no.filhos:
+                self.raiz = None
+                self.altura = 0
+            else:
+                self._encolher_raiz()
+            return
+
+        minimo = self.ordem // 2
+        if len(no.filhos) >= minimo:
+            return
+
+        indice = pai.filhos.index(no)
+        if not no.filhos:
+            del pai.filhos[indice]
+            if pai.chaves:
+                del pai.chaves[indice - 1 if indice else 0]
+            no.pai = None
+            self._reequilibrar(pai)
+            return
+
+        esquerdo = pai.filhos[indice - 1] if indice else None
+        direito = pai.filhos[indice + 1] if indice + 1 < len(pai.filhos) else None
+        if esquerdo is not None and len(esquerdo.filhos) > minimo:
+            self._emprestar_da_esquerda(no, esquerdo, pai, indice)
+        elif direito is not None and len(direito.filhos) > minimo:
+            self._emprestar_da_direita(no, direito, pai, indice)
+        elif esquerdo is not None:
+            self._fundir(esquerdo, no, pai, indice - 1)
+            self._reequilibrar(pai)
+        elif direito is not None:
+            self._fundir(no, direito, pai, indice)
+            self._reequilibrar(pai)
+        else:
+            self._reequilibrar(pai)
+
+    def _emprestar_da_esquerda(self, no: NoBMais, esquerdo: NoBMais, pai: NoBMais, indice: int):
+        filho = esquerdo.filhos.pop()
+        no.filhos.insert(0, filho)
+        if no.eh_folha:
+            no.chaves.insert(0, esquerdo.chaves.pop())
+            filho.folha = no
+            pai.chaves[indice - 1] = filho.tempo
+            tamanho = 1
+        else:
+            no.chaves.insert(0, pai.chaves[indice - 1])
+            pai.chaves[indice - 1] = esquerdo.chaves.pop()
+            filho.pai = no
+            tamanho = filho.tamanho
+        esquerdo.tamanho -= tamanho
+        no.tamanho += tamanho
+        esquerdo.sujo = no.sujo = True
+
+    def _emprestar_da_direita(self, no: NoBMais, direito: NoBMais, pai: NoBMais, indice: int):
+        filho = direito.filhos.pop(0)
+        no.filhos.append(filho)
+        if no.eh_folha:
+            no.chaves.append(direito.chaves.pop(0))
+            filho.folha = no
+            pai.chaves[indice] = direito.chaves[0]
+            tamanho = 1
+        else:
+            no.chaves.append(pai.chaves[indice])
+            pai.chaves[indice] = direito.chaves.pop(0)
+            filho.pai = no
+            tamanho = filho.tamanho
+        direito.tamanho -= tamanho
+        no.tamanho += tamanho
+        direito.sujo = no.sujo = True
+
+    def _fundir(self, esquerdo: NoBMais, direito: NoBMais, pai: NoBMais, indice: int):
+        if self.metricas is not None:
+            self.metricas.incrementar('fusoes')
+        if esquerdo.eh_folha:
+            for ponto in direito.filhos:
+                ponto.folha = esquerdo
+            esquerdo.proxima = direito.proxima
+        else:
+            esquerdo.chaves.append(pai.chaves[indice])
+            for filho in direito.filhos:
+                filho.pai = esquerdo
+        esquerdo.chaves.extend(direito.chaves)
+        esquerdo.filhos.extend(direito.filhos)
+        esquerdo.tamanho += direito.tamanho
+        esquerdo.sujo = True
+        del pai.chaves[indice]
+        del pai.filhos[indice + 1]
+        direito.pai = None
+
+    def _encolher_raiz(self):
+        while not self.raiz.eh_folha and len(self.raiz.filhos) == 1:
+            self.raiz = self.raiz.filhos[0]
+            self.raiz.pai = None
+            self.altura -= 1
+
+    def _antecipar(self, ponto: PontoBMais, tempo: int):
+        indice = self._posicao(ponto)
+        no = ponto.folha
+        ponto.tempo = tempo
+        no.chaves[indice] = tempo
+        if indice:
+            return
+        while no.pai is not None:
+            indice = no.pai.filhos.index(no)
+            if indice:
+                if no.pai.chaves[indice - 1] > tempo:
+                    no.pai.chaves[indice - 1] = tempo
+                return
+            no = no.pai
+
+    def _atualizar_agregados_de(self, pontos: List[PontoBMais]):
+        for ponto in pontos:
+            no = ponto.folha
+            while no is not None and not no.sujo:
+                no.sujo = True
+                no = no.pai
+
+    def _agregar(self, no: NoBMais):
+        if not no.sujo:
+            return
+        if no.eh_folha:
+            itens = [(ponto.nRec, ponto.intervalos) for ponto in no.filhos]
+        else:
+            for filho in no.filhos:
+                self._agregar(filho)
+            itens = [(filho.min_nRec, filho.intersec_sub) for filho in no.filhos]
+
+        min_nRec, intersec = itens[0]
+        for nRec, intervalos in itens[1:]:
+            if nRec < min_nRec:
+                min_nRec = nRec
+            if intervalos is not intersec and intervalos != intersec:
+                intersec = self._intersecao_intervalos(intersec, intervalos)
+        no.min_nRec = min_nRec
+        no.intersec_sub = intersec
+        no.sujo = False
+
+    def _parte_subarvore(self, no: NoBMais) -> Tuple[int, Recursos, int]:
+        self._agregar(no)
+        return no.min_nRec, no.intersec_sub, no.tamanho
+
+    def _decompor_janela(self, inicio: PontoBMais, fim: PontoBMais) -> List[Tuple[int, Recursos, int]]:
+        esquerda = inicio.folha
+        direita = fim.folha
+        i = self._posicao(inicio)
+        j = self._posicao(fim)
+        if esquerda is direita:
+            return [(ponto.nRec, ponto.intervalos, 1) for ponto in esquerda.filhos[i:j + 1]]
+
+        partes = [(ponto.nRec, ponto.intervalos, 1) for ponto in esquerda.filhos[i:]]
+        while esquerda.pai is not direita.pai:
+            pai = esquerda.pai
+            for irmao in pai.filhos[pai.filhos.index(esquerda) + 1:]:
+                partes.append(self._parte_subarvore(irmao))
+            pai = direita.pai
+            for irmao in pai.filhos[:pai.filhos.index(direita)]:
+                partes.append(self._parte_subarvore(irmao))
+            esquerda = esquerda.pai
+            direita = direita.pai
+
+        pai = esquerda.pai
+        for irmao in pai.filhos[pai.filhos.index(esquerda) + 1:pai.filhos.index(direita)]:
+            partes.append(self._parte_subarvore(irmao))
+        partes.extend((ponto.nRec, ponto.intervalos, 1) for ponto in fim.folha.filhos[:j + 1])
+        return partes
+
+    def descartar_ate(self, tempo: int) -> int:
+        ancora = self.encontrar_ancora(tempo)
+        if ancora is None:
+            return 0
+        self._invalidar_ancoras()
+        if self.diario is not None:
+            self.diario.registrar_descarte(tempo)
+
+        tamanho_anterior = self.raiz.tamanho
+        ancora.anterior = None
+        no = ancora.folha
+        indice = self._posicao(ancora)
+        del no.filhos[:indice]
+        del no.chaves[:indice]
+        no.tamanho = len(no.filhos)
+        no.sujo = True
+        while no.pai is not None:
+            pai = no.pai
+            indice = pai.filhos.index(no)
+            del pai.filhos[:indice]
+            del pai.chaves[:indice]
+            pai.tamanho = sum(filho.tamanho for filho in pai.filhos)
+            pai.sujo = True
+            no = pai
+        self._encolher_raiz()
+        return tamanho_anterior - self.raiz.tamanho
+
+    def compactar(self) -> int:
+        if self.raiz is None:
+            return 0
+        self._invalidar_ancoras()
+
+        pontos = []
+        ponto = self._primeiro()
+        while ponto is not None:
+            proximo = ponto.proximo
+            if pontos and self._mesma_disponibilidade(pontos[-1], ponto.nRec, ponto.intervalos):
+                ponto.anterior = ponto.proximo = ponto.folha = None
+            else:
+                if pontos:
+                    pontos[-1].proximo = ponto
+                ponto.anterior = pontos[-1] if pontos else None
+                pontos.append(ponto)
+            ponto = proximo
+        pontos[-1].proximo = None
+
+        removidos = self.raiz.tamanho - len(pontos)
+        self._construir(pontos)
+        return removidos
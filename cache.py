@@ -0,0 +1,105 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Optional
+
+class CacheAncoras:
+    def __init__(self, perfil, capacidade: int = 8, largura_balde: int = 1024, passos_maximos: int = 16):
+        self.perfil = perfil
+        self.capacidade = capacidade
+        self.largura_balde = largura_balde
+        self.passos_maximos = passos_maximos
+        self.entradas: 'OrderedDict[int, Any]' = OrderedDict()
+        self.ultimo = None
+
+        self.consultas = 0
+        self.acertos = 0
+        self.profundidade_total = 0
+        self.invalidacoes = 0
+        self._trava = threading.Lock()
+
+    def encontrar(self, tempo_inicio: int) -> Optional[Any]:
+        with self._trava:
+            self.consultas += 1
+            no = self.ultimo
+            if no is not None:
+                passos = 0
+                limite = self.passos_maximos
+                if no.tempo <= tempo_inicio:
+                    proximo = no.proximo
+                    while proximo is not None and proximo.tempo <= tempo_inicio and passos < limite:
+                        passos += 1
+                        no = proximo
+                        proximo = no.proximo
+                    achou = proximo is None or proximo.tempo > tempo_inicio
+                else:
+                    while no is not None and no.tempo > tempo_inicio and passos < limite:
+                        passos += 1
+                        no = no.anterior
+                    achou = no is None or no.tempo <= tempo_inicio
+                if achou:
+                    self.acertos += 1
+                    self.profundidade_total += passos
+                    if self.perfil.metricas is not None:
+                        self.perfil.metricas.registrar('profundidade_busca', passos)
+                    if no is not None:
+                        self.ultimo = no
+                    return no
+            return self._encontrar_por_balde(tempo_inicio)
+
+    def _encontrar_por_balde(self, tempo_inicio: int) -> Optional[Any]:
+        balde = tempo_inicio // self.largura_balde
+        dedo = self.entradas.get(balde)
+        resultado = profundidade = None
+        if dedo is not None:
+            resultado, profundidade = self._busca_dedo(dedo, tempo_inicio)
+        if profundidade is None:
+            resultado, profundidade = self.perfil._buscar_ancora(tempo_inicio)
+        else:
+            self.acertos += 1
+
+        self.profundidade_total += profundidade
+        if self.perfil.metricas is not None:
+            self.perfil.metricas.registrar('profundidade_busca', profundidade)
+
+        if resultado is not None:
+            self.ultimo = resultado
+            self.entradas[balde] = resultado
+            self.entradas.move_to_end(balde)
+            if len(self.entradas) > self.capacidade:
+                self.entradas.popitem(last=False)
+        return resultado
+
+    def _busca_dedo(self, no, tempo_inicio: int):
+        passos = 0
+        limite = self.passos_maximos
+        if no.tempo <= tempo_inicio:
+            proximo = no.proximo
+            while proximo is not None and proximo.tempo <= tempo_inicio:
+                if passos >= limite:
+                    return None, None
+                passos += 1
+                no = proximo
+                proximo = no.proximo
+        else:
+            while no is not None and no.tempo > tempo_inicio:
+                if passos >= limite:
+                    return None, None
+                passos += 1
+                no = no.anterior
+        return no, passos
+
+    def invalidar(self):
+        with self._trava:
+            if self.entradas or self.ultimo is not None:
+                self.entradas.clear()
+                self.ultimo = None
+                self.invalidacoes += 1
+
+    def como_dict(self) -> dict:
+        return {
+            'consultas': self.consultas,
+            'acertos': self.acertos,
+            'taxa_acerto': self.acertos / self.consultas if self.consultas else 0.0,
+            'profundidade_media': self.profundidade_total / self.consultas if self.consultas else 0.0,
+            'invalidacoes': self.invalidacoes,
+        }
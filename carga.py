@@ -0,0 +1,145 @@
+import argparse
+import itertools
+import math
+import random
+import time
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple
+from recursos import BITSET, INTERVALOS, converter
+
+CRIAR = 'criar'
+CONFIRMAR = 'confirmar'
+RESERVAR = 'reservar'
+
+Operacao = Tuple[str, tuple]
+
+PROPORCOES_PADRAO = {CRIAR: 0.1, CONFIRMAR: 0.6, RESERVAR: 0.3}
+
+def gerar_sintetica(total_recursos: int, taxa_chegada: float = 0.05, alfa_duracao: float = 1.5,
+                    duracao_minima: int = 60, duracao_maxima: int = 86400, req_normal: int = 4,
+                    req_rajada: Optional[int] = None, prob_entrar_rajada: float = 0.01, prob_sair_rajada: float = 0.2,
+                    proporcoes: Optional[Dict[str, float]] = None, horizonte: int = 86400,
+                    formato: str = INTERVALOS, semente: Optional[int] = None,
+                    quantidade: Optional[int] = None) -> Iterator[Operacao]:
+    rng = random.Random(semente)
+    proporcoes = proporcoes or PROPORCOES_PADRAO
+    tipos = list(proporcoes)
+    acumulados = list(itertools.accumulate(proporcoes[tipo] for tipo in tipos))
+    req_rajada = req_rajada if req_rajada is not None else max(req_normal, total_recursos // 4)
+    recursos = converter([(0, total_recursos - 1)], formato)
+
+    relogio = 0.0
+    em_rajada = False
+    contador = itertools.count() if quantidade is None else range(quantidade)
+    for _ in contador:
+        relogio += rng.expovariate(taxa_chegada)
+        agora = int(relogio)
+
+        if em_rajada:
+            em_rajada = rng.random() >= prob_sair_rajada
+        else:
+            em_rajada = rng.random() < prob_entrar_rajada
+
+        tipo = rng.choices(tipos, cum_weights=acumulados)[0]
+        if tipo == CRIAR:
+            yield CRIAR, (agora + horizonte, total_recursos, recursos)
+            continue
+
+        duracao = min(duracao_maxima, math.ceil(duracao_minima * rng.paretovariate(alfa_duracao)))
+        reqRec = rng.randint(1, req_rajada if em_rajada else req_normal)
+        yield tipo, (agora, agora + duracao, reqRec)
+
+def ler_swf(caminho: str, usar_tempo_pedido: bool = False) -> Iterator[Operacao]:
+    with open(caminho, encoding='utf-8', errors='replace') as arquivo:
+        for linha in arquivo:
+            linha = linha.strip()
+            if not linha or linha.startswith(';'):
+                continue
+            campos = linha.split()
+            if len(campos) < 9:
+                continue
+
+            submissao = int(float(campos[1]))
+            duracao = int(float(campos[8] if usar_tempo_pedido else campos[3]))
+            processadores = int(campos[7])
+            if processadores <= 0:
+                processadores = int(campos[4])
+            if submissao < 0 or duracao <= 0 or processadores <= 0:
+                continue
+            yield RESERVAR, (submissao, submissao + duracao, processadores)
+
+def preparar_perfil(classe, total_recursos: int, formato: str = INTERVALOS, inicio: int = 0, **opcoes):
+    recursos = [(0, total_recursos - 1)]
+    return classe.construir_de_ordenados([(inicio, total_recursos, recursos)], formato, **opcoes)
+
+def despachante(perfil) -> Dict[str, Callable]:
+    return {
+        CRIAR: perfil.criar_no,
+        CONFIRMAR: lambda *args: perfil.confirmar_disponibilidade(*args)[0],
+        RESERVAR: perfil.reservar,
+    }
+
+def reproduzir(perfil, operacoes: Iterable[Operacao], bloco: int = 10000, descartar_atras: Optional[int] = None) -> dict:
+    quantidades = {CRIAR: 0, CONFIRMAR: 0, RESERVAR: 0}
+    sucessos = {CRIAR: 0, CONFIRMAR: 0, RESERVAR: 0}
+    executar = despachante(perfil)
+
+    total = 0
+    menor_vazao = None
+    maior_vazao = None
+    relogio = time.perf_counter
+    inicio = inicio_bloco = relogio()
+    for tipo, argumentos in operacoes:
+        if executar[tipo](*argumentos) is not None:
+            sucessos[tipo] += 1
+        quantidades[tipo] += 1
+        total += 1
+
+        if total % bloco == 0:
+            agora = relogio()
+            vazao = bloco / (agora - inicio_bloco) if agora > inicio_bloco else float('inf')
+            menor_vazao = vazao if menor_vazao is None else min(menor_vazao, vazao)
+            maior_vazao = vazao if maior_vazao is None else max(maior_vazao, vazao)
+            if descartar_atras is not None and tipo != CRIAR:
+                perfil.descartar_ate(argumentos[0] - descartar_atras)
+            inicio_bloco = relogio()
+
+    segundos = relogio() - inicio
+    return {
+        'operacoes': total,
+        'segundos': segundos,
+        'ops_por_segundo': total / segundos if segundos else 0.0,
+        'ops_por_segundo_sustentado': menor_vazao,
+        'ops_por_segundo_pico': maior_vazao,
+        'por_tipo': {tipo: {'quantidade': quantidades[tipo], 'sucessos': sucessos[tipo]} for tipo in quantidades},
+    }
+
+def main():
+    from benchmark import BACKENDS
+
+    parser = argparse.ArgumentParser(description='Reproduz uma carga sintética ou um rastro SWF contra um perfil.')
+    parser.add_argument('rastro', nargs='?', help='arquivo no Standard Workload Format; sem ele gera carga sintética')
+    parser.add_argument('--backend', default='rn', choices=list(BACKENDS))
+    parser.add_argument('--formato', default=INTERVALOS, choices=[INTERVALOS, BITSET])
+    parser.add_argument('--recursos', type=int, default=128)
+    parser.add_argument('--operacoes', type=int, default=100000, help='tamanho da carga sintética')
+    parser.add_argument('--semente', type=int, default=0)
+    parser.add_argument('--bloco', type=int, default=10000)
+    parser.add_argument('--descartar-atras', type=int, default=None)
+    opcoes = parser.parse_args()
+
+    _, construir, _ = BACKENDS[opcoes.backend]
+    perfil = construir([(0, opcoes.recursos, [(0, opcoes.recursos - 1)])], opcoes.formato)
+    if opcoes.rastro:
+        operacoes = ler_swf(opcoes.rastro)
+    else:
+        operacoes = gerar_sintetica(opcoes.recursos, formato=opcoes.formato, semente=opcoes.semente, quantidade=opcoes.operacoes)
+
+    relatorio = reproduzir(perfil, operacoes, opcoes.bloco, opcoes.descartar_atras)
+    print(f"{relatorio['operacoes']} operações em {relatorio['segundos']:.2f} s: "
+          f"{relatorio['ops_por_segundo']:.0f} ops/s (sustentado {relatorio['ops_por_segundo_sustentado'] or 0:.0f}, "
+          f"pico {relatorio['ops_por_segundo_pico'] or 0:.0f})")
+    for tipo, contagem in relatorio['por_tipo'].items():
+        print(f"  {tipo}: {contagem['sucessos']}/{contagem['quantidade']} bem-sucedidas")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,263 @@
+import threading
+import weakref
+from array import array
+from typing import List, Optional, Tuple
+from recursos import INTERVALOS, PoolIntervalos, Recursos
+from rubronegra import PRETO, PerfilDisponibilidadeRN
+
+NULO = 0
+
+def _coluna(nome: str) -> property:
+    def ler(no):
+        return getattr(no.perfil, nome)[no.indice]
+
+    def escrever(no, valor):
+        getattr(no.perfil, nome)[no.indice] = valor
+
+    return property(ler, escrever)
+
+def _ligacao(nome: str) -> property:
+    def ler(no):
+        return no.perfil._no(getattr(no.perfil, nome)[no.indice])
+
+    def escrever(no, valor):
+        getattr(no.perfil, nome)[no.indice] = valor.indice
+
+    return property(ler, escrever)
+
+def _vizinho(nome: str) -> property:
+    def ler(no):
+        indice = getattr(no.perfil, nome)[no.indice]
+        return None if indice == NULO else no.perfil._no(indice)
+
+    def escrever(no, valor):
+        getattr(no.perfil, nome)[no.indice] = NULO if valor is None else valor.indice
+
+    return property(ler, escrever)
+
+class NoCompacto:
+    __slots__ = ('perfil', 'indice', '__weakref__')
+
+    def __init__(self, perfil: 'PerfilDisponibilidadeCompacto', indice: int):
+        self.perfil = perfil
+        self.indice = indice
+
+    tempo = _coluna('tempos')
+    nRec = _coluna('nRecs')
+    intervalos = _coluna('conjuntos')
+    min_nRec = _coluna('min_nRecs')
+    intersec_sub = _coluna('intersecoes')
+    tamanho = _coluna('tamanhos')
+    cor = _coluna('cores')
+    esquerda = _ligacao('esquerdas')
+    direita = _ligacao('direitas')
+    pai = _ligacao('pais')
+    anterior = _vizinho('anteriores')
+    proximo = _vizinho('proximos')
+
+# Mesma árvore rubro-negra de PerfilDisponibilidadeRN, mas os campos dos nós
+# ficam em colunas array('q') e os conjuntos de recursos, já internados pelo
+# PoolIntervalos, em listas de referências. NoCompacto é só um apontador
+# (perfil, índice) criado sob demanda; _nos mantém no máximo um apontador vivo
+# por índice, então comparações com `is` continuam valendo, também entre
+# leitores concorrentes do ServicoDisponibilidade. Índices removidos são
+# reaproveitados quando nenhum apontador para eles está vivo.
+class PerfilDisponibilidadeCompacto(PerfilDisponibilidadeRN):
+    def __init__(self, formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False):
+        self.tempos = array('q')
+        self.nRecs = array('q')
+        self.min_nRecs = array('q')
+        self.tamanhos = array('q')
+        self.esquerdas = array('q')
+        self.direitas = array('q')
+        self.pais = array('q')
+        self.anteriores = array('q')
+        self.proximos = array('q')
+        self.cores = array('b')
+        self.conjuntos: List[Optional[Recursos]] = []
+        self.intersecoes: List[Optional[Recursos]] = []
+
+        self._nos: 'weakref.WeakValueDictionary[int, NoCompacto]' = weakref.WeakValueDictionary()
+        self._livres: List[int] = []
+        self._trava_nos = threading.Lock()
+        super().__init__(formato, pool, coalescer)
+
+    def _no(self, indice: int) -> NoCompacto:
+        no = self._nos.get(indice)
+        if no is None:
+            with self._trava_nos:
+                no = self._nos.get(indice)
+                if no is None:
+                    no = self._nos[indice] = NoCompacto(self, indice)
+        return no
+
+    def _novo_no(self, tempo: int, nRec: int, intervalos: Recursos) -> NoCompacto:
+        indice = self._reaproveitar_indice()
+        if indice is None:
+            indice = len(self.tempos)
+            for coluna, valor in ((self.tempos, tempo), (self.nRecs, nRec), (self.min_nRecs, nRec), (self.tamanhos, 1),
+                                  (self.esquerdas, NULO), (self.direitas, NULO), (self.pais, NULO),
+                                  (self.anteriores, NULO), (self.proximos, NULO), (self.cores, not PRETO),
+                                  (self.conjuntos, intervalos), (self.intersecoes, intervalos)):
+                coluna.append(valor)
+        else:
+            self.tempos[indice] = tempo
+            self.nRecs[indice] = self.min_nRecs[indice] = nRec
+            self.tamanhos[indice] = 1
+            self.esquerdas[indice] = self.direitas[indice] = self.pais[indice] = NULO
+            self.anteriores[indice] = self.proximos[indice] = NULO
+            self.cores[indice] = not PRETO
+            self.conjuntos[indice] = self.intersecoes[indice] = intervalos
+        return self._no(indice)
+
+    def _reaproveitar_indice(self) -> Optional[int]:
+        ocupados = []
+        indice = None
+        while self._livres:
+            candidato = self._livres.pop()
+            if candidato in self._nos:
+                ocupados.append(candidato)
+            else:
+                indice = candidato
+                break
+        self._livres.extend(ocupados)
+        return indice
+
+    def _liberar_indice(self, indice: int):
+        self.conjuntos[indice] = self.intersecoes[indice] = None
+        self._livres.append(indice)
+
+    def _remover_no(self, no: NoCompacto):
+        super()._remover_no(no)
+        self._liberar_indice(no.indice)
+
+    def descartar_ate(self, tempo: int) -> int:
+        ancora = self.encontrar_ancora(tempo)
+        if ancora is None:
+            return 0
+        descartados = []
+        indice = self._primeiro().indice
+        while indice != ancora.indice:
+            descartados.append(indice)
+            indice = self.proximos[indice]
+        removidos = super().descartar_ate(tempo)
+        for indice in descartados:
+            self._liberar_indice(indice)
+        return removidos
+
+    def compactar(self) -> int:
+        antes = self._indices_em_ordem()
+        removidos = super().compactar()
+        if removidos:
+            mantidos = set(self._indices_em_ordem())
+            for indice in antes:
+                if indice not in mantidos:
+                    self._liberar_indice(indice)
+        return removidos
+
+    def _indices_em_ordem(self) -> List[int]:
+        primeiro = self._primeiro()
+        indices = []
+        indice = primeiro.indice if primeiro is not None else NULO
+        while indice != NULO:
+            indices.append(indice)
+            indice = self.proximos[indice]
+        return indices
+
+    def _atualizar_agregados(self, no: NoCompacto):
+        indice = no.indice
+        min_nRec = self.nRecs[indice]
+        intersec = self.conjuntos[indice]
+        tamanho = 1
+        for filho in (self.esquerdas[indice], self.direitas[indice]):
+            if filho != NULO:
+                if self.min_nRecs[filho] < min_nRec:
+                    min_nRec = self.min_nRecs[filho]
+                intersec_filho = self.intersecoes[filho]
+                if intersec_filho is not intersec and intersec_filho != intersec:
+                    intersec = self._intersecao_intervalos(intersec, intersec_filho)
+                tamanho += self.tamanhos[filho]
+        self.min_nRecs[indice] = min_nRec
+        self.intersecoes[indice] = intersec
+        self.tamanhos[indice] = tamanho
+
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[NoCompacto]:
+        if self.cache_ancoras is not None or self.metricas is not None:
+            return super().encontrar_ancora(tempo_inicio)
+        tempos = self.tempos
+        esquerdas = self.esquerdas
+        direitas = self.direitas
+        indice = self.raiz.indice
+        resultado = NULO
+        while indice != NULO:
+            if tempos[indice] <= tempo_inicio:
+                resultado = indice
+                indice = direitas[indice]
+            else:
+                indice = esquerdas[indice]
+        return None if resultado == NULO else self._no(resultado)
+
+    def _encontrar_anterior(self, tempo: int) -> Optional[NoCompacto]:
+        tempos = self.tempos
+        esquerdas = self.esquerdas
+        direitas = self.direitas
+        indice = self.raiz.indice
+        resultado = NULO
+        while indice != NULO:
+            if tempos[indice] < tempo:
+                resultado = indice
+                indice = direitas[indice]
+            else:
+                indice = esquerdas[indice]
+        return None if resultado == NULO else self._no(resultado)
+
+    def _decompor_janela(self, inicio: NoCompacto, fim: NoCompacto) -> List[Tuple[int, Recursos, int]]:
+        pais = self.pais
+        esquerdas = self.esquerdas
+        direitas = self.direitas
+        nRecs = self.nRecs
+        conjuntos = self.conjuntos
+        inicio = inicio.indice
+        fim = fim.indice
+
+        ancestrais = set()
+        indice = inicio
+        while indice != NULO:
+            ancestrais.add(indice)
+            indice = pais[indice]
+        lca = fim
+        while lca not in ancestrais:
+            lca = pais[lca]
+
+        partes = [(nRecs[lca], conjuntos[lca], 1)]
+
+        if inicio != lca:
+            partes.append((nRecs[inicio], conjuntos[inicio], 1))
+            if direitas[inicio] != NULO:
+                partes.append(self._parte_de(direitas[inicio]))
+            indice = inicio
+            while pais[indice] != lca:
+                pai = pais[indice]
+                if esquerdas[pai] == indice:
+                    partes.append((nRecs[pai], conjuntos[pai], 1))
+                    if direitas[pai] != NULO:
+                        partes.append(self._parte_de(direitas[pai]))
+                indice = pai
+
+        if fim != lca:
+            partes.append((nRecs[fim], conjuntos[fim], 1))
+            if esquerdas[fim] != NULO:
+                partes.append(self._parte_de(esquerdas[fim]))
+            indice = fim
+            while pais[indice] != lca:
+                pai = pais[indice]
+                if direitas[pai] == indice:
+                    partes.append((nRecs[pai], conjuntos[pai], 1))
+                    if esquerdas[pai] != NULO:
+                        partes.append(self._parte_de(esquerdas[pai]))
+                indice = pai
+
+        return partes
+
+    def _parte_de(self, indice: int) -> Tuple[int, Recursos, int]:
+        return self.min_nRecs[indice], self.intersecoes[indice], self.tamanhos[indice]
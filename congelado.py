@@ -0,0 +1,96 @@
+from typing import Iterable, List, Tuple
+import numpy as np
+from recursos import Recursos, bitset_para_intervalos, intervalos_para_bitset
+
+BITS_POR_PALAVRA = 64
+MASCARA_PALAVRA = (1 << BITS_POR_PALAVRA) - 1
+
+def _contar_bits(palavras: np.ndarray) -> np.ndarray:
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(palavras).sum(axis=-1, dtype=np.int64)
+    octetos = np.ascontiguousarray(palavras).view(np.uint8)
+    return np.unpackbits(octetos, axis=-1).sum(axis=-1, dtype=np.int64)
+
+class PerfilCongelado:
+    def __init__(self, tempos: np.ndarray, nRecs: np.ndarray, mascaras: np.ndarray):
+        self.tempos = tempos
+        self.nRecs = nRecs
+        self.mascaras = mascaras
+
+        self._min_nRec = [nRecs]
+        self._e_mascaras = [mascaras]
+        largura = 1
+        while 2 * largura <= len(tempos):
+            anterior_min = self._min_nRec[-1]
+            anterior_e = self._e_mascaras[-1]
+            self._min_nRec.append(np.minimum(anterior_min[:-largura], anterior_min[largura:]))
+            self._e_mascaras.append(np.bitwise_and(anterior_e[:-largura], anterior_e[largura:]))
+            largura *= 2
+
+        for tabela in (self.tempos, self.nRecs, self.mascaras, *self._min_nRec, *self._e_mascaras):
+            tabela.flags.writeable = False
+
+    @classmethod
+    def de_pontos(cls, pontos: Iterable[Tuple[int, int, Recursos]]) -> 'PerfilCongelado':
+        tempos = []
+        nRecs = []
+        bitsets = []
+        for tempo, nRec, recursos in pontos:
+            tempos.append(tempo)
+            nRecs.append(nRec)
+            bitsets.append(recursos if isinstance(recursos, int) else intervalos_para_bitset(recursos))
+
+        palavras = max(1, -(-max((b.bit_length() for b in bitsets), default=0) // BITS_POR_PALAVRA))
+        mascaras = np.zeros((len(bitsets), palavras), dtype=np.uint64)
+        for i, bitset in enumerate(bitsets):
+            for p in range(palavras):
+                mascaras[i, p] = (bitset >> (p * BITS_POR_PALAVRA)) & MASCARA_PALAVRA
+
+        return cls(np.array(tempos, dtype=np.int64), np.array(nRecs, dtype=np.int64), mascaras)
+
+    def __len__(self) -> int:
+        return len(self.tempos)
+
+    def encontrar_ancora(self, tempos_inicio) -> np.ndarray:
+        return np.searchsorted(self.tempos, np.asarray(tempos_inicio, dtype=np.int64), side='right') - 1
+
+    def confirmar_disponibilidade(self, tempos_inicio, tempos_fim, reqRec) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        tempos_inicio, tempos_fim, reqRec = np.broadcast_arrays(
+            np.asarray(tempos_inicio, dtype=np.int64),
+            np.asarray(tempos_fim, dtype=np.int64),
+            np.asarray(reqRec, dtype=np.int64),
+        )
+        if not len(self):
+            return (np.zeros(tempos_inicio.shape, dtype=bool), np.full(tempos_inicio.shape, -1, dtype=np.int64),
+                    np.zeros(tempos_inicio.shape + (self.mascaras.shape[1],), dtype=np.uint64))
+
+        ancoras = self.encontrar_ancora(tempos_inicio)
+        ultimos = np.searchsorted(self.tempos, tempos_fim, side='left') - 1
+
+        validos = (ancoras >= 0) & (ultimos >= ancoras)
+        inicio = np.where(validos, ancoras, 0)
+        fim = np.where(validos, ultimos, 0)
+
+        niveis = np.floor(np.log2(fim - inicio + 1)).astype(np.int64)
+
+        min_nRec = np.zeros(inicio.shape, dtype=np.int64)
+        livres = np.zeros(inicio.shape + (self.mascaras.shape[1],), dtype=np.uint64)
+        for nivel in np.unique(niveis):
+            selecao = niveis == nivel
+            esquerda = inicio[selecao]
+            direita = fim[selecao] - (1 << int(nivel)) + 1
+            tabela_min = self._min_nRec[nivel]
+            tabela_e = self._e_mascaras[nivel]
+            min_nRec[selecao] = np.minimum(tabela_min[esquerda], tabela_min[direita])
+            livres[selecao] = np.bitwise_and(tabela_e[esquerda], tabela_e[direita])
+
+        disponiveis = validos & (min_nRec >= reqRec) & (_contar_bits(livres) >= reqRec)
+        tempos_ancora = np.where(disponiveis, self.tempos[inicio], -1)
+        livres[~disponiveis] = 0
+        return disponiveis, tempos_ancora, livres
+
+    def recursos(self, livres: np.ndarray) -> List[Tuple[int, int]]:
+        bitset = 0
+        for p, palavra in enumerate(livres.tolist()):
+            bitset |= int(palavra) << (p * BITS_POR_PALAVRA)
+        return bitset_para_intervalos(bitset)
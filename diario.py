@@ -0,0 +1,238 @@
+import heapq
+import os
+import struct
+import threading
+import zlib
+from operator import itemgetter
+from typing import Iterator, List, Optional, Tuple
+import instantaneo
+from recursos import INTERVALOS, PoolIntervalos, Recursos
+
+MAGICO = b'PERFDIAR'
+VERSAO = 1
+CABECALHO = struct.Struct('<8sHH4xQ')
+REGISTRO = struct.Struct('<IIB')
+
+CRIACAO = 1
+RESERVA = 2
+SUBTRACAO = 3
+DESCARTE = 4
+LIBERACAO = 5
+
+FLAG_COALESCER = 1
+
+_PONTO = struct.Struct('<qq')
+_JANELA = struct.Struct('<qqq')
+_TEMPO = struct.Struct('<q')
+_RECURSOS = struct.Struct('<BI')
+
+def _codificar_recursos(recursos: Recursos) -> bytes:
+    if isinstance(recursos, int):
+        bruto = recursos.to_bytes(max(1, -(-recursos.bit_length() // 8)), 'little')
+        return _RECURSOS.pack(1, len(bruto)) + bruto
+    return _RECURSOS.pack(0, len(recursos)) + b''.join(_PONTO.pack(comeco, fim) for comeco, fim in recursos)
+
+def _decodificar_recursos(corpo: bytes, posicao: int) -> Recursos:
+    bitset, tamanho = _RECURSOS.unpack_from(corpo, posicao)
+    posicao += _RECURSOS.size
+    if bitset:
+        return int.from_bytes(corpo[posicao:posicao + tamanho], 'little')
+    return list(_PONTO.iter_unpack(corpo[posicao:posicao + tamanho * _PONTO.size]))
+
+def _decodificar(tipo: int, corpo: bytes) -> tuple:
+    if tipo in (CRIACAO, LIBERACAO):
+        return (*_PONTO.unpack_from(corpo), _decodificar_recursos(corpo, _PONTO.size))
+    if tipo in (RESERVA, SUBTRACAO):
+        return (*_JANELA.unpack_from(corpo), _decodificar_recursos(corpo, _JANELA.size))
+    if tipo == DESCARTE:
+        return _TEMPO.unpack(corpo)
+    raise ValueError(f"tipo de registro desconhecido no diário: {tipo}")
+
+class Diario:
+    def __init__(self, caminho: str, base: int = 0, lote_fsync: int = 256, intervalo_fsync: float = 0.005, coalescer: bool = False):
+        self.caminho = caminho
+        self.lote_fsync = lote_fsync
+        self._trava = threading.Lock()
+        self._pendentes: List[bytes] = []
+        self.registros = 0
+        self.sincronizacoes = 0
+
+        self._arquivo = open(caminho, 'ab')
+        if self._arquivo.tell() == 0:
+            self.base = base
+            self.coalescer = coalescer
+            self._arquivo.write(CABECALHO.pack(MAGICO, VERSAO, FLAG_COALESCER if coalescer else 0, base))
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+        else:
+            self.base, self.coalescer, _ = ler_diario(caminho)
+
+        self._parar = threading.Event()
+        self._sincronizador = None
+        if intervalo_fsync:
+            self._sincronizador = threading.Thread(target=self._sincronizar_periodicamente, args=(intervalo_fsync,), daemon=True)
+            self._sincronizador.start()
+
+    def __enter__(self) -> 'Diario':
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def registrar_criacao(self, tempo: int, nRec: int, recursos: Recursos):
+        self._registrar(CRIACAO, _PONTO.pack(tempo, nRec) + _codificar_recursos(recursos))
+
+    def registrar_reserva(self, tempo_inicio: int, tempo_fim: int, reqRec: int, escolhidos: Recursos):
+        self._registrar(RESERVA, _JANELA.pack(tempo_inicio, tempo_fim, reqRec) + _codificar_recursos(escolhidos))
+
+    def registrar_subtracao(self, tempo_inicio: int, tempo_fim: int, reqRec: int, escolhidos: Recursos):
+        self._registrar(SUBTRACAO, _JANELA.pack(tempo_inicio, tempo_fim, reqRec) + _codificar_recursos(escolhidos))
+
+    def registrar_liberacao(self, tempo_inicio: int, tempo_fim: int, recursos: Recursos):
+        self._registrar(LIBERACAO, _PONTO.pack(tempo_inicio, tempo_fim) + _codificar_recursos(recursos))
+
+    def registrar_descarte(self, tempo: int):
+        self._registrar(DESCARTE, _TEMPO.pack(tempo))
+
+    def _registrar(self, tipo: int, corpo: bytes):
+        cauda = struct.pack('<IB', len(corpo), tipo) + corpo
+        registro = struct.pack('<I', zlib.crc32(cauda)) + cauda
+        with self._trava:
+            self._pendentes.append(registro)
+            self.registros += 1
+            if len(self._pendentes) >= self.lote_fsync:
+                self._descarregar()
+
+    def sincronizar(self):
+        with self._trava:
+            self._descarregar()
+
+    def _descarregar(self):
+        if not self._pendentes:
+            return
+        self._arquivo.write(b''.join(self._pendentes))
+        self._pendentes.clear()
+        self._arquivo.flush()
+        os.fsync(self._arquivo.fileno())
+        self.sincronizacoes += 1
+
+    def _sincronizar_periodicamente(self, intervalo: float):
+        while not self._parar.wait(intervalo):
+            self.sincronizar()
+
+    def reiniciar(self, base: int):
+        with self._trava:
+            self._pendentes.clear()
+            self._arquivo.seek(0)
+            self._arquivo.truncate()
+            self._arquivo.write(CABECALHO.pack(MAGICO, VERSAO, FLAG_COALESCER if self.coalescer else 0, base))
+            self._arquivo.flush()
+            os.fsync(self._arquivo.fileno())
+            self.base = base
+
+    def fechar(self):
+        self._parar.set()
+        if self._sincronizador is not None:
+            self._sincronizador.join()
+        self.sincronizar()
+        self._arquivo.close()
+
+def ler_diario(caminho: str) -> Tuple[int, bool, int]:
+    with open(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.read(CABECALHO.size)
+    if len(cabecalho) < CABECALHO.size:
+        raise ValueError(f"diário truncado: {caminho}")
+    magico, versao, flags, base = CABECALHO.unpack(cabecalho)
+    if magico != MAGICO:
+        raise ValueError(f"arquivo não é um diário de perfil: {caminho}")
+    if versao != VERSAO:
+        raise ValueError(f"versão de diário não suportada: {versao}")
+    return base, bool(flags & FLAG_COALESCER), CABECALHO.size
+
+def ler_registros(caminho: str) -> Iterator[Tuple[int, tuple, int]]:
+    ler_diario(caminho)
+    with open(caminho, 'rb') as arquivo:
+        dados = arquivo.read()
+
+    posicao = CABECALHO.size
+    while posicao + REGISTRO.size <= len(dados):
+        crc, tamanho, tipo = REGISTRO.unpack_from(dados, posicao)
+        fim = posicao + REGISTRO.size + tamanho
+        if fim > len(dados) or zlib.crc32(dados[posicao + 4:fim]) != crc:
+            return
+        yield tipo, _decodificar(tipo, dados[posicao + REGISTRO.size:fim]), fim
+        posicao = fim
+
+def recuperar(classe, caminho_instantaneo: str, caminho_diario: str, formato: str = INTERVALOS,
+              pool: Optional[PoolIntervalos] = None, anexar: bool = True, coalescer: Optional[bool] = None):
+    base_diario = valido = None
+    coalescer_diario = False
+    if os.path.exists(caminho_diario):
+        base_diario, coalescer_diario, valido = ler_diario(caminho_diario)
+
+    if os.path.exists(caminho_instantaneo):
+        perfil = classe.carregar(caminho_instantaneo, pool, coalescer)
+        base = instantaneo.ler_geracao(caminho_instantaneo)
+    else:
+        perfil = classe(formato, pool, coalescer_diario if coalescer is None else coalescer)
+        base = 0
+
+    if base_diario == base:
+        perfil, valido = _reaplicar(perfil, ler_registros(caminho_diario), valido)
+    elif base_diario is not None and base_diario > base:
+        raise ValueError(f"diário depende de um instantâneo ausente ou mais antigo: {caminho_instantaneo}")
+
+    if anexar:
+        if base_diario == base:
+            with open(caminho_diario, 'r+b') as arquivo:
+                arquivo.truncate(valido)
+            perfil.diario = Diario(caminho_diario)
+        else:
+            if os.path.exists(caminho_diario):
+                os.remove(caminho_diario)
+            perfil.diario = Diario(caminho_diario, base, coalescer=perfil.coalescer)
+    return perfil
+
+def checkpoint(perfil, caminho_instantaneo: str):
+    perfil.salvar(caminho_instantaneo)
+    if perfil.diario is not None:
+        perfil.diario.reiniciar(instantaneo.ler_geracao(caminho_instantaneo))
+
+def _reaplicar(perfil, registros: Iterator[Tuple[int, tuple, int]], valido: int):
+    criacoes = []
+    for tipo, campos, fim in registros:
+        if tipo == CRIACAO:
+            criacoes.append(campos)
+        else:
+            perfil = _aplicar_criacoes(perfil, criacoes)
+            criacoes = []
+            if tipo == RESERVA:
+                perfil.efetivar_reserva(*campos)
+            elif tipo == SUBTRACAO:
+                perfil.subtrair_recursos(*campos)
+            elif tipo == LIBERACAO:
+                perfil.liberar(*campos)
+            elif tipo == DESCARTE:
+                perfil.descartar_ate(*campos)
+        valido = fim
+    return _aplicar_criacoes(perfil, criacoes), valido
+
+def _aplicar_criacoes(perfil, pontos: List[Tuple[int, int, Recursos]]):
+    if not pontos:
+        return perfil
+
+    tamanho = len(perfil)
+    if perfil.coalescer or len(pontos) * max(1, tamanho.bit_length()) < tamanho:
+        for tempo, nRec, recursos in pontos:
+            perfil.criar_no(tempo, nRec, recursos)
+        return perfil
+
+    existentes = ((no.tempo, no.nRec, no.intervalos) for no in perfil)
+    mesclados = heapq.merge(existentes, sorted(pontos, key=itemgetter(0)), key=itemgetter(0))
+    reconstruido = type(perfil).construir_de_ordenados(mesclados, perfil.formato, perfil.pool, perfil.coalescer)
+    reconstruido.diario = perfil.diario
+    reconstruido.metricas = perfil.metricas
+    cache = perfil.cache_ancoras
+    if cache is not None:
+        reconstruido.ativar_cache_ancoras(cache.capacidade, cache.largura_balde, cache.passos_maximos)
+    return reconstruido
@@ -0,0 +1,178 @@
+import argparse
+import heapq
+import time
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+from carga import RESERVAR, Operacao, gerar_sintetica, ler_swf
+from metricas import Histograma
+from recursos import INTERVALOS, Recursos
+
+FCFS = 'fcfs'
+EASY = 'easy'
+CONSERVADOR = 'conservador'
+POLITICAS = (FCFS, EASY, CONSERVADOR)
+
+class Tarefa:
+    __slots__ = ('identificador', 'submissao', 'duracao', 'reqRec', 'inicio', 'recursos')
+
+    def __init__(self, identificador: int, submissao: int, duracao: int, reqRec: int):
+        self.identificador = identificador
+        self.submissao = submissao
+        self.duracao = duracao
+        self.reqRec = reqRec
+
+        self.inicio: Optional[int] = None
+        self.recursos: Optional[Recursos] = None
+
+def tarefas_de_operacoes(operacoes: Iterable[Operacao]) -> Iterator[Tarefa]:
+    identificador = 0
+    for tipo, (t0, t1, reqRec) in operacoes:
+        if tipo != RESERVAR:
+            continue
+        yield Tarefa(identificador, t0, t1 - t0, reqRec)
+        identificador += 1
+
+class Escalonador:
+    def __init__(self, perfil, total_recursos: int, politica: str = EASY, descartar_a_cada: int = 1024):
+        if politica not in POLITICAS:
+            raise ValueError(f"política desconhecida: {politica}")
+        self.perfil = perfil
+        self.total_recursos = total_recursos
+        self.politica = politica
+        self.descartar_a_cada = descartar_a_cada
+
+        self.fila: Deque[Tarefa] = deque()
+        self.eventos: List[int] = []
+        self.reservada: Optional[Tarefa] = None
+
+        self.escalonadas = 0
+        self.rejeitadas = 0
+        self.espera = Histograma()
+        self.area = 0
+        self.primeira_submissao: Optional[int] = None
+        self.termino = 0
+
+    def _reservar(self, tarefa: Tarefa, tempo: int, encaixe: Optional[Tuple[int, Recursos]] = None) -> bool:
+        if encaixe is None:
+            encaixe = self.perfil.encontrar_primeiro_encaixe(tempo, tarefa.duracao, tarefa.reqRec)
+        if encaixe is None:
+            self.rejeitadas += 1
+            return False
+
+        inicio, intersec = encaixe
+        tarefa.inicio = inicio
+        tarefa.recursos = self.perfil.efetivar_reserva(inicio, inicio + tarefa.duracao, tarefa.reqRec, intersec)
+        self.escalonadas += 1
+        self.espera.registrar(inicio - tarefa.submissao)
+        self.area += tarefa.duracao * tarefa.reqRec
+        self.termino = max(self.termino, inicio + tarefa.duracao)
+        heapq.heappush(self.eventos, inicio + tarefa.duracao if inicio == tempo else inicio)
+        return True
+
+    def _agendar(self, tempo: int):
+        if self.reservada is not None and self.reservada.inicio <= tempo:
+            self.fila.popleft()
+            heapq.heappush(self.eventos, self.reservada.inicio + self.reservada.duracao)
+            self.reservada = None
+
+        while self.fila and self.reservada is None:
+            cabeca = self.fila[0]
+            if not self._reservar(cabeca, tempo):
+                self.fila.popleft()
+            elif cabeca.inicio == tempo:
+                self.fila.popleft()
+            else:
+                self.reservada = cabeca
+
+        if self.politica == EASY and len(self.fila) > 1:
+            restantes = [self.fila.popleft()]
+            for tarefa in self.fila:
+                encaixe = self.perfil.encontrar_primeiro_encaixe(tempo, tarefa.duracao, tarefa.reqRec)
+                if encaixe is not None and encaixe[0] == tempo:
+                    self._reservar(tarefa, tempo, encaixe)
+                elif encaixe is None:
+                    self.rejeitadas += 1
+                else:
+                    restantes.append(tarefa)
+            self.fila = deque(restantes)
+
+    def executar(self, tarefas: Iterable[Tarefa]) -> dict:
+        chegadas = iter(tarefas)
+        proxima = next(chegadas, None)
+        passos = 0
+        inicio = time.perf_counter()
+
+        while proxima is not None or self.eventos or self.fila:
+            candidatos = []
+            if proxima is not None:
+                candidatos.append(proxima.submissao)
+            if self.eventos:
+                candidatos.append(self.eventos[0])
+            if not candidatos:
+                break
+            tempo = min(candidatos)
+            while self.eventos and self.eventos[0] <= tempo:
+                heapq.heappop(self.eventos)
+
+            while proxima is not None and proxima.submissao <= tempo:
+                if self.primeira_submissao is None:
+                    self.primeira_submissao = proxima.submissao
+                if self.politica == CONSERVADOR:
+                    self._reservar(proxima, tempo)
+                else:
+                    self.fila.append(proxima)
+                proxima = next(chegadas, None)
+
+            if self.politica != CONSERVADOR:
+                self._agendar(tempo)
+
+            passos += 1
+            if self.descartar_a_cada and passos % self.descartar_a_cada == 0:
+                self.perfil.descartar_ate(tempo)
+
+        segundos = time.perf_counter() - inicio
+        return self.relatorio(segundos)
+
+    def relatorio(self, segundos: float) -> dict:
+        periodo = self.termino - (self.primeira_submissao or 0)
+        return {
+            'politica': self.politica,
+            'escalonadas': self.escalonadas,
+            'rejeitadas': self.rejeitadas,
+            'segundos': segundos,
+            'tarefas_por_segundo': self.escalonadas / segundos if segundos else 0.0,
+            'espera': self.espera.como_dict(),
+            'utilizacao': self.area / (self.total_recursos * periodo) if periodo > 0 else 0.0,
+            'termino': self.termino,
+        }
+
+def main():
+    from benchmark import BACKENDS
+
+    parser = argparse.ArgumentParser(description='Escalona uma fila de tarefas sobre um perfil de disponibilidade.')
+    parser.add_argument('rastro', nargs='?', help='arquivo no Standard Workload Format; sem ele gera tarefas sintéticas')
+    parser.add_argument('--backend', default='rn', choices=list(BACKENDS))
+    parser.add_argument('--politicas', nargs='+', default=list(POLITICAS), choices=list(POLITICAS))
+    parser.add_argument('--recursos', type=int, default=128)
+    parser.add_argument('--tarefas', type=int, default=20000, help='quantidade de tarefas sintéticas')
+    parser.add_argument('--semente', type=int, default=0)
+    opcoes = parser.parse_args()
+
+    _, construir, _ = BACKENDS[opcoes.backend]
+    for politica in opcoes.politicas:
+        if opcoes.rastro:
+            operacoes = ler_swf(opcoes.rastro)
+        else:
+            operacoes = gerar_sintetica(opcoes.recursos, req_normal=opcoes.recursos // 8 or 1, semente=opcoes.semente,
+                                        proporcoes={RESERVAR: 1.0}, quantidade=opcoes.tarefas)
+        perfil = construir([(0, opcoes.recursos, [(0, opcoes.recursos - 1)])], INTERVALOS)
+        escalonador = Escalonador(perfil, opcoes.recursos, politica)
+        relatorio = escalonador.executar(tarefas_de_operacoes(operacoes))
+        print(f"===== {politica} =====")
+        print(f"{relatorio['escalonadas']} tarefas escalonadas ({relatorio['rejeitadas']} rejeitadas) em "
+              f"{relatorio['segundos']:.2f} s: {relatorio['tarefas_por_segundo']:.0f} tarefas/s")
+        print(f"espera média {relatorio['espera']['media']:.1f}, máxima {relatorio['espera']['maximo']}; "
+              f"utilização {relatorio['utilizacao']:.1%}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,291 @@
+import multiprocessing
+from bisect import bisect_right
+from typing import Iterable, List, Optional, Sequence, Tuple
+from recursos import (INTERVALOS, Recursos, contar_recursos, converter, intersecao_recursos, selecionar_recursos,
+                      validar_formato)
+from rubronegra import PerfilDisponibilidadeRN
+
+Ponto = Tuple[int, int, Recursos]
+
+class _Fragmento:
+    def __init__(self, classe, formato: str, fim: Optional[int], pontos: List[Ponto]):
+        self.classe = classe
+        self.formato = formato
+        self.fim = fim
+        self.perfil = classe.construir_de_ordenados(pontos, formato)
+
+    def tamanho(self) -> int:
+        return len(self.perfil)
+
+    def criar_no(self, tempo: int, nRec: int, intervalos: Recursos):
+        self.perfil.criar_no(tempo, nRec, intervalos)
+
+    def ancora(self, tempo: int) -> Optional[Ponto]:
+        no = self.perfil.encontrar_ancora(tempo)
+        return None if no is None else (no.tempo, no.nRec, no.intervalos)
+
+    def ultimo(self) -> Optional[Ponto]:
+        no = self.perfil.maximo
+        return None if no is None or no is getattr(self.perfil, 'nulo', None) else (no.tempo, no.nRec, no.intervalos)
+
+    def resumo(self, tempo_inicio: int, tempo_fim: int) -> Optional[Tuple[int, Recursos, int]]:
+        return self.perfil.resumo_entre(tempo_inicio, tempo_fim)
+
+    def confirmar_locais(self, chamadas: List[Tuple[int, int, int, int]]) -> List[Tuple[int, Optional[tuple]]]:
+        respostas = []
+        for indice, tempo_inicio, tempo_fim, reqRec in chamadas:
+            if (self.fim is not None and tempo_fim > self.fim) or self.perfil.encontrar_ancora(tempo_inicio) is None:
+                respostas.append((indice, None))
+            else:
+                respostas.append((indice, self.perfil.confirmar_disponibilidade(tempo_inicio, tempo_fim, reqRec)))
+        return respostas
+
+    def dividir(self, tempo: int, herdado: Optional[Ponto]):
+        ancora = self.perfil.encontrar_ancora(tempo)
+        if ancora is not None and ancora.tempo == tempo:
+            return
+        if ancora is not None:
+            self.perfil.criar_no(tempo, ancora.nRec, ancora.intervalos)
+        elif herdado is not None:
+            self.perfil.criar_no(tempo, herdado[1], herdado[2])
+
+    def subtrair(self, tempo_inicio: int, tempo_fim: int, reqRec: int, escolhidos: Recursos) -> int:
+        return self.perfil.subtrair_recursos(tempo_inicio, tempo_fim, reqRec, escolhidos)
+
+    def liberar(self, tempo_inicio: int, tempo_fim: int, recursos: Recursos) -> int:
+        return self.perfil.liberar(tempo_inicio, tempo_fim, recursos)
+
+    def separar_mediana(self) -> Optional[Tuple[int, List[Ponto]]]:
+        pontos = [(no.tempo, no.nRec, no.intervalos) for no in self.perfil]
+        meio = len(pontos) // 2
+        while 0 < meio and pontos[meio - 1][0] == pontos[meio][0]:
+            meio -= 1
+        if meio == 0:
+            return None
+        mediana = pontos[meio][0]
+        self.perfil = self.classe.construir_de_ordenados(pontos[:meio], self.formato)
+        self.fim = mediana
+        return mediana, pontos[meio:]
+
+def _executar_fragmento(conexao, classe, formato: str, fim: Optional[int], pontos: List[Ponto]):
+    fragmento = _Fragmento(classe, formato, fim, pontos)
+    while True:
+        mensagem = conexao.recv()
+        if mensagem is None:
+            break
+        operacao, argumentos = mensagem
+        try:
+            conexao.send((True, getattr(fragmento, operacao)(*argumentos)))
+        except Exception as erro:
+            conexao.send((False, erro))
+    conexao.close()
+
+class PerfilFragmentado:
+    def __init__(self, fronteiras: Sequence[int] = (), classe=PerfilDisponibilidadeRN, formato: str = INTERVALOS,
+                 fator_rebalanceamento: float = 2.0, rebalancear_a_cada: int = 0, contexto: Optional[str] = None,
+                 _pontos: Optional[List[List[Ponto]]] = None):
+        self.formato = validar_formato(formato)
+        self.classe = classe
+        self.fronteiras = sorted(fronteiras)
+        self.fator_rebalanceamento = fator_rebalanceamento
+        self.rebalancear_a_cada = rebalancear_a_cada
+
+        self._contexto = multiprocessing.get_context(contexto)
+        self._processos = []
+        self._conexoes = []
+        self.carga = []
+        self._operacoes = 0
+
+        pontos = _pontos if _pontos is not None else [[] for _ in range(len(self.fronteiras) + 1)]
+        for i, pontos_fragmento in enumerate(pontos):
+            fim = self.fronteiras[i] if i < len(self.fronteiras) else None
+            self._iniciar(i, fim, pontos_fragmento)
+
+    @classmethod
+    def construir_de_ordenados(cls, iteravel: Iterable[Tuple[int, int, Recursos]], quantidade_fragmentos: int = 0,
+                               classe=PerfilDisponibilidadeRN, formato: str = INTERVALOS, **opcoes) -> 'PerfilFragmentado':
+        pontos = []
+        for tempo, nRec, intervalos in iteravel:
+            if pontos and tempo < pontos[-1][0]:
+                raise ValueError("construir_de_ordenados exige tempos em ordem crescente")
+            pontos.append((tempo, nRec, converter(intervalos, formato)))
+
+        quantidade_fragmentos = quantidade_fragmentos or multiprocessing.cpu_count()
+        fronteiras = []
+        for i in range(1, quantidade_fragmentos):
+            tempo = pontos[i * len(pontos) // quantidade_fragmentos][0] if pontos else 0
+            if (not fronteiras or tempo > fronteiras[-1]) and (not pontos or tempo > pontos[0][0]):
+                fronteiras.append(tempo)
+
+        particoes = [[] for _ in range(len(fronteiras) + 1)]
+        for ponto in pontos:
+            particoes[bisect_right(fronteiras, ponto[0])].append(ponto)
+        return cls(fronteiras, classe, formato, _pontos=particoes, **opcoes)
+
+    def __enter__(self) -> 'PerfilFragmentado':
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def __len__(self) -> int:
+        for i in range(len(self._conexoes)):
+            self._enviar(i, 'tamanho')
+        return sum(self._receber(i) for i in range(len(self._conexoes)))
+
+    def fechar(self):
+        for conexao in self._conexoes:
+            conexao.send(None)
+        for processo in self._processos:
+            processo.join()
+        self._conexoes = []
+        self._processos = []
+
+    def _iniciar(self, posicao: int, fim: Optional[int], pontos: List[Ponto]):
+        local, remota = self._contexto.Pipe()
+        processo = self._contexto.Process(target=_executar_fragmento, args=(remota, self.classe, self.formato, fim, pontos), daemon=True)
+        processo.start()
+        remota.close()
+        self._processos.insert(posicao, processo)
+        self._conexoes.insert(posicao, local)
+        self.carga.insert(posicao, 0)
+
+    def _enviar(self, fragmento: int, operacao: str, *argumentos):
+        self._conexoes[fragmento].send((operacao, argumentos))
+
+    def _receber(self, fragmento: int):
+        sucesso, resposta = self._conexoes[fragmento].recv()
+        if not sucesso:
+            raise resposta
+        return resposta
+
+    def _chamar(self, fragmento: int, operacao: str, *argumentos):
+        self._enviar(fragmento, operacao, *argumentos)
+        return self._receber(fragmento)
+
+    def _fragmento(self, tempo: int) -> int:
+        return bisect_right(self.fronteiras, tempo)
+
+    def _registrar(self, fragmento: int):
+        self.carga[fragmento] += 1
+        self._operacoes += 1
+        if self.rebalancear_a_cada and self._operacoes % self.rebalancear_a_cada == 0:
+            self.rebalancear()
+
+    def criar_no(self, tempo: int, nRec: int, intervalos: Recursos):
+        fragmento = self._fragmento(tempo)
+        self._chamar(fragmento, 'criar_no', tempo, nRec, converter(intervalos, self.formato))
+        self._registrar(fragmento)
+
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[Ponto]:
+        fragmento = self._fragmento(tempo_inicio)
+        ponto = self._chamar(fragmento, 'ancora', tempo_inicio)
+        while ponto is None and fragmento > 0:
+            fragmento -= 1
+            ponto = self._chamar(fragmento, 'ultimo')
+        return ponto
+
+    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, Recursos]], int, int]:
+        self._registrar(self._fragmento(tempo_inicio))
+        return self._confirmar(self.encontrar_ancora(tempo_inicio), tempo_inicio, tempo_fim, reqRec)
+
+    def _confirmar(self, ancora: Optional[Ponto], tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, Recursos]], int, int]:
+        if ancora is None or ancora[1] < reqRec or ancora[0] >= tempo_fim:
+            return None, 0, 0
+
+        fragmentos = range(self._fragmento(tempo_inicio), self._fragmento(tempo_fim) + 1)
+        for i in fragmentos:
+            self._enviar(i, 'resumo', tempo_inicio + 1, tempo_fim)
+        resumos = [resumo for resumo in (self._receber(i) for i in fragmentos) if resumo is not None]
+
+        total_possivel = 1 + sum(tamanho for _, _, tamanho in resumos)
+        if any(min_nRec < reqRec for min_nRec, _, _ in resumos):
+            return None, 1 + len(resumos), total_possivel
+
+        intersec = ancora[2]
+        visitados = 1
+        if contar_recursos(intersec, self.formato) < reqRec:
+            return None, visitados, total_possivel
+        for _, intervalos, _ in resumos:
+            visitados += 1
+            intersec = intersecao_recursos(intersec, intervalos, self.formato)
+            if contar_recursos(intersec, self.formato) < reqRec:
+                return None, visitados, total_possivel
+
+        return (ancora[0], intersec), visitados, total_possivel
+
+    def confirmar_lote(self, chamadas: List[Tuple[int, int, int]]) -> List[Tuple[Optional[Tuple[int, Recursos]], int, int]]:
+        por_fragmento = {}
+        for indice, (tempo_inicio, tempo_fim, reqRec) in enumerate(chamadas):
+            fragmento = self._fragmento(tempo_inicio)
+            por_fragmento.setdefault(fragmento, []).append((indice, tempo_inicio, tempo_fim, reqRec))
+            self.carga[fragmento] += 1
+
+        for fragmento, locais in por_fragmento.items():
+            self._enviar(fragmento, 'confirmar_locais', locais)
+        resultados = [None] * len(chamadas)
+        for fragmento in por_fragmento:
+            for indice, resultado in self._receber(fragmento):
+                resultados[indice] = resultado
+
+        for indice, resultado in enumerate(resultados):
+            if resultado is None:
+                tempo_inicio, tempo_fim, reqRec = chamadas[indice]
+                resultados[indice] = self._confirmar(self.encontrar_ancora(tempo_inicio), tempo_inicio, tempo_fim, reqRec)
+        return resultados
+
+    def reservar(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Optional[Recursos]:
+        self._registrar(self._fragmento(tempo_inicio))
+        ancora = self.encontrar_ancora(tempo_inicio)
+        resultado, _, _ = self._confirmar(ancora, tempo_inicio, tempo_fim, reqRec)
+        if resultado is None:
+            return None
+
+        escolhidos = selecionar_recursos(resultado[1], reqRec, self.formato)
+        primeiro = self._fragmento(tempo_inicio)
+        ultimo = self._fragmento(tempo_fim)
+
+        herdado_fim = self.encontrar_ancora(tempo_fim)
+        self._enviar(primeiro, 'dividir', tempo_inicio, ancora)
+        self._receber(primeiro)
+        self._enviar(ultimo, 'dividir', tempo_fim, herdado_fim)
+        self._receber(ultimo)
+
+        for i in range(primeiro, ultimo + 1):
+            self._enviar(i, 'subtrair', tempo_inicio, tempo_fim, reqRec, escolhidos)
+        for i in range(primeiro, ultimo + 1):
+            self._receber(i)
+        return escolhidos
+
+    def liberar(self, tempo_inicio: int, tempo_fim: int, recursos: Recursos) -> int:
+        primeiro = self._fragmento(tempo_inicio)
+        ultimo = self._fragmento(tempo_fim)
+        self._registrar(primeiro)
+
+        herdado_inicio = self.encontrar_ancora(tempo_inicio)
+        herdado_fim = self.encontrar_ancora(tempo_fim)
+        self._enviar(primeiro, 'dividir', tempo_inicio, herdado_inicio)
+        self._receber(primeiro)
+        self._enviar(ultimo, 'dividir', tempo_fim, herdado_fim)
+        self._receber(ultimo)
+
+        for i in range(primeiro, ultimo + 1):
+            self._enviar(i, 'liberar', tempo_inicio, tempo_fim, recursos)
+        return sum(self._receber(i) for i in range(primeiro, ultimo + 1))
+
+    def rebalancear(self) -> bool:
+        media = sum(self.carga) / len(self.carga)
+        quente = max(range(len(self.carga)), key=self.carga.__getitem__)
+        if not self.carga[quente] or (len(self.carga) > 1 and self.carga[quente] < self.fator_rebalanceamento * media):
+            return False
+
+        separacao = self._chamar(quente, 'separar_mediana')
+        if separacao is None:
+            return False
+
+        mediana, pontos = separacao
+        fim = self.fronteiras[quente] if quente < len(self.fronteiras) else None
+        self.fronteiras.insert(quente, mediana)
+        self._iniciar(quente + 1, fim, pontos)
+        self.carga = [0] * len(self.carga)
+        return True
@@ -0,0 +1,188 @@
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import List, Optional, Tuple
+from recursos import BITSET, INTERVALOS, PoolIntervalos, Recursos, contar_recursos, intersecao_recursos
+
+MAGICO = b'PERFDISP'
+VERSAO = 1
+FLAG_BITSET = 1
+FLAG_COALESCER = 2
+CABECALHO = struct.Struct('<8sHHIQQQ')
+PAR = struct.Struct('<qq')
+
+def salvar(perfil, caminho: str):
+    tempos = array('q')
+    nRecs = array('q')
+    inicios = array('q')
+    tamanhos = array('q')
+    pool = bytearray()
+    posicoes = {}
+
+    bitset = perfil.formato == BITSET
+    for no in perfil:
+        tempos.append(no.tempo)
+        nRecs.append(no.nRec)
+        chave = no.intervalos if bitset else tuple(no.intervalos)
+        posicao = posicoes.get(chave)
+        if posicao is None:
+            inicio = len(pool)
+            if bitset:
+                pool += chave.to_bytes(8 * max(1, -(-chave.bit_length() // 64)), 'little')
+            else:
+                for comeco, fim in chave:
+                    pool += PAR.pack(comeco, fim)
+            posicao = posicoes[chave] = (inicio, len(pool) - inicio)
+        inicios.append(posicao[0])
+        tamanhos.append(posicao[1])
+
+    colunas = (tempos, nRecs, inicios, tamanhos)
+    if sys.byteorder != 'little':
+        for coluna in colunas:
+            coluna.byteswap()
+    crc = 0
+    for parte in (*colunas, pool):
+        crc = zlib.crc32(parte, crc)
+
+    try:
+        geracao = ler_geracao(caminho) + 1
+    except (OSError, ValueError):
+        geracao = 1
+
+    temporario = caminho + '.tmp'
+    with open(temporario, 'wb') as arquivo:
+        flags = (FLAG_BITSET if bitset else 0) | (FLAG_COALESCER if perfil.coalescer else 0)
+        arquivo.write(CABECALHO.pack(MAGICO, VERSAO, flags, crc, len(tempos), len(pool), geracao))
+        for parte in (*colunas, pool):
+            arquivo.write(parte)
+        arquivo.flush()
+        os.fsync(arquivo.fileno())
+    os.replace(temporario, caminho)
+
+def ler_geracao(caminho: str) -> int:
+    with open(caminho, 'rb') as arquivo:
+        cabecalho = arquivo.read(CABECALHO.size)
+    if len(cabecalho) < CABECALHO.size or cabecalho[:len(MAGICO)] != MAGICO:
+        raise ValueError(f"arquivo não é um instantâneo de perfil: {caminho}")
+    return CABECALHO.unpack(cabecalho)[6]
+
+def carregar(classe, caminho: str, pool: Optional[PoolIntervalos] = None, verificar: bool = True, coalescer: Optional[bool] = None):
+    with PerfilMapeado(caminho, verificar) as mapeado:
+        decodificados = {}
+
+        def pontos():
+            for tempo, nRec, inicio, tamanho in zip(mapeado.tempos, mapeado.nRecs, mapeado.inicios, mapeado.tamanhos):
+                recursos = decodificados.get((inicio, tamanho))
+                if recursos is None:
+                    recursos = decodificados[inicio, tamanho] = mapeado._decodificar(inicio, tamanho)
+                yield tempo, nRec, recursos
+
+        return classe.construir_de_ordenados(pontos(), mapeado.formato, pool, mapeado.coalescer if coalescer is None else coalescer)
+
+class PerfilMapeado:
+    def __init__(self, caminho: str, verificar: bool = True):
+        with open(caminho, 'rb') as arquivo:
+            self._mapa = mmap.mmap(arquivo.fileno(), 0, access=mmap.ACCESS_READ)
+        self._visoes = []
+
+        try:
+            if len(self._mapa) < CABECALHO.size:
+                raise ValueError(f"instantâneo truncado: {caminho}")
+            magico, versao, flags, crc, quantidade, tamanho_pool, geracao = CABECALHO.unpack_from(self._mapa)
+            if magico != MAGICO:
+                raise ValueError(f"arquivo não é um instantâneo de perfil: {caminho}")
+            if versao != VERSAO:
+                raise ValueError(f"versão de instantâneo não suportada: {versao}")
+
+            carga = self._visao(memoryview(self._mapa)[CABECALHO.size:])
+            if len(carga) != 32 * quantidade + tamanho_pool:
+                raise ValueError(f"instantâneo truncado: {caminho}")
+            if verificar and zlib.crc32(carga) != crc:
+                raise ValueError(f"checksum inválido no instantâneo: {caminho}")
+
+            self.formato = BITSET if flags & FLAG_BITSET else INTERVALOS
+            self.coalescer = bool(flags & FLAG_COALESCER)
+            self.crc = crc
+            self.geracao = geracao
+            self.tempos, self.nRecs, self.inicios, self.tamanhos = (
+                self._coluna(carga[8 * quantidade * i:8 * quantidade * (i + 1)]) for i in range(4))
+            self.pool = self._visao(carga[32 * quantidade:])
+        except Exception:
+            self.fechar()
+            raise
+
+    def __enter__(self) -> 'PerfilMapeado':
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def fechar(self):
+        for visao in reversed(self._visoes):
+            visao.release()
+        self._visoes = []
+        if not self._mapa.closed:
+            self._mapa.close()
+
+    def _visao(self, visao: memoryview) -> memoryview:
+        self._visoes.append(visao)
+        return visao
+
+    def _coluna(self, bruto: memoryview):
+        if sys.byteorder != 'little':
+            coluna = array('q', bruto.tobytes())
+            coluna.byteswap()
+            return coluna
+        return self._visao(self._visao(bruto).cast('q'))
+
+    def _decodificar(self, inicio: int, tamanho: int) -> Recursos:
+        bruto = self.pool[inicio:inicio + tamanho]
+        if self.formato == BITSET:
+            return int.from_bytes(bruto, 'little')
+        return list(PAR.iter_unpack(bruto))
+
+    def __len__(self) -> int:
+        return len(self.tempos)
+
+    def ponto(self, indice: int) -> Tuple[int, int, Recursos]:
+        return self.tempos[indice], self.nRecs[indice], self._decodificar(self.inicios[indice], self.tamanhos[indice])
+
+    def __iter__(self):
+        for indice in range(len(self)):
+            yield self.ponto(indice)
+
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[int]:
+        indice = bisect_right(self.tempos, tempo_inicio) - 1
+        return indice if indice >= 0 else None
+
+    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, Recursos]], int, int]:
+        ancora = self.encontrar_ancora(tempo_inicio)
+        if ancora is None or self.nRecs[ancora] < reqRec or self.tempos[ancora] >= tempo_fim:
+            return None, 0, 0
+
+        ultimo = bisect_left(self.tempos, tempo_fim) - 1
+        total_possivel = ultimo - ancora + 1
+        if min(self.nRecs[ancora:ultimo + 1]) < reqRec:
+            return None, total_possivel, total_possivel
+
+        anterior = (self.inicios[ancora], self.tamanhos[ancora])
+        intersec = self._decodificar(*anterior)
+        if contar_recursos(intersec, self.formato) < reqRec:
+            return None, 1, total_possivel
+        for indice in range(ancora + 1, ultimo + 1):
+            atual = (self.inicios[indice], self.tamanhos[indice])
+            if atual == anterior:
+                continue
+            anterior = atual
+            intersec = intersecao_recursos(intersec, self._decodificar(*atual), self.formato)
+            if contar_recursos(intersec, self.formato) < reqRec:
+                return None, indice - ancora + 1, total_possivel
+
+        return (self.tempos[ancora], intersec), total_possivel, total_possivel
+
+    def confirmar_lote(self, chamadas: List[Tuple[int, int, int]]) -> List[Tuple[Optional[Tuple[int, Recursos]], int, int]]:
+        return [self.confirmar_disponibilidade(t0, t1, reqRec) for t0, t1, reqRec in chamadas]
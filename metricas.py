@@ -0,0 +1,61 @@
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict
+
+class Histograma:
+    def __init__(self):
+        self.contagem = 0
+        self.soma = 0
+        self.maximo = 0
+        self.baldes = Counter()
+
+    def registrar(self, valor: int):
+        self.contagem += 1
+        self.soma += valor
+        if valor > self.maximo:
+            self.maximo = valor
+        self.baldes[valor.bit_length()] += 1
+
+    def como_dict(self) -> dict:
+        return {
+            'contagem': self.contagem,
+            'media': self.soma / self.contagem if self.contagem else 0.0,
+            'maximo': self.maximo,
+            'baldes': {f"<={(1 << bits) - 1}": quantidade for bits, quantidade in sorted(self.baldes.items())},
+        }
+
+class Metricas:
+    def __init__(self):
+        self.contadores = Counter()
+        self.histogramas: Dict[str, Histograma] = {}
+
+    def incrementar(self, nome: str, quantidade: int = 1):
+        self.contadores[nome] += quantidade
+
+    def registrar(self, nome: str, valor: int):
+        histograma = self.histogramas.get(nome)
+        if histograma is None:
+            histograma = self.histogramas[nome] = Histograma()
+        histograma.registrar(valor)
+
+    def zerar(self):
+        self.contadores.clear()
+        self.histogramas.clear()
+
+    def como_dict(self) -> dict:
+        return {
+            'contadores': dict(self.contadores),
+            'histogramas': {nome: histograma.como_dict() for nome, histograma in self.histogramas.items()},
+        }
+
+@contextmanager
+def perfilar(*perfis, metricas: Metricas = None):
+    metricas = metricas if metricas is not None else Metricas()
+    anteriores = [perfil.metricas for perfil in perfis]
+    for perfil in perfis:
+        perfil.metricas = metricas
+    try:
+        yield metricas
+    finally:
+        for perfil, anterior in zip(perfis, anteriores):
+            perfil.metricas = anterior
@@ -0,0 +1,408 @@
+from abc import ABC, abstractmethod
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Tuple
+from cache import CacheAncoras
+from recursos import BITSET, INTERVALOS, PoolIntervalos, Recursos, converter, mesclar_intervalos, selecionar_recursos, subtrair_intervalos, unir_intervalos, validar_formato
+import instantaneo
+
+if TYPE_CHECKING:
+    from congelado import PerfilCongelado
+
+No = Any
+
+class PerfilBase(ABC):
+    def __init__(self, formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False):
+        self.formato = validar_formato(formato)
+        self.pool = None if formato == BITSET else (pool if pool is not None else PoolIntervalos())
+        self.coalescer = coalescer
+        self.diario = None
+        self.metricas = None
+        self.cache_ancoras = None
+        self.maximo = None
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    @classmethod
+    @abstractmethod
+    def construir_de_ordenados(cls, iteravel: Iterable[Tuple[int, int, Recursos]], formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False) -> 'PerfilBase':
+        raise NotImplementedError
+
+    @abstractmethod
+    def _primeiro(self) -> Optional[No]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[No]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _buscar_ancora(self, tempo_inicio: int) -> Tuple[Optional[No], int]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _encontrar_anterior(self, tempo: int) -> Optional[No]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _decompor_janela(self, inicio: No, fim: No) -> List[Tuple[int, Recursos, int]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _inserir_ponto(self, tempo: int, nRec: int, intervalos: Recursos) -> No:
+        raise NotImplementedError
+
+    @abstractmethod
+    def _remover_no(self, no: No):
+        raise NotImplementedError
+
+    @abstractmethod
+    def _atualizar_agregados_de(self, nos: List[No]):
+        raise NotImplementedError
+
+    def _antecipar(self, no: No, tempo: int):
+        no.tempo = tempo
+
+    @abstractmethod
+    def descartar_ate(self, tempo: int) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def compactar(self) -> int:
+        raise NotImplementedError
+
+    def ativar_cache_ancoras(self, capacidade: int = 8, largura_balde: int = 1024, passos_maximos: int = 16) -> CacheAncoras:
+        self.cache_ancoras = CacheAncoras(self, capacidade, largura_balde, passos_maximos)
+        return self.cache_ancoras
+
+    def _invalidar_ancoras(self):
+        if self.cache_ancoras is not None:
+            self.cache_ancoras.invalidar()
+
+    def criar_no(self, tempo: int, nRec: int, intervalos: Recursos) -> No:
+        intervalos = self._preparar_recursos(intervalos)
+        if self.coalescer:
+            novo = self._criar_no_coalescido(tempo, nRec, intervalos)
+        else:
+            novo = self._inserir_ponto(tempo, nRec, intervalos)
+        if self.diario is not None:
+            self.diario.registrar_criacao(tempo, nRec, intervalos)
+        return novo
+
+    def _criar_no_coalescido(self, tempo: int, nRec: int, intervalos: Recursos) -> No:
+        ancora = self.encontrar_ancora(tempo)
+        if ancora is not None and ancora.tempo == tempo:
+            ancora.nRec = nRec
+            ancora.intervalos = intervalos
+            self._atualizar_agregados_de([ancora])
+            return self._coalescer_vizinhos(ancora)
+        if ancora is not None and self._mesma_disponibilidade(ancora, nRec, intervalos):
+            return ancora
+
+        seguinte = ancora.proximo if ancora is not None else self._primeiro()
+        if seguinte is not None and self._mesma_disponibilidade(seguinte, nRec, intervalos):
+            self._antecipar(seguinte, tempo)
+            return seguinte
+
+        return self._inserir_ponto(tempo, nRec, intervalos)
+
+    def _coalescer_vizinhos(self, no: No) -> No:
+        seguinte = no.proximo
+        if seguinte is not None and self._mesma_disponibilidade(no, seguinte.nRec, seguinte.intervalos):
+            self._remover_no(seguinte)
+        anterior = no.anterior
+        if anterior is not None and self._mesma_disponibilidade(anterior, no.nRec, no.intervalos):
+            self._remover_no(no)
+            return anterior
+        return no
+
+    def _mesma_disponibilidade(self, no: No, nRec: int, intervalos: Recursos) -> bool:
+        return no.nRec == nRec and (no.intervalos is intervalos or no.intervalos == intervalos)
+
+    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, Recursos]], int, int]:
+        ancora = self.encontrar_ancora(tempo_inicio)
+        if ancora is None or ancora.nRec < reqRec or ancora.tempo >= tempo_fim:
+            return None, 0, 0
+
+        partes = self._decompor_janela(ancora, self._encontrar_anterior(tempo_fim))
+        total_possivel = sum(tamanho for _, _, tamanho in partes)
+        if self.metricas is not None:
+            self.metricas.registrar('janela', total_possivel)
+            self.metricas.registrar('partes_janela', len(partes))
+
+        visitados = len(partes)
+        if min(min_nRec for min_nRec, _, _ in partes) < reqRec:
+            return None, visitados, total_possivel
+
+        intersec = ancora.intervalos
+        for visitados, (_, intervalos, _) in enumerate(partes, 1):
+            intersec = self._intersecao_intervalos(intersec, intervalos)
+            if self._contar_recursos(intersec) < reqRec:
+                return None, visitados, total_possivel
+
+        if self.metricas is not None:
+            self.metricas.registrar('intersecao', self._contar_recursos(intersec))
+        return (ancora.tempo, intersec), visitados, total_possivel
+
+    def confirmar_lote(self, chamadas: List[Tuple[int, int, int]]) -> List[Tuple[Optional[Tuple[int, Recursos]], int, int]]:
+        resultados = [(None, 0, 0)] * len(chamadas)
+        nos = list(self)
+        tempos = [no.tempo for no in nos]
+        ordem = sorted(range(len(chamadas)), key=lambda i: chamadas[i][0])
+
+        grupos = {}
+        ponteiro = 0
+        for i in ordem:
+            while ponteiro < len(tempos) and tempos[ponteiro] <= chamadas[i][0]:
+                ponteiro += 1
+            if ponteiro > 0:
+                grupos.setdefault(ponteiro - 1, []).append(i)
+
+        for ancora, indices in grupos.items():
+            indices.sort(key=lambda i: chamadas[i][1])
+            fim = ancora
+            min_nRec = None
+            intersec = None
+            disponiveis = 0
+            for i in indices:
+                _, tempo_fim, reqRec = chamadas[i]
+                if tempos[ancora] >= tempo_fim or nos[ancora].nRec < reqRec:
+                    continue
+
+                while fim < len(nos) and tempos[fim] < tempo_fim:
+                    no = nos[fim]
+                    if intersec is None:
+                        min_nRec = no.nRec
+                        intersec = no.intervalos
+                    else:
+                        min_nRec = min(min_nRec, no.nRec)
+                        intersec = self._intersecao_intervalos(intersec, no.intervalos)
+                    disponiveis = None
+                    fim += 1
+
+                if disponiveis is None:
+                    disponiveis = self._contar_recursos(intersec)
+                total_possivel = fim - ancora
+                if min_nRec < reqRec or disponiveis < reqRec:
+                    resultados[i] = (None, total_possivel, total_possivel)
+                else:
+                    resultados[i] = ((tempos[ancora], intersec), total_possivel, total_possivel)
+
+        return resultados
+
+    def congelar(self) -> 'PerfilCongelado':
+        from congelado import PerfilCongelado
+        return PerfilCongelado.de_pontos((no.tempo, no.nRec, no.intervalos) for no in self)
+
+    def salvar(self, caminho: str):
+        instantaneo.salvar(self, caminho)
+
+    @classmethod
+    def carregar(cls, caminho: str, pool: Optional[PoolIntervalos] = None, coalescer: Optional[bool] = None) -> 'PerfilBase':
+        return instantaneo.carregar(cls, caminho, pool, coalescer=coalescer)
+
+    def __iter__(self):
+        no = self._primeiro()
+        while no is not None:
+            yield no
+            no = no.proximo
+
+    def itens_entre(self, t0: int, t1: int):
+        no = self.encontrar_ancora(t0)
+        if no is None:
+            no = self._primeiro()
+        while no is not None and no.tempo < t1:
+            yield no
+            no = no.proximo
+
+    def reservar(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Optional[Recursos]:
+        resultado, _, _ = self.confirmar_disponibilidade(tempo_inicio, tempo_fim, reqRec)
+        if resultado is None:
+            return None
+
+        return self.efetivar_reserva(tempo_inicio, tempo_fim, reqRec, resultado[1])
+
+    def efetivar_reserva(self, tempo_inicio: int, tempo_fim: int, reqRec: int, intersec: Recursos) -> Recursos:
+        escolhidos = selecionar_recursos(intersec, reqRec, self.formato)
+
+        inicio = self._dividir_em(tempo_inicio)
+        self._dividir_em(tempo_fim)
+
+        self._subtrair_a_partir(inicio, tempo_fim, reqRec, escolhidos)
+        if self.diario is not None:
+            self.diario.registrar_reserva(tempo_inicio, tempo_fim, reqRec, escolhidos)
+
+        return escolhidos
+
+    def subtrair_recursos(self, tempo_inicio: int, tempo_fim: int, reqRec: int, escolhidos: Recursos) -> int:
+        alterados = self._subtrair_a_partir(self._primeiro_a_partir(tempo_inicio), tempo_fim, reqRec, escolhidos)
+        if self.diario is not None:
+            self.diario.registrar_subtracao(tempo_inicio, tempo_fim, reqRec, escolhidos)
+        return alterados
+
+    def _subtrair_a_partir(self, no: Optional[No], tempo_fim: int, reqRec: int, escolhidos: Recursos) -> int:
+        alterados = []
+        while no is not None and no.tempo < tempo_fim:
+            no.intervalos = self._subtrair_intervalos(no.intervalos, escolhidos)
+            no.nRec -= reqRec
+            alterados.append(no)
+            no = no.proximo
+        self._atualizar_agregados_de(alterados)
+        if self.metricas is not None:
+            self.metricas.registrar('passos_sucessor', len(alterados))
+
+        if self.coalescer:
+            for atual in alterados + ([no] if no is not None else []):
+                if atual.anterior is not None and self._mesma_disponibilidade(atual.anterior, atual.nRec, atual.intervalos):
+                    self._remover_no(atual)
+        return len(alterados)
+
+    def liberar(self, tempo_inicio: int, tempo_fim: int, recursos: Recursos) -> int:
+        recursos = self._preparar_recursos(recursos)
+        self._dividir_em(tempo_inicio)
+        self._dividir_em(tempo_fim)
+
+        removidos = self._somar_a_partir(self._primeiro_a_partir(tempo_inicio), tempo_fim, recursos)
+        if self.diario is not None:
+            self.diario.registrar_liberacao(tempo_inicio, tempo_fim, recursos)
+        return removidos
+
+    def _somar_a_partir(self, no: Optional[No], tempo_fim: int, recursos: Recursos) -> int:
+        alterados = []
+        while no is not None and no.tempo < tempo_fim:
+            unidos = self._unir_intervalos(no.intervalos, recursos)
+            no.nRec += self._contar_recursos(unidos) - self._contar_recursos(no.intervalos)
+            no.intervalos = unidos
+            alterados.append(no)
+            no = no.proximo
+        self._atualizar_agregados_de(alterados)
+        if self.metricas is not None:
+            self.metricas.registrar('passos_sucessor', len(alterados))
+
+        removidos = 0
+        for atual in alterados + ([no] if no is not None else []):
+            if atual.anterior is not None and self._mesma_disponibilidade(atual.anterior, atual.nRec, atual.intervalos):
+                self._remover_no(atual)
+                removidos += 1
+        if self.metricas is not None:
+            self.metricas.incrementar('pontos_removidos', removidos)
+        return removidos
+
+    def resumo_entre(self, tempo_inicio: int, tempo_fim: int) -> Optional[Tuple[int, Recursos, int]]:
+        inicio = self._primeiro_a_partir(tempo_inicio)
+        fim = self._encontrar_anterior(tempo_fim)
+        if inicio is None or fim is None or inicio.tempo >= tempo_fim:
+            return None
+
+        partes = self._decompor_janela(inicio, fim)
+        min_nRec, intersec, total = partes[0]
+        for parte_min, intervalos, tamanho in partes[1:]:
+            min_nRec = min(min_nRec, parte_min)
+            intersec = self._intersecao_intervalos(intersec, intervalos)
+            total += tamanho
+        return min_nRec, intersec, total
+
+    def _primeiro_a_partir(self, tempo: int) -> Optional[No]:
+        anterior = self._encontrar_anterior(tempo)
+        if anterior is not None:
+            return anterior.proximo
+        return self._primeiro()
+
+    def encontrar_primeiro_encaixe(self, t0: int, duracao: int, reqRec: int) -> Optional[Tuple[int, Recursos]]:
+        if duracao <= 0:
+            return None
+
+        cabeca = self.encontrar_ancora(t0)
+        if cabeca is None:
+            cabeca = self._primeiro()
+        proximo = cabeca
+
+        entrada = []
+        intersec_entrada = None
+        saida = []
+
+        while cabeca is not None:
+            inicio = max(t0, cabeca.tempo)
+            fim = inicio + duracao
+
+            bloqueio = None
+            while proximo is not None and proximo.tempo < fim:
+                if proximo.nRec < reqRec or self._contar_recursos(proximo.intervalos) < reqRec:
+                    bloqueio = proximo
+                    break
+                entrada.append(proximo)
+                if intersec_entrada is None:
+                    intersec_entrada = proximo.intervalos
+                else:
+                    intersec_entrada = self._intersecao_intervalos(intersec_entrada, proximo.intervalos)
+                proximo = proximo.proximo
+
+            if bloqueio is not None:
+                entrada.clear()
+                intersec_entrada = None
+                saida.clear()
+                cabeca = proximo = bloqueio.proximo
+                continue
+
+            if not saida:
+                acumulado = None
+                while entrada:
+                    no = entrada.pop()
+                    acumulado = no.intervalos if acumulado is None else self._intersecao_intervalos(acumulado, no.intervalos)
+                    saida.append(acumulado)
+                intersec_entrada = None
+
+            seguinte = cabeca.proximo
+            if seguinte is not None and seguinte.tempo == cabeca.tempo:
+                saida.pop()
+                cabeca = seguinte
+                continue
+
+            intersec = saida[-1]
+            if intersec_entrada is not None:
+                intersec = self._intersecao_intervalos(intersec, intersec_entrada)
+            if self._contar_recursos(intersec) >= reqRec:
+                return inicio, intersec
+
+            saida.pop()
+            cabeca = cabeca.proximo
+
+        return None
+
+    def _dividir_em(self, tempo: int) -> No:
+        ancora = self.encontrar_ancora(tempo)
+        if ancora is None or ancora.tempo == tempo:
+            return ancora
+        return self._inserir_ponto(tempo, ancora.nRec, ancora.intervalos)
+
+    def sucessor(self, no: No) -> Optional[No]:
+        return no.proximo
+
+    def antecessor(self, no: No) -> Optional[No]:
+        return no.anterior
+
+    def _preparar_recursos(self, intervalos: Recursos) -> Recursos:
+        intervalos = converter(intervalos, self.formato)
+        if self.pool is not None:
+            return self.pool.internar(intervalos)
+        return intervalos
+
+    def _intersecao_intervalos(self, a: Recursos, b: Recursos) -> Recursos:
+        if self.formato == BITSET:
+            return a & b
+        return self.pool.intersecao(a, b, mesclar_intervalos)
+
+    def _contar_recursos(self, intervalos: Recursos) -> int:
+        if self.formato == BITSET:
+            return intervalos.bit_count()
+        return self.pool.contar(intervalos)
+
+    def _subtrair_intervalos(self, a: Recursos, b: Recursos) -> Recursos:
+        if self.formato == BITSET:
+            return a & ~b
+        return self.pool.internar(subtrair_intervalos(a, b))
+
+    def _unir_intervalos(self, a: Recursos, b: Recursos) -> Recursos:
+        if self.formato == BITSET:
+            return a | b
+        return self.pool.internar(unir_intervalos(a, b))
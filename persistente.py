@@ -0,0 +1,287 @@
+import threading
+import weakref
+from typing import Iterable, List, Optional, Tuple
+from recursos import (BITSET, INTERVALOS, PoolIntervalos, Recursos, contar_recursos, converter, intersecao_recursos,
+                      mesclar_intervalos, selecionar_recursos, subtrair_intervalos, validar_formato)
+
+class NoPersistente:
+    def __init__(self, tempo: int, nRec: int, intervalos: Recursos, esquerda: Optional['NoPersistente'], direita: Optional['NoPersistente'],
+                 min_nRec: int, intersec_sub: Recursos, tamanho: int, altura: int):
+        self.tempo = tempo
+        self.nRec = nRec
+        self.intervalos = intervalos
+
+        self.min_nRec = min_nRec
+        self.intersec_sub = intersec_sub
+        self.tamanho = tamanho
+
+        self.altura = altura
+        self.esquerda = esquerda
+        self.direita = direita
+
+def _altura(no: Optional[NoPersistente]) -> int:
+    return no.altura if no is not None else 0
+
+def _tamanho(no: Optional[NoPersistente]) -> int:
+    return no.tamanho if no is not None else 0
+
+class VersaoPerfil:
+    def __init__(self, raiz: Optional[NoPersistente], numero: int, formato: str):
+        self.raiz = raiz
+        self.numero = numero
+        self.formato = formato
+
+    def __len__(self) -> int:
+        return _tamanho(self.raiz)
+
+    def __iter__(self):
+        pilha = []
+        no = self.raiz
+        while pilha or no is not None:
+            while no is not None:
+                pilha.append(no)
+                no = no.esquerda
+            no = pilha.pop()
+            yield no
+            no = no.direita
+
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[NoPersistente]:
+        no = self.raiz
+        resultado = None
+        while no is not None:
+            if no.tempo <= tempo_inicio:
+                resultado = no
+                no = no.direita
+            else:
+                no = no.esquerda
+        return resultado
+
+    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, Recursos]], int, int]:
+        ancora = self.encontrar_ancora(tempo_inicio)
+        if ancora is None or ancora.nRec < reqRec or ancora.tempo >= tempo_fim:
+            return None, 0, 0
+
+        partes = self._decompor_faixa(tempo_inicio, tempo_fim)
+        total_possivel = 1 + sum(tamanho for _, _, tamanho in partes)
+
+        if any(min_nRec < reqRec for min_nRec, _, _ in partes):
+            return None, 1 + len(partes), total_possivel
+
+        intersec = ancora.intervalos
+        visitados = 1
+        if contar_recursos(intersec, self.formato) < reqRec:
+            return None, visitados, total_possivel
+        for _, intervalos, _ in partes:
+            visitados += 1
+            intersec = intersecao_recursos(intersec, intervalos, self.formato)
+            if contar_recursos(intersec, self.formato) < reqRec:
+                return None, visitados, total_possivel
+
+        return (ancora.tempo, intersec), visitados, total_possivel
+
+    def confirmar_lote(self, chamadas: List[Tuple[int, int, int]]) -> List[Tuple[Optional[Tuple[int, Recursos]], int, int]]:
+        return [self.confirmar_disponibilidade(t0, t1, reqRec) for t0, t1, reqRec in chamadas]
+
+    def _decompor_faixa(self, menor: int, maior: int) -> List[Tuple[int, Recursos, int]]:
+        no = self.raiz
+        while no is not None and not (menor < no.tempo < maior):
+            no = no.direita if no.tempo <= menor else no.esquerda
+        if no is None:
+            return []
+
+        partes = [(no.nRec, no.intervalos, 1)]
+        atual = no.esquerda
+        while atual is not None:
+            if atual.tempo > menor:
+                partes.append((atual.nRec, atual.intervalos, 1))
+                if atual.direita is not None:
+                    partes.append((atual.direita.min_nRec, atual.direita.intersec_sub, atual.direita.tamanho))
+                atual = atual.esquerda
+            else:
+                atual = atual.direita
+        atual = no.direita
+        while atual is not None:
+            if atual.tempo < maior:
+                partes.append((atual.nRec, atual.intervalos, 1))
+                if atual.esquerda is not None:
+                    partes.append((atual.esquerda.min_nRec, atual.esquerda.intersec_sub, atual.esquerda.tamanho))
+                atual = atual.direita
+            else:
+                atual = atual.esquerda
+        return partes
+
+class PerfilPersistenteAVL:
+    def __init__(self, formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None):
+        self.formato = validar_formato(formato)
+        self.pool = None if formato == BITSET else (pool if pool is not None else PoolIntervalos())
+        self._escrita = threading.Lock()
+        self._vivas = weakref.WeakSet()
+        self._numero = 0
+        self._versao = self._publicar(None)
+
+    def versao(self) -> VersaoPerfil:
+        return self._versao
+
+    def versoes_vivas(self) -> int:
+        return len(self._vivas)
+
+    def _publicar(self, raiz: Optional[NoPersistente]) -> VersaoPerfil:
+        versao = VersaoPerfil(raiz, self._numero, self.formato)
+        self._numero += 1
+        self._vivas.add(versao)
+        self._versao = versao
+        return versao
+
+    def __len__(self) -> int:
+        return len(self._versao)
+
+    def __iter__(self):
+        return iter(self._versao)
+
+    def encontrar_ancora(self, tempo_inicio: int) -> Optional[NoPersistente]:
+        return self._versao.encontrar_ancora(tempo_inicio)
+
+    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, Recursos]], int, int]:
+        return self._versao.confirmar_disponibilidade(tempo_inicio, tempo_fim, reqRec)
+
+    def confirmar_lote(self, chamadas: List[Tuple[int, int, int]]) -> List[Tuple[Optional[Tuple[int, Recursos]], int, int]]:
+        return self._versao.confirmar_lote(chamadas)
+
+    def criar_no(self, tempo: int, nRec: int, intervalos: Recursos) -> VersaoPerfil:
+        intervalos = converter(intervalos, self.formato)
+        with self._escrita:
+            if self.pool is not None:
+                intervalos = self.pool.internar(intervalos)
+            raiz = self._inserir(self._versao.raiz, tempo, nRec, intervalos)
+            return self._publicar(raiz)
+
+    @classmethod
+    def construir_de_ordenados(cls, iteravel: Iterable[Tuple[int, int, Recursos]], formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None) -> 'PerfilPersistenteAVL':
+        perfil = cls(formato, pool)
+        pontos = []
+        for tempo, nRec, intervalos in iteravel:
+            if pontos and tempo < pontos[-1][0]:
+                raise ValueError("construir_de_ordenados exige tempos em ordem crescente")
+            intervalos = converter(intervalos, formato)
+            if perfil.pool is not None:
+                intervalos = perfil.pool.internar(intervalos)
+            pontos.append((tempo, nRec, intervalos))
+        with perfil._escrita:
+            perfil._publicar(perfil._construir_balanceada(pontos, 0, len(pontos)))
+        return perfil
+
+    def _construir_balanceada(self, pontos: List[Tuple[int, int, Recursos]], inicio: int, fim: int) -> Optional[NoPersistente]:
+        if inicio >= fim:
+            return None
+        meio = (inicio + fim) // 2
+        tempo, nRec, intervalos = pontos[meio]
+        esquerda = self._construir_balanceada(pontos, inicio, meio)
+        direita = self._construir_balanceada(pontos, meio + 1, fim)
+        return self._novo_no(tempo, nRec, intervalos, esquerda, direita)
+
+    def reservar(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Optional[Recursos]:
+        with self._escrita:
+            resultado, _, _ = self._versao.confirmar_disponibilidade(tempo_inicio, tempo_fim, reqRec)
+            if resultado is None:
+                return None
+
+            return self._efetivar(tempo_inicio, tempo_fim, reqRec, resultado[1])
+
+    def efetivar_reserva(self, tempo_inicio: int, tempo_fim: int, reqRec: int, intersec: Recursos) -> Recursos:
+        with self._escrita:
+            return self._efetivar(tempo_inicio, tempo_fim, reqRec, intersec)
+
+    def _efetivar(self, tempo_inicio: int, tempo_fim: int, reqRec: int, intersec: Recursos) -> Recursos:
+        escolhidos = selecionar_recursos(intersec, reqRec, self.formato)
+
+        raiz = self._dividir_em(self._versao.raiz, tempo_inicio)
+        raiz = self._dividir_em(raiz, tempo_fim)
+        inicio = self._posicao_ancora(raiz, tempo_inicio)
+        fim = self._posicao_ancora(raiz, tempo_fim - 1) + 1
+        raiz = self._reservar_posicoes(raiz, inicio, fim, 0, escolhidos, reqRec)
+
+        self._publicar(raiz)
+        return escolhidos
+
+    def _dividir_em(self, raiz: Optional[NoPersistente], tempo: int) -> Optional[NoPersistente]:
+        ancora = VersaoPerfil(raiz, -1, self.formato).encontrar_ancora(tempo)
+        if ancora is None or ancora.tempo == tempo:
+            return raiz
+        return self._inserir(raiz, tempo, ancora.nRec, ancora.intervalos)
+
+    def _posicao_ancora(self, no: Optional[NoPersistente], tempo: int) -> int:
+        posicao = -1
+        deslocamento = 0
+        while no is not None:
+            if no.tempo <= tempo:
+                posicao = deslocamento + _tamanho(no.esquerda)
+                deslocamento = posicao + 1
+                no = no.direita
+            else:
+                no = no.esquerda
+        return posicao
+
+    def _reservar_posicoes(self, no: Optional[NoPersistente], inicio: int, fim: int, deslocamento: int, escolhidos: Recursos, reqRec: int) -> Optional[NoPersistente]:
+        if no is None or fim <= deslocamento or deslocamento + no.tamanho <= inicio:
+            return no
+
+        posicao = deslocamento + _tamanho(no.esquerda)
+        esquerda = self._reservar_posicoes(no.esquerda, inicio, fim, deslocamento, escolhidos, reqRec)
+        direita = self._reservar_posicoes(no.direita, inicio, fim, posicao + 1, escolhidos, reqRec)
+        nRec = no.nRec
+        intervalos = no.intervalos
+        if inicio <= posicao < fim:
+            nRec -= reqRec
+            intervalos = self._subtrair_intervalos(intervalos, escolhidos)
+        return self._novo_no(no.tempo, nRec, intervalos, esquerda, direita)
+
+    def _inserir(self, no: Optional[NoPersistente], tempo: int, nRec: int, intervalos: Recursos) -> NoPersistente:
+        if no is None:
+            return self._novo_no(tempo, nRec, intervalos, None, None)
+        if tempo < no.tempo:
+            return self._balancear(no, self._inserir(no.esquerda, tempo, nRec, intervalos), no.direita)
+        return self._balancear(no, no.esquerda, self._inserir(no.direita, tempo, nRec, intervalos))
+
+    def _balancear(self, modelo: NoPersistente, esquerda: Optional[NoPersistente], direita: Optional[NoPersistente]) -> NoPersistente:
+        if _altura(esquerda) > _altura(direita) + 1:
+            if _altura(esquerda.esquerda) < _altura(esquerda.direita):
+                meio = esquerda.direita
+                return self._copiar(meio, self._copiar(esquerda, esquerda.esquerda, meio.esquerda),
+                                    self._copiar(modelo, meio.direita, direita))
+            return self._copiar(esquerda, esquerda.esquerda, self._copiar(modelo, esquerda.direita, direita))
+
+        if _altura(direita) > _altura(esquerda) + 1:
+            if _altura(direita.direita) < _altura(direita.esquerda):
+                meio = direita.esquerda
+                return self._copiar(meio, self._copiar(modelo, esquerda, meio.esquerda),
+                                    self._copiar(direita, meio.direita, direita.direita))
+            return self._copiar(direita, self._copiar(modelo, esquerda, direita.esquerda), direita.direita)
+
+        return self._copiar(modelo, esquerda, direita)
+
+    def _copiar(self, modelo: NoPersistente, esquerda: Optional[NoPersistente], direita: Optional[NoPersistente]) -> NoPersistente:
+        return self._novo_no(modelo.tempo, modelo.nRec, modelo.intervalos, esquerda, direita)
+
+    def _novo_no(self, tempo: int, nRec: int, intervalos: Recursos, esquerda: Optional[NoPersistente], direita: Optional[NoPersistente]) -> NoPersistente:
+        min_nRec = nRec
+        intersec_sub = intervalos
+        tamanho = 1
+        for filho in (esquerda, direita):
+            if filho is not None:
+                if filho.min_nRec < min_nRec:
+                    min_nRec = filho.min_nRec
+                if filho.intersec_sub is not intersec_sub and filho.intersec_sub != intersec_sub:
+                    intersec_sub = self._intersecao_intervalos(intersec_sub, filho.intersec_sub)
+                tamanho += filho.tamanho
+        altura = 1 + max(_altura(esquerda), _altura(direita))
+        return NoPersistente(tempo, nRec, intervalos, esquerda, direita, min_nRec, intersec_sub, tamanho, altura)
+
+    def _intersecao_intervalos(self, a: Recursos, b: Recursos) -> Recursos:
+        if self.formato == BITSET:
+            return a & b
+        return self.pool.intersecao(a, b, mesclar_intervalos)
+
+    def _subtrair_intervalos(self, a: Recursos, b: Recursos) -> Recursos:
+        if self.formato == BITSET:
+            return a & ~b
+        return self.pool.internar(subtrair_intervalos(a, b))
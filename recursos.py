@@ -0,0 +1,180 @@
+import heapq
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Sequence, Tuple, Union
+
+INTERVALOS = 'intervalos'
+BITSET = 'bitset'
+FORMATOS = (INTERVALOS, BITSET)
+
+Recursos = Union[Sequence[Tuple[int, int]], int]
+ConjuntoIntervalos = Tuple[Tuple[int, int], ...]
+
+def validar_formato(formato: str) -> str:
+    if formato not in FORMATOS:
+        raise ValueError(f"formato de recursos desconhecido: {formato!r}")
+    return formato
+
+def intervalos_para_bitset(intervalos: List[Tuple[int, int]]) -> int:
+    mascara = 0
+    for comeco, fim in intervalos:
+        mascara |= ((1 << (fim - comeco + 1)) - 1) << comeco
+    return mascara
+
+def bitset_para_intervalos(mascara: int) -> List[Tuple[int, int]]:
+    intervalos = []
+    while mascara:
+        comeco = (mascara & -mascara).bit_length() - 1
+        deslocada = mascara >> comeco
+        tamanho = (~deslocada & (deslocada + 1)).bit_length() - 1
+        intervalos.append((comeco, comeco + tamanho - 1))
+        mascara &= ~(((1 << tamanho) - 1) << comeco)
+    return intervalos
+
+def converter(recursos: Recursos, formato: str) -> Recursos:
+    if formato == BITSET:
+        return recursos if isinstance(recursos, int) else intervalos_para_bitset(recursos)
+    return bitset_para_intervalos(recursos) if isinstance(recursos, int) else recursos
+
+def selecionar_bitset(mascara: int, quantidade: int) -> int:
+    escolhidos = 0
+    while quantidade > 0 and mascara:
+        menor = mascara & -mascara
+        escolhidos |= menor
+        mascara ^= menor
+        quantidade -= 1
+    return escolhidos
+
+def mesclar_intervalos(a: Sequence[Tuple[int, int]], b: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    resultado = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        comeco = max(a[i][0], b[j][0])
+        fim = min(a[i][1], b[j][1])
+        if comeco <= fim:
+            resultado.append((comeco, fim))
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return resultado
+
+def subtrair_intervalos(a: Sequence[Tuple[int, int]], b: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    resultado = []
+    j = 0
+    for comeco, fim in a:
+        while j < len(b) and b[j][1] < comeco:
+            j += 1
+        k = j
+        while k < len(b) and b[k][0] <= fim:
+            if b[k][0] > comeco:
+                resultado.append((comeco, b[k][0] - 1))
+            comeco = max(comeco, b[k][1] + 1)
+            k += 1
+        if comeco <= fim:
+            resultado.append((comeco, fim))
+    return resultado
+
+def unir_intervalos(a: Sequence[Tuple[int, int]], b: Sequence[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    resultado = []
+    for comeco, fim in heapq.merge(a, b):
+        if resultado and comeco <= resultado[-1][1] + 1:
+            if fim > resultado[-1][1]:
+                resultado[-1] = (resultado[-1][0], fim)
+        else:
+            resultado.append((comeco, fim))
+    return resultado
+
+def intersecao_recursos(a: Recursos, b: Recursos, formato: str) -> Recursos:
+    if formato == BITSET:
+        return a & b
+    return mesclar_intervalos(a, b)
+
+def contar_recursos(recursos: Recursos, formato: str) -> int:
+    if formato == BITSET:
+        return recursos.bit_count()
+    return sum(fim - comeco + 1 for comeco, fim in recursos)
+
+def selecionar_recursos(recursos: Recursos, quantidade: int, formato: str) -> Recursos:
+    if formato == BITSET:
+        return selecionar_bitset(recursos, quantidade)
+    escolhidos = []
+    for comeco, fim in recursos:
+        if quantidade <= 0:
+            break
+        tamanho = min(fim - comeco + 1, quantidade)
+        escolhidos.append((comeco, comeco + tamanho - 1))
+        quantidade -= tamanho
+    return escolhidos
+
+class PoolIntervalos:
+    def __init__(self, capacidade_cache: int = 4096, capacidade_conjuntos: int = 65536):
+        self.capacidade_cache = capacidade_cache
+        self.capacidade_conjuntos = capacidade_conjuntos
+        self._conjuntos: 'OrderedDict[ConjuntoIntervalos, ConjuntoIntervalos]' = OrderedDict()
+        self._contagens: 'OrderedDict[int, Tuple[ConjuntoIntervalos, int]]' = OrderedDict()
+        self._intersecoes: 'OrderedDict[Tuple[int, int], Tuple[ConjuntoIntervalos, ConjuntoIntervalos, ConjuntoIntervalos]]' = OrderedDict()
+        self.acertos = 0
+        self.falhas = 0
+        self._trava = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._conjuntos)
+
+    # As tabelas são LRUs compartilhadas por leitores concorrentes (ver
+    # ServicoDisponibilidade), então toda mutação passa por _trava. Conjuntos
+    # despejados continuam válidos para quem já os referencia; só deixam de ser
+    # compartilhados com os próximos conjuntos iguais.
+    def internar(self, intervalos: Sequence[Tuple[int, int]]) -> ConjuntoIntervalos:
+        chave = intervalos if isinstance(intervalos, tuple) else tuple(intervalos)
+        with self._trava:
+            existente = self._conjuntos.get(chave)
+            if existente is not None:
+                self._conjuntos.move_to_end(chave)
+                return existente
+
+            self._conjuntos[chave] = chave
+            if len(self._conjuntos) > self.capacidade_conjuntos:
+                _, despejado = self._conjuntos.popitem(last=False)
+                entrada = self._contagens.get(id(despejado))
+                if entrada is not None and entrada[0] is despejado:
+                    del self._contagens[id(despejado)]
+            return chave
+
+    # contar() e intersecao() usam id() como chave; cada entrada guarda os
+    # próprios conjuntos e só vale se eles forem os mesmos objetos consultados.
+    def contar(self, conjunto: ConjuntoIntervalos) -> int:
+        with self._trava:
+            entrada = self._contagens.get(id(conjunto))
+            if entrada is not None and entrada[0] is conjunto:
+                self._contagens.move_to_end(id(conjunto))
+                return entrada[1]
+
+        total = sum(fim - comeco + 1 for comeco, fim in conjunto)
+        with self._trava:
+            self._contagens[id(conjunto)] = (conjunto, total)
+            if len(self._contagens) > self.capacidade_conjuntos:
+                self._contagens.popitem(last=False)
+        return total
+
+    def intersecao(self, a: ConjuntoIntervalos, b: ConjuntoIntervalos,
+                   calcular: Callable[[ConjuntoIntervalos, ConjuntoIntervalos], Sequence[Tuple[int, int]]]) -> ConjuntoIntervalos:
+        if a is b:
+            return a
+        if id(a) > id(b):
+            a, b = b, a
+        chave = (id(a), id(b))
+        with self._trava:
+            entrada = self._intersecoes.get(chave)
+            if entrada is not None and entrada[0] is a and entrada[1] is b:
+                self._intersecoes.move_to_end(chave)
+                self.acertos += 1
+                return entrada[2]
+            self.falhas += 1
+
+        resultado = self.internar(calcular(a, b))
+        with self._trava:
+            self._intersecoes[chave] = (a, b, resultado)
+            if len(self._intersecoes) > self.capacidade_cache:
+                self._intersecoes.popitem(last=False)
+        return resultado
@@ -1,43 +1,96 @@
-from typing import List, Tuple, Optional
+from typing import Iterable, List, Tuple, Optional
+from perfil import PerfilBase
+from recursos import INTERVALOS, PoolIntervalos, Recursos
 
 VERMELHO = True
 PRETO = False
 
 class NoRubroNegra:
-    def __init__(self, tempo: int, nRec: int, intervalos: List[Tuple[int, int]]):
+    def __init__(self, tempo: int, nRec: int, intervalos: Recursos):
         self.tempo = tempo
         self.nRec = nRec
         self.intervalos = intervalos
 
+        self.min_nRec = nRec
+        self.intersec_sub = intervalos
+        self.tamanho = 1
+
         self.cor = VERMELHO
         self.esquerda = None
         self.direita = None
         self.pai = None
 
-class PerfilDisponibilidadeRN:
-    def __init__(self):
-        self.nulo = NoRubroNegra(-1, 0, [])
+        self.anterior = None
+        self.proximo = None
+
+class PerfilDisponibilidadeRN(PerfilBase):
+    def __init__(self, formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False):
+        super().__init__(formato, pool, coalescer)
+        self.nulo = self._novo_no(-1, 0, [])
         self.nulo.cor = PRETO
+        self.nulo.tamanho = 0
         self.raiz = self.nulo
+        self.maximo = self.nulo
+
+    @classmethod
+    def construir_de_ordenados(cls, iteravel: Iterable[Tuple[int, int, Recursos]], formato: str = INTERVALOS, pool: Optional[PoolIntervalos] = None, coalescer: bool = False) -> 'PerfilDisponibilidadeRN':
+        perfil = cls(formato, pool, coalescer)
+        nos = []
+        for tempo, nRec, intervalos in iteravel:
+            if nos and tempo < nos[-1].tempo:
+                raise ValueError("construir_de_ordenados exige tempos em ordem crescente")
+            intervalos = perfil._preparar_recursos(intervalos)
+            if coalescer and nos and perfil._mesma_disponibilidade(nos[-1], nRec, intervalos):
+                continue
+            no = perfil._novo_no(tempo, nRec, intervalos)
+            if nos:
+                no.anterior = nos[-1]
+                nos[-1].proximo = no
+            nos.append(no)
+        profundidade_vermelha = len(nos).bit_length() - 1
+        perfil.raiz = perfil._construir_balanceada(nos, 0, len(nos), perfil.nulo, 0, profundidade_vermelha)
+        perfil.raiz.cor = PRETO
+        perfil.maximo = nos[-1] if nos else perfil.nulo
+        return perfil
+
+    def _construir_balanceada(self, nos: List[NoRubroNegra], inicio: int, fim: int, pai: NoRubroNegra, profundidade: int, profundidade_vermelha: int) -> NoRubroNegra:
+        if inicio >= fim:
+            return self.nulo
+        meio = (inicio + fim) // 2
+        no = nos[meio]
+        no.pai = pai
+        no.cor = VERMELHO if profundidade == profundidade_vermelha else PRETO
+        no.esquerda = self._construir_balanceada(nos, inicio, meio, no, profundidade + 1, profundidade_vermelha)
+        no.direita = self._construir_balanceada(nos, meio + 1, fim, no, profundidade + 1, profundidade_vermelha)
+        self._atualizar_agregados(no)
+        return no
+
+    def _novo_no(self, tempo: int, nRec: int, intervalos: Recursos) -> NoRubroNegra:
+        return NoRubroNegra(tempo, nRec, intervalos)
 
-    def criar_no(self, tempo: int, nRec: int, intervalos: List[Tuple[int, int]]) -> NoRubroNegra:
-        novo = NoRubroNegra(tempo, nRec, intervalos)
+    def _inserir_ponto(self, tempo: int, nRec: int, intervalos: Recursos) -> NoRubroNegra:
+        novo = self._novo_no(tempo, nRec, intervalos)
         novo.esquerda = self.nulo
         novo.direita = self.nulo
         novo.cor = VERMELHO
         self._inserir_rubronegra(novo)
-
         return novo
 
     def _inserir_rubronegra(self, no: NoRubroNegra):
-        pai = self.nulo
-        filho = self.raiz
-        while filho != self.nulo:
-            pai = filho
-            if no.tempo < filho.tempo:
-                filho = filho.esquerda
-            else:
-                filho = filho.direita
+        maximo = self.maximo
+        if maximo != self.nulo and no.tempo >= maximo.tempo:
+            pai = maximo
+        else:
+            pai = self.nulo
+            filho = self.raiz
+            while filho != self.nulo:
+                pai = filho
+                if no.tempo < filho.tempo:
+                    filho = filho.esquerda
+                else:
+                    filho = filho.direita
+        if maximo == self.nulo or no.tempo >= maximo.tempo:
+            self.maximo = no
         no.pai = pai
         if pai == self.nulo:
             self.raiz = no
@@ -48,13 +101,21 @@ class PerfilDisponibilidadeRN:
         no.esquerda = self.nulo
         no.direita = self.nulo
         no.cor = VERMELHO
+        self._encadear(no)
+        while pai != self.nulo:
+            self._atualizar_agregados(pai)
+            pai = pai.pai
         self._corrige_arvore(no)
 
     def _corrige_arvore(self, no):
         while no.pai.cor == VERMELHO:
+            if self.metricas is not None:
+                self.metricas.incrementar('iteracoes_correcao')
             if no.pai == no.pai.pai.esquerda:
                 aux = no.pai.pai.direita
                 if aux.cor == VERMELHO:
+                    if self.metricas is not None:
+                        self.metricas.incrementar('recoloracoes')
                     no.pai.cor = PRETO
                     aux.cor = PRETO
                     no.pai.pai.cor = VERMELHO
@@ -69,6 +130,8 @@ class PerfilDisponibilidadeRN:
             else:
                 aux = no.pai.pai.esquerda
                 if aux.cor == VERMELHO:
+                    if self.metricas is not None:
+                        self.metricas.incrementar('recoloracoes')
                     no.pai.cor = PRETO
                     aux.cor = PRETO
                     no.pai.pai.cor = VERMELHO
@@ -80,9 +143,113 @@ class PerfilDisponibilidadeRN:
                     no.pai.cor = PRETO
                     no.pai.pai.cor = VERMELHO
                     self._rotacionar_esquerda(no.pai.pai)
+        raiz_vermelha = self.raiz.cor == VERMELHO
         self.raiz.cor = PRETO
+        return raiz_vermelha
+
+    def _remover_no(self, no: NoRubroNegra):
+        self._invalidar_ancoras()
+        anterior = no.anterior
+        proximo = no.proximo
+        if anterior is not None:
+            anterior.proximo = proximo
+        if proximo is not None:
+            proximo.anterior = anterior
+        if self.maximo is no:
+            self.maximo = anterior if anterior is not None else self.nulo
+
+        cor_removida = no.cor
+        if no.esquerda == self.nulo:
+            filho = no.direita
+            self._transplantar(no, no.direita)
+        elif no.direita == self.nulo:
+            filho = no.esquerda
+            self._transplantar(no, no.esquerda)
+        else:
+            substituto = proximo
+            cor_removida = substituto.cor
+            filho = substituto.direita
+            if substituto.pai is no:
+                filho.pai = substituto
+            else:
+                self._transplantar(substituto, substituto.direita)
+                substituto.direita = no.direita
+                substituto.direita.pai = substituto
+            self._transplantar(no, substituto)
+            substituto.esquerda = no.esquerda
+            substituto.esquerda.pai = substituto
+            substituto.cor = no.cor
+
+        atual = filho.pai
+        while atual != self.nulo:
+            self._atualizar_agregados(atual)
+            atual = atual.pai
+        if cor_removida == PRETO:
+            self._corrige_remocao(filho)
+
+        no.esquerda = no.direita = no.pai = self.nulo
+        no.anterior = no.proximo = None
+
+    def _transplantar(self, antigo: NoRubroNegra, novo: NoRubroNegra):
+        if antigo.pai == self.nulo:
+            self.raiz = novo
+        elif antigo == antigo.pai.esquerda:
+            antigo.pai.esquerda = novo
+        else:
+            antigo.pai.direita = novo
+        novo.pai = antigo.pai
+
+    def _corrige_remocao(self, no):
+        while no != self.raiz and no.cor == PRETO:
+            if self.metricas is not None:
+                self.metricas.incrementar('iteracoes_correcao_remocao')
+            if no == no.pai.esquerda:
+                aux = no.pai.direita
+                if aux.cor == VERMELHO:
+                    aux.cor = PRETO
+                    no.pai.cor = VERMELHO
+                    self._rotacionar_esquerda(no.pai)
+                    aux = no.pai.direita
+                if aux.esquerda.cor == PRETO and aux.direita.cor == PRETO:
+                    aux.cor = VERMELHO
+                    no = no.pai
+                else:
+                    if aux.direita.cor == PRETO:
+                        aux.esquerda.cor = PRETO
+                        aux.cor = VERMELHO
+                        self._rotacionar_direita(aux)
+                        aux = no.pai.direita
+                    aux.cor = no.pai.cor
+                    no.pai.cor = PRETO
+                    aux.direita.cor = PRETO
+                    self._rotacionar_esquerda(no.pai)
+                    no = self.raiz
+            else:
+                aux = no.pai.esquerda
+                if aux.cor == VERMELHO:
+                    aux.cor = PRETO
+                    no.pai.cor = VERMELHO
+                    self._rotacionar_direita(no.pai)
+                    aux = no.pai.esquerda
+                if aux.direita.cor == PRETO and aux.esquerda.cor == PRETO:
+                    aux.cor = VERMELHO
+                    no = no.pai
+                else:
+                    if aux.esquerda.cor == PRETO:
+                        aux.direita.cor = PRETO
+                        aux.cor = VERMELHO
+                        self._rotacionar_esquerda(aux)
+                        aux = no.pai.esquerda
+                    aux.cor = no.pai.cor
+                    no.pai.cor = PRETO
+                    aux.esquerda.cor = PRETO
+                    self._rotacionar_direita(no.pai)
+                    no = self.raiz
+        no.cor = PRETO
 
     def _rotacionar_esquerda(self, no):
+        if self.metricas is not None:
+            self.metricas.incrementar('rotacoes_esquerda')
         f_dir = no.direita
         no.direita = f_dir.esquerda
         if f_dir.esquerda != self.nulo:
@@ -96,8 +263,12 @@ class PerfilDisponibilidadeRN:
             no.pai.direita = f_dir
         f_dir.esquerda = no
         no.pai = f_dir
+        self._atualizar_agregados(no)
+        self._atualizar_agregados(f_dir)
 
     def _rotacionar_direita(self, no):
+        if self.metricas is not None:
+            self.metricas.incrementar('rotacoes_direita')
         f_esq = no.esquerda
         no.esquerda = f_esq.direita
         if f_esq.direita != self.nulo:
@@ -111,8 +282,117 @@ class PerfilDisponibilidadeRN:
             no.pai.esquerda = f_esq
         f_esq.direita = no
         no.pai = f_esq
+        self._atualizar_agregados(no)
+        self._atualizar_agregados(f_esq)
+
+    def _altura_negra(self, no: NoRubroNegra) -> int:
+        altura = 0
+        while no != self.nulo:
+            if no.cor == PRETO:
+                altura += 1
+            no = no.esquerda
+        return altura
+
+    def _juntar(self, esquerda: NoRubroNegra, altura_esquerda: int, no: NoRubroNegra, direita: NoRubroNegra, altura_direita: int) -> Tuple[NoRubroNegra, int]:
+        if esquerda != self.nulo:
+            esquerda.pai = self.nulo
+            if esquerda.cor == VERMELHO:
+                esquerda.cor = PRETO
+                altura_esquerda += 1
+        if direita != self.nulo:
+            direita.pai = self.nulo
+            if direita.cor == VERMELHO:
+                direita.cor = PRETO
+                altura_direita += 1
+
+        if altura_esquerda == altura_direita:
+            no.esquerda = esquerda
+            no.direita = direita
+            no.pai = self.nulo
+            no.cor = PRETO
+            if esquerda != self.nulo:
+                esquerda.pai = no
+            if direita != self.nulo:
+                direita.pai = no
+            self._atualizar_agregados(no)
+            return no, altura_esquerda + 1
+
+        if altura_esquerda > altura_direita:
+            self.raiz = esquerda
+            pai = self.nulo
+            alvo = esquerda
+            altura = altura_esquerda
+            while alvo.cor == VERMELHO or altura != altura_direita:
+                if alvo.cor == PRETO:
+                    altura -= 1
+                pai = alvo
+                alvo = alvo.direita
+            no.esquerda = alvo
+            no.direita = direita
+            pai.direita = no
+            altura_final = altura_esquerda
+        else:
+            self.raiz = direita
+            pai = self.nulo
+            alvo = direita
+            altura = altura_direita
+            while alvo.cor == VERMELHO or altura != altura_esquerda:
+                if alvo.cor == PRETO:
+                    altura -= 1
+                pai = alvo
+                alvo = alvo.esquerda
+            no.esquerda = esquerda
+            no.direita = alvo
+            pai.esquerda = no
+            altura_final = altura_direita
+
+        no.pai = pai
+        no.cor = VERMELHO
+        if no.esquerda != self.nulo:
+            no.esquerda.pai = no
+        if no.direita != self.nulo:
+            no.direita.pai = no
+        self._atualizar_agregados(no)
+        while pai != self.nulo:
+            self._atualizar_agregados(pai)
+            pai = pai.pai
+        if self._corrige_arvore(no):
+            altura_final += 1
+        return self.raiz, altura_final
+
+    def _atualizar_agregados(self, no: NoRubroNegra):
+        no.min_nRec = no.nRec
+        no.intersec_sub = no.intervalos
+        no.tamanho = 1
+        for filho in (no.esquerda, no.direita):
+            if filho != self.nulo:
+                if filho.min_nRec < no.min_nRec:
+                    no.min_nRec = filho.min_nRec
+                if filho.intersec_sub is not no.intersec_sub and filho.intersec_sub != no.intersec_sub:
+                    no.intersec_sub = self._intersecao_intervalos(no.intersec_sub, filho.intersec_sub)
+                no.tamanho += filho.tamanho
+
+    def _atualizar_agregados_de(self, nos: List[NoRubroNegra]):
+        profundidade = {}
+        for no in nos:
+            caminho = []
+            while no != self.nulo and no not in profundidade:
+                caminho.append(no)
+                no = no.pai
+            nivel = -1 if no == self.nulo else profundidade[no]
+            for atual in reversed(caminho):
+                nivel += 1
+                profundidade[atual] = nivel
+        for no in sorted(profundidade, key=profundidade.get, reverse=True):
+            self._atualizar_agregados(no)
 
     def encontrar_ancora(self, tempo_inicio: int) -> Optional[NoRubroNegra]:
+        if self.cache_ancoras is not None:
+            return self.cache_ancoras.encontrar(tempo_inicio)
+        if self.metricas is not None:
+            resultado, profundidade = self._buscar_ancora(tempo_inicio)
+            self.metricas.registrar('profundidade_busca', profundidade)
+            return resultado
         no = self.raiz
         resultado = None
         while no != self.nulo:
@@ -123,62 +403,151 @@ class PerfilDisponibilidadeRN:
                 no = no.esquerda
         return resultado
 
-    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, List[Tuple[int, int]]]], int, int]:
-        ancora = self.encontrar_ancora(tempo_inicio)
-        if ancora is None or ancora.nRec < reqRec:
-            return None, 0, 0
+    def _buscar_ancora(self, tempo_inicio: int) -> Tuple[Optional[NoRubroNegra], int]:
+        no = self.raiz
+        resultado = None
+        profundidade = 0
+        while no != self.nulo:
+            profundidade += 1
+            if no.tempo <= tempo_inicio:
+                resultado = no
+                no = no.direita
+            else:
+                no = no.esquerda
+        return resultado, profundidade
+
+    def _encontrar_anterior(self, tempo: int) -> Optional[NoRubroNegra]:
+        no = self.raiz
+        resultado = None
+        while no != self.nulo:
+            if no.tempo < tempo:
+                resultado = no
+                no = no.direita
+            else:
+                no = no.esquerda
+        return resultado
+
+    def _decompor_janela(self, inicio: NoRubroNegra, fim: NoRubroNegra) -> List[Tuple[int, Recursos, int]]:
+        ancestrais = set()
+        no = inicio
+        while no != self.nulo:
+            ancestrais.add(no)
+            no = no.pai
+        lca = fim
+        while lca not in ancestrais:
+            lca = lca.pai
 
-        intersec = ancora.intervalos.copy()
-        visitados = 0
-        total_possivel = 0
+        partes = [(lca.nRec, lca.intervalos, 1)]
 
-        no = ancora
-        while no is not None and no.tempo < tempo_fim:
-            total_possivel += 1
+        if inicio is not lca:
+            partes.append((inicio.nRec, inicio.intervalos, 1))
+            if inicio.direita != self.nulo:
+                partes.append(self._parte_subarvore(inicio.direita))
+            no = inicio
+            while no.pai is not lca:
+                pai = no.pai
+                if pai.esquerda is no:
+                    partes.append((pai.nRec, pai.intervalos, 1))
+                    if pai.direita != self.nulo:
+                        partes.append(self._parte_subarvore(pai.direita))
+                no = pai
 
-            if no.nRec < reqRec:
-                return None, visitados, total_possivel
+        if fim is not lca:
+            partes.append((fim.nRec, fim.intervalos, 1))
+            if fim.esquerda != self.nulo:
+                partes.append(self._parte_subarvore(fim.esquerda))
+            no = fim
+            while no.pai is not lca:
+                pai = no.pai
+                if pai.direita is no:
+                    partes.append((pai.nRec, pai.intervalos, 1))
+                    if pai.esquerda != self.nulo:
+                        partes.append(self._parte_subarvore(pai.esquerda))
+                no = pai
 
-            intersec = self._intersecao_intervalos(intersec, no.intervalos)
-            if self._contar_recursos(intersec) < reqRec:
-                return None, visitados, total_possivel
+        return partes
 
-            visitados += 1
-            no = self.sucessor(no)
+    def _parte_subarvore(self, no: NoRubroNegra) -> Tuple[int, Recursos, int]:
+        return no.min_nRec, no.intersec_sub, no.tamanho
 
-        if visitados == 0:
-            return None, visitados, total_possivel
+    def descartar_ate(self, tempo: int) -> int:
+        ancora = self.encontrar_ancora(tempo)
+        if ancora is None:
+            return 0
+        self._invalidar_ancoras()
+        if self.diario is not None:
+            self.diario.registrar_descarte(tempo)
 
-        return (ancora.tempo, intersec), visitados, total_possivel
+        tamanho_anterior = self.raiz.tamanho
+        ancora.anterior = None
+        raiz, _ = self._manter_a_partir(self.raiz, self._altura_negra(self.raiz), ancora)
+        raiz.pai = self.nulo
+        raiz.cor = PRETO
+        self.raiz = raiz
+        return tamanho_anterior - raiz.tamanho
 
-    def sucessor(self, no: NoRubroNegra) -> Optional[NoRubroNegra]:
-        if no.direita != self.nulo:
-            return self._minimo(no.direita)
+    def compactar(self) -> int:
+        if self.raiz == self.nulo:
+            return 0
+        self._invalidar_ancoras()
+
+        nos = []
+        no = self._minimo(self.raiz)
+        while no is not None:
+            proximo = no.proximo
+            if nos and self._mesma_disponibilidade(nos[-1], no.nRec, no.intervalos):
+                no.anterior = no.proximo = None
+            else:
+                if nos:
+                    nos[-1].proximo = no
+                no.anterior = nos[-1] if nos else None
+                nos.append(no)
+            no = proximo
+        nos[-1].proximo = None
 
+        removidos = self.raiz.tamanho - len(nos)
+        profundidade_vermelha = len(nos).bit_length() - 1
+        self.raiz = self._construir_balanceada(nos, 0, len(nos), self.nulo, 0, profundidade_vermelha)
+        self.raiz.cor = PRETO
+        self.maximo = nos[-1]
+        return removidos
+
+    def _manter_a_partir(self, no: NoRubroNegra, altura_negra: int, ancora: NoRubroNegra) -> Tuple[NoRubroNegra, int]:
+        altura_filhos = altura_negra - (1 if no.cor == PRETO else 0)
+        esquerda = no.esquerda
+        direita = no.direita
+
+        if no is ancora:
+            return self._juntar(self.nulo, 0, no, direita, altura_filhos)
+        if no.tempo > ancora.tempo:
+            resto, altura_resto = self._manter_a_partir(esquerda, altura_filhos, ancora)
+            return self._juntar(resto, altura_resto, no, direita, altura_filhos)
+        return self._manter_a_partir(direita, altura_filhos, ancora)
+
+    def _encadear(self, no: NoRubroNegra):
         pai = no.pai
-        while pai != self.nulo and no == pai.direita:
-            no = pai
-            pai = pai.pai
-        return pai if pai != self.nulo else None
+        if pai == self.nulo:
+            return
+        if pai.esquerda is no:
+            no.anterior = pai.anterior
+            no.proximo = pai
+        else:
+            no.anterior = pai
+            no.proximo = pai.proximo
+        if no.anterior is not None:
+            no.anterior.proximo = no
+        if no.proximo is not None:
+            no.proximo.anterior = no
 
     def _minimo(self, no: NoRubroNegra) -> NoRubroNegra:
         while no.esquerda != self.nulo:
             no = no.esquerda
         return no
 
-    def _intersecao_intervalos(self, a: List[Tuple[int, int]], b: List[Tuple[int, int]]) -> List[Tuple[int, int]]:
-        resultado = []
-        i = j = 0
-        while i < len(a) and j < len(b):
-            comeco = max(a[i][0], b[j][0])
-            fim = min(a[i][1], b[j][1])
-            if comeco <= fim:
-                resultado.append((comeco, fim))
-            if a[i][1] < b[j][1]:
-                i += 1
-            else:
-                j += 1
-        return resultado
+    def _primeiro(self) -> Optional[NoRubroNegra]:
+        if self.raiz == self.nulo:
+            return None
+        return self._minimo(self.raiz)
 
-    def _contar_recursos(self, intervalos: List[Tuple[int, int]]) -> int:
-        return sum(fim - comeco + 1 for comeco, fim in intervalos)
\ No newline at end of file
+    def __len__(self) -> int:
+        return self.raiz.tamanho
@@ -0,0 +1,197 @@
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from recursos import Recursos
+
+class TravaLeituraEscrita:
+    def __init__(self):
+        self._condicao = threading.Condition(threading.Lock())
+        self._leitores = 0
+        self._escrevendo = False
+        self._escritores_esperando = 0
+
+    def adquirir_leitura(self):
+        with self._condicao:
+            while self._escrevendo or self._escritores_esperando:
+                self._condicao.wait()
+            self._leitores += 1
+
+    def liberar_leitura(self):
+        with self._condicao:
+            self._leitores -= 1
+            if not self._leitores:
+                self._condicao.notify_all()
+
+    def adquirir_escrita(self):
+        with self._condicao:
+            self._escritores_esperando += 1
+            while self._escrevendo or self._leitores:
+                self._condicao.wait()
+            self._escritores_esperando -= 1
+            self._escrevendo = True
+
+    def liberar_escrita(self):
+        with self._condicao:
+            self._escrevendo = False
+            self._condicao.notify_all()
+
+    @contextmanager
+    def leitura(self):
+        self.adquirir_leitura()
+        try:
+            yield
+        finally:
+            self.liberar_leitura()
+
+    @contextmanager
+    def escrita(self):
+        self.adquirir_escrita()
+        try:
+            yield
+        finally:
+            self.liberar_escrita()
+
+# Leitores compartilham a trava de leitura e só chamam confirmar_disponibilidade,
+# confirmar_lote e encontrar_primeiro_encaixe. Esses métodos não alteram pontos,
+# mas mexem em estado interno: o PoolIntervalos e o CacheAncoras têm trava
+# própria, e os agregados preguiçosos da árvore B+ e da lista em blocos só são
+# recalculados com o mesmo valor. Perfis com metricas ativas não devem ser
+# compartilhados. As escritas (criar_no, reservar, reservar_em_grupo, liberar)
+# rodam sob a trava de escrita; nenhum outro método do perfil deve ser chamado
+# diretamente enquanto o serviço estiver em uso. Depois de fechar(),
+# reservar_em_grupo levanta RuntimeError; pedidos já enfileirados são
+# confirmados antes de o confirmador parar.
+class ServicoDisponibilidade:
+    def __init__(self, perfil, tamanho_lote: int = 64, espera_lote: float = 0.0005, tentativas_otimistas: int = 3):
+        self.perfil = perfil
+        self.trava = TravaLeituraEscrita()
+        self.versao = 0
+
+        self.tamanho_lote = tamanho_lote
+        self.espera_lote = espera_lote
+        self.tentativas_otimistas = tentativas_otimistas
+
+        self.conflitos = 0
+        self.lotes = 0
+
+        self._fila = queue.Queue()
+        self._confirmador = None
+        self._inicio_confirmador = threading.Lock()
+        self._fechado = False
+
+    def __enter__(self) -> 'ServicoDisponibilidade':
+        return self
+
+    def __exit__(self, *_):
+        self.fechar()
+
+    def confirmar_disponibilidade(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Tuple[Optional[Tuple[int, Recursos]], int, int]:
+        with self.trava.leitura():
+            return self.perfil.confirmar_disponibilidade(tempo_inicio, tempo_fim, reqRec)
+
+    def confirmar_lote(self, chamadas: List[Tuple[int, int, int]]) -> List[Tuple[Optional[Tuple[int, Recursos]], int, int]]:
+        with self.trava.leitura():
+            return self.perfil.confirmar_lote(chamadas)
+
+    def encontrar_primeiro_encaixe(self, t0: int, duracao: int, reqRec: int) -> Optional[Tuple[int, Recursos]]:
+        with self.trava.leitura():
+            return self.perfil.encontrar_primeiro_encaixe(t0, duracao, reqRec)
+
+    def criar_no(self, tempo: int, nRec: int, intervalos: Recursos):
+        with self.trava.escrita():
+            self.versao += 1
+            return self.perfil.criar_no(tempo, nRec, intervalos)
+
+    def reservar(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> Optional[Recursos]:
+        for _ in range(self.tentativas_otimistas):
+            with self.trava.leitura():
+                versao = self.versao
+                resultado, _, _ = self.perfil.confirmar_disponibilidade(tempo_inicio, tempo_fim, reqRec)
+            if resultado is None:
+                return None
+
+            with self.trava.escrita():
+                if self.versao == versao:
+                    self.versao += 1
+                    return self.perfil.efetivar_reserva(tempo_inicio, tempo_fim, reqRec, resultado[1])
+                self.conflitos += 1
+
+        with self.trava.escrita():
+            escolhidos = self.perfil.reservar(tempo_inicio, tempo_fim, reqRec)
+            if escolhidos is not None:
+                self.versao += 1
+            return escolhidos
+
+    def liberar(self, tempo_inicio: int, tempo_fim: int, recursos: Recursos) -> int:
+        with self.trava.escrita():
+            self.versao += 1
+            return self.perfil.liberar(tempo_inicio, tempo_fim, recursos)
+
+    def reservar_em_grupo(self, tempo_inicio: int, tempo_fim: int, reqRec: int) -> 'Future[Optional[Recursos]]':
+        futuro = Future()
+        with self._inicio_confirmador:
+            if self._fechado:
+                raise RuntimeError("serviço de disponibilidade fechado")
+            if self._confirmador is None:
+                self._confirmador = threading.Thread(target=self._confirmar_grupos, daemon=True)
+                self._confirmador.start()
+            self._fila.put((tempo_inicio, tempo_fim, reqRec, futuro))
+        return futuro
+
+    def fechar(self):
+        with self._inicio_confirmador:
+            self._fechado = True
+            confirmador = self._confirmador
+            self._confirmador = None
+            if confirmador is not None:
+                self._fila.put(None)
+        if confirmador is not None:
+            confirmador.join()
+        while True:
+            try:
+                pedido = self._fila.get_nowait()
+            except queue.Empty:
+                break
+            if pedido is not None:
+                pedido[3].set_exception(RuntimeError("serviço de disponibilidade fechado"))
+
+    def _confirmar_grupos(self):
+        encerrar = False
+        while not encerrar:
+            pedido = self._fila.get()
+            if pedido is None:
+                return
+
+            lote = [pedido]
+            while len(lote) < self.tamanho_lote:
+                try:
+                    pedido = self._fila.get(timeout=self.espera_lote)
+                except queue.Empty:
+                    break
+                if pedido is None:
+                    encerrar = True
+                    break
+                lote.append(pedido)
+
+            respostas = []
+            with self.trava.escrita():
+                alterou = False
+                for tempo_inicio, tempo_fim, reqRec, futuro in lote:
+                    try:
+                        escolhidos = self.perfil.reservar(tempo_inicio, tempo_fim, reqRec)
+                    except Exception as erro:
+                        respostas.append((futuro, None, erro))
+                        continue
+                    alterou = alterou or escolhidos is not None
+                    respostas.append((futuro, escolhidos, None))
+                if alterou:
+                    self.versao += 1
+            self.lotes += 1
+
+            for futuro, escolhidos, erro in respostas:
+                if erro is not None:
+                    futuro.set_exception(erro)
+                else:
+                    futuro.set_result(escolhidos)
@@ -0,0 +1,49 @@
+import os
+from diario import _aplicar_criacoes, checkpoint, recuperar
+from metricas import Metricas
+from rubronegra import PerfilDisponibilidadeRN
+
+PONTOS = [(0, 4, [(0, 3)]), (10, 4, [(0, 3)]), (20, 2, [(0, 1)]), (5, 1, [(0, 0)])]
+
+def _estado(perfil):
+    return [(no.tempo, no.nRec, list(no.intervalos)) for no in perfil]
+
+def _original(tmp_path, com_instantaneo: bool):
+    instantaneo, diario = str(tmp_path / 'perfil.snap'), str(tmp_path / 'perfil.diario')
+    perfil = recuperar(PerfilDisponibilidadeRN, instantaneo, diario, coalescer=True)
+    for i, ponto in enumerate(PONTOS):
+        perfil.criar_no(*ponto)
+        if com_instantaneo and i == 1:
+            checkpoint(perfil, instantaneo)
+    perfil.diario.fechar()
+    return perfil, instantaneo, diario
+
+def test_recuperar_perfil_coalescido_pelo_diario(tmp_path):
+    original, instantaneo, diario = _original(tmp_path, False)
+    assert not os.path.exists(instantaneo)
+    recuperado = recuperar(PerfilDisponibilidadeRN, instantaneo, diario, anexar=False)
+    assert recuperado.coalescer
+    assert _estado(recuperado) == _estado(original) == [(0, 4, [(0, 3)]), (5, 1, [(0, 0)]), (20, 2, [(0, 1)])]
+    assert recuperado.confirmar_disponibilidade(12, 13, 2) == original.confirmar_disponibilidade(12, 13, 2)
+    assert recuperado.confirmar_disponibilidade(12, 13, 2)[0] is None
+
+def test_recuperar_perfil_coalescido_pelo_instantaneo(tmp_path):
+    original, instantaneo, diario = _original(tmp_path, True)
+    recuperado = recuperar(PerfilDisponibilidadeRN, instantaneo, diario, anexar=False)
+    assert recuperado.coalescer
+    assert _estado(recuperado) == _estado(original)
+    for janela in ((0, 30, 1), (12, 13, 2), (3, 8, 1), (20, 25, 2)):
+        assert recuperado.confirmar_disponibilidade(*janela)[0] == original.confirmar_disponibilidade(*janela)[0]
+
+def test_reconstrucao_mantem_configuracao():
+    perfil = PerfilDisponibilidadeRN()
+    perfil.metricas = Metricas()
+    perfil.ativar_cache_ancoras(capacidade=4, largura_balde=100, passos_maximos=3)
+    perfil.criar_no(0, 2, [(0, 1)])
+
+    reconstruido = _aplicar_criacoes(perfil, [(tempo, 2 - tempo // 10 % 2, [(0, 1 - tempo // 10 % 2)]) for tempo in range(10, 400, 10)])
+    assert reconstruido is not perfil
+    assert reconstruido.metricas is perfil.metricas
+    cache = reconstruido.cache_ancoras
+    assert cache.perfil is reconstruido
+    assert (cache.capacidade, cache.largura_balde, cache.passos_maximos) == (4, 100, 3)
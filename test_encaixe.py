@@ -0,0 +1,46 @@
+import random
+import pytest
+from avl import PerfilDisponibilidadeAVL
+from blocos import PerfilDisponibilidadeBlocos
+from bmais import PerfilDisponibilidadeBMais
+from compacto import PerfilDisponibilidadeCompacto
+from recursos import BITSET, INTERVALOS, converter
+from rubronegra import PerfilDisponibilidadeRN
+
+BACKENDS = [PerfilDisponibilidadeAVL, PerfilDisponibilidadeRN, PerfilDisponibilidadeBMais, PerfilDisponibilidadeBlocos, PerfilDisponibilidadeCompacto]
+
+def _encaixe_por_confirmacao(perfil, t0, duracao, reqRec):
+    for inicio in sorted({t0} | {no.tempo for no in perfil if no.tempo > t0}):
+        resultado = perfil.confirmar_disponibilidade(inicio, inicio + duracao, reqRec)[0]
+        if resultado is not None:
+            return inicio, list(converter(resultado[1], INTERVALOS))
+    return None
+
+@pytest.mark.parametrize('classe', BACKENDS)
+def test_cabeca_com_tempo_repetido(classe):
+    perfil = classe()
+    perfil.criar_no(0, 0, [])
+    perfil.criar_no(10, 3, [(0, 2)])
+    perfil.criar_no(10, 4, [(0, 3)])
+    perfil.criar_no(20, 4, [(0, 3)])
+
+    inicio, intersec = perfil.confirmar_disponibilidade(10, 15, 3)[0]
+    assert (inicio, list(intersec)) == (10, [(0, 3)])
+    inicio, intersec = perfil.encontrar_primeiro_encaixe(0, 5, 3)
+    assert (inicio, list(intersec)) == (10, [(0, 3)])
+
+@pytest.mark.parametrize('classe', BACKENDS)
+@pytest.mark.parametrize('formato', [INTERVALOS, BITSET])
+def test_encaixe_concorda_com_confirmacao(classe, formato):
+    rng = random.Random(7)
+    for _ in range(20):
+        perfil = classe(formato)
+        for _ in range(rng.randint(1, 40)):
+            livres = sorted(rng.sample(range(24), rng.randint(0, 12)))
+            perfil.criar_no(rng.randrange(0, 300, 4), len(livres), [(x, x) for x in livres])
+        for _ in range(20):
+            t0, duracao, reqRec = rng.randrange(-10, 320), rng.randint(1, 40), rng.randint(1, 6)
+            encaixe = perfil.encontrar_primeiro_encaixe(t0, duracao, reqRec)
+            if encaixe is not None:
+                encaixe = encaixe[0], list(converter(encaixe[1], INTERVALOS))
+            assert encaixe == _encaixe_por_confirmacao(perfil, t0, duracao, reqRec)